@@ -1,3 +1,10 @@
+import os
+
+# Lambda cold starts: defer CRM and Sentry setup, score from compiled tables
+os.environ.setdefault("FAST_STARTUP", "true")
+# Write logs before returning: a frozen sandbox would strand queued records
+os.environ.setdefault("LOG_QUEUE_SIZE", "0")
+
 from mangum import Mangum
 from .main import app
 
@@ -1,21 +1,41 @@
-from fastapi import FastAPI, HTTPException, Security, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Security, BackgroundTasks, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security.api_key import APIKeyHeader
 from datetime import datetime
 import uuid
-from fastapi.responses import JSONResponse
+import tempfile
+import time
+from pathlib import Path
+from fastapi.responses import JSONResponse, PlainTextResponse
 import os
-from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
-import sentry_sdk
 
-from .models import Lead, LeadData, LeadResponse
-from .services.lead_classifier import classify_lead
-from .services.crm_integration import update_crm
+from .models import Lead, LeadData, LeadResponse, LeadBatchData, LeadBatchResponse, ConversionData
+from .services.lead_classifier import classify_lead, classify_leads, lead_predictor
+from .services.crm_integration import crm_integration
+from .services.tenants import Tenant, default_tenant, tenant_pool, update_crm, update_crm_batch
+from .services.model_registry import model_registry
+from .services.training_jobs import training_jobs
+from .services.lead_queue import lead_queue
+from .services.lead_dedup import PendingLead, lead_coalescer
+from .services.analytics_store import analytics_store
+from .services.retraining import retraining_scheduler
+from .services.shadow_scoring import shadow_scorer
 from .services.ml_predictor import LeadPredictor
+from .utils.logger import HIGH_VOLUME, get_logger, log_context, request_id_var
+from .utils.metrics import http_request_seconds, metrics, stage_seconds
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional, Tuple
 
 app = FastAPI(title="Lead Qualification API")
+logger = get_logger(__name__)
+
+# Longest caller-supplied X-Request-ID kept; longer ones are replaced
+MAX_REQUEST_ID_LENGTH = 128
+
+# Training jobs can publish to the shadow candidate instead of the live model
+if shadow_scorer:
+    training_jobs.shadow_registry = shadow_scorer.registry
 
 # Configure CORS
 app.add_middleware(
@@ -29,6 +49,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class RequestTimingMiddleware:
+    """Stamp each request's arrival and id, and record its latency by route.
+
+    The id comes from the caller's X-Request-ID or is generated. It is
+    set for every log record of the request, background CRM sync
+    included, and echoed in the response's X-Request-ID. Plain ASGI
+    rather than @app.middleware("http"), which adds a task and a response
+    copy to every request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        scope.setdefault("state", {})["received_at"] = start
+        status = {"code": 500}
+        request_id = next(
+            (value.decode("latin-1") for name, value in scope["headers"] if name == b"x-request-id"), None
+        )
+        if not request_id or len(request_id) > MAX_REQUEST_ID_LENGTH:
+            request_id = uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message.setdefault("headers", []).append((b"x-request-id", request_id.encode("latin-1")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_id_var.reset(token)
+            route = scope.get("route")
+            http_request_seconds.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=route.path if route else "unmatched",
+                status=str(status["code"])
+            )
+
+app.add_middleware(RequestTimingMiddleware)
+
+parse_stage = stage_seconds.labels(stage="parse")
+build_lead_stage = stage_seconds.labels(stage="build_lead")
+
+def record_parse_time(request: Request):
+    # Arrival to handler entry: body read, validation and auth
+    parse_stage.observe(time.perf_counter() - request.state.received_at)
+
 API_KEY_NAME = "X-API-Key"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
 
@@ -40,60 +114,260 @@ async def get_api_key(api_key_header: str = Security(api_key_header)):
         detail="Invalid API Key"
     )
 
-def process_lead_async(lead: Lead):
+async def get_tenant(request: Request, api_key_header: str = Security(api_key_header)) -> Tenant:
+    """Authenticate a webhook and pick the tenant whose model and CRM serve it.
+
+    A tenant's own key selects that tenant. WEBHOOK_API_KEY selects the
+    tenant named by a /t/{tenant_id} path prefix, or without one the
+    environment's CRM and model.
+    """
+    path_tenant = request.path_params.get("tenant_id")
+    if path_tenant is not None and (tenant_pool is None or path_tenant not in tenant_pool.configs):
+        raise HTTPException(status_code=404, detail="Unknown tenant")
+
+    key_tenant = tenant_pool.tenant_for_key(api_key_header) if tenant_pool else None
+    # A cold tenant loads its model from disk: keep that off the event loop
+    if key_tenant is not None and path_tenant in (None, key_tenant):
+        return await run_in_threadpool(tenant_pool.get, key_tenant)
+    if key_tenant is None and api_key_header and api_key_header == os.getenv("WEBHOOK_API_KEY"):
+        if path_tenant is None:
+            return default_tenant
+        if tenant_pool is not None:
+            return await run_in_threadpool(tenant_pool.get, path_tenant)
+    raise HTTPException(
+        status_code=403,
+        detail="Invalid API Key"
+    )
+
+async def process_lead_async(lead: Lead):
     # Move the CRM update to background task
+    with log_context(lead_id=lead.id):
+        try:
+            await update_crm(lead)
+        except Exception as e:
+            # Log the error but don't raise it
+            logger.error("Error updating CRM", extra={"error": str(e)})
+
+async def process_coalesced_lead(pending: PendingLead):
+    # One CRM sync per coalescing window, with every duplicate merged in
+    lead = await lead_coalescer.take(pending)
+    if lead is not None:
+        await process_lead_async(lead)
+
+async def record_scored(leads: List[Lead], version: str):
+    # Analytics are best effort: record off the event loop, and never fail
+    # a lead that is already scored and handed to the CRM
+    try:
+        await run_in_threadpool(analytics_store.record_scored, leads, version)
+    except Exception as e:
+        logger.error("Error recording scored leads", extra={"leads": len(leads), "error": str(e)})
+
+async def process_leads_async(leads: List[Lead]):
+    # Sync a scored batch to the CRM with bulk upserts
     try:
-        await update_crm(lead)
+        await update_crm_batch(leads)
     except Exception as e:
-        # Log the error but don't raise it
-        print(f"Error updating CRM: {str(e)}")
+        logger.error("Error updating CRM", extra={"leads": len(leads), "error": str(e)})
+
+def build_lead(lead_data: LeadData, tenant: Tenant = default_tenant) -> Lead:
+    # Create lead object with engagement metrics
+    return Lead(
+        id=str(uuid.uuid4()),
+        email=lead_data.email,
+        name=lead_data.name,
+        company=lead_data.company,
+        source=lead_data.source or "webhook",
+        engagement_metrics={
+            "website_visits": lead_data.visits or 0,
+            "time_on_site": lead_data.time_on_site or 0,
+            "pages_viewed": lead_data.pages_viewed or 0,
+            "downloaded_resources": lead_data.downloads or 0,
+            "email_interactions": lead_data.email_interactions or 0,
+        },
+        created_at=datetime.utcnow(),
+        status="Cold",
+        score=0,
+        tenant=None if tenant.is_default else tenant.tenant_id
+    )
+
+def scoring_groups(leads: List[Lead], tenant: Tenant) -> List[Tuple[LeadPredictor, bool, List[int]]]:
+    """Split leads by the model that answers them: (predictor, canary, indices).
+
+    The canary share of the default tenant's leads goes to the shadow
+    candidate; everything else to the tenant's model.
+    """
+    if shadow_scorer is None or not tenant.is_default:
+        return [(tenant.predictor, False, list(range(len(leads))))]
+    canary = [shadow_scorer.in_canary(lead) for lead in leads]
+    groups = [
+        (tenant.predictor, False, [i for i, c in enumerate(canary) if not c]),
+        (shadow_scorer.candidate, True, [i for i, c in enumerate(canary) if c])
+    ]
+    return [group for group in groups if group[2]]
 
 @app.post("/webhook/leads", response_model=LeadResponse)
+@app.post("/t/{tenant_id}/webhook/leads", response_model=LeadResponse)
 async def receive_lead(
+    request: Request,
     lead_data: LeadData,
     background_tasks: BackgroundTasks,
-    api_key: str = Security(get_api_key)
+    explain: bool = False,
+    tenant: Tenant = Security(get_tenant)
 ):
+    record_parse_time(request)
     try:
-        # Create lead object with engagement metrics
-        lead = Lead(
-            id=str(uuid.uuid4()),
-            email=lead_data.email,
-            name=lead_data.name,
-            company=lead_data.company,
-            source=lead_data.source or "webhook",
-            engagement_metrics={
-                "website_visits": lead_data.visits or 0,
-                "time_on_site": lead_data.time_on_site or 0,
-                "pages_viewed": lead_data.pages_viewed or 0,
-                "downloaded_resources": lead_data.downloads or 0,
-                "email_interactions": lead_data.email_interactions or 0,
-            },
-            created_at=datetime.utcnow(),
-            status="Cold",
-            score=0
-        )
+        with build_lead_stage.time():
+            lead = build_lead(lead_data, tenant)
+            # Repeat submissions in the dedup window are scored on their
+            # merged metrics and keep the first submission's id
+            if lead_coalescer:
+                lead = lead_coalescer.merge(lead)
 
         # Classify the lead
-        classification = await classify_lead(lead)
+        predictor, canary, _ = scoring_groups([lead], tenant)[0]
+        version = predictor.bundle.version
+        classification = await classify_lead(lead, predictor)
         lead.status = classification.status
         lead.score = classification.score
+        if explain:
+            lead.explanation = (await predictor.explain_batch([lead.engagement_metrics.dict()]))[0]
+        if shadow_scorer and tenant.is_default:
+            shadow_scorer.submit([lead], version, canary)
+        logger.info("Lead scored", extra={
+            **HIGH_VOLUME, "lead_id": lead.id, "status": lead.status, "score": lead.score, "model_version": version
+        })
+
+        pending = lead_coalescer.put(lead) if lead_coalescer else None
+        # A duplicate was recorded when its window opened and rides on
+        # that window's pending CRM sync
+        duplicate = lead_coalescer is not None and pending is None
+
+        # Hand CRM sync to the dedup window, the durable queue when
+        # configured, or otherwise a background task. With the queue the
+        # window's lead is already on disk, due when the window closes
+        if pending:
+            if not pending.queued:
+                background_tasks.add_task(process_coalesced_lead, pending)
+        elif not duplicate:
+            if lead_queue:
+                lead_queue.enqueue(lead)
+            else:
+                background_tasks.add_task(process_lead_async, lead)
+
+        if analytics_store and tenant.is_default and not duplicate:
+            await record_scored([lead], version)
+
+        response = {
+            "id": lead.id,
+            "status": lead.status,
+            "score": lead.score
+        }
+        if explain:
+            response["explanation"] = lead.explanation.dict() if lead.explanation else None
+        return LeadResponse(success=True, lead=response)
+    except Exception as e:
+        logger.error("Error processing lead", exc_info=True)
+        # Return 500 to trigger Zapier retry
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/webhook/leads/batch", response_model=LeadBatchResponse)
+@app.post("/t/{tenant_id}/webhook/leads/batch", response_model=LeadBatchResponse)
+async def receive_lead_batch(
+    request: Request,
+    batch: LeadBatchData,
+    background_tasks: BackgroundTasks,
+    explain: bool = False,
+    tenant: Tenant = Security(get_tenant)
+):
+    record_parse_time(request)
+    try:
+        with build_lead_stage.time():
+            leads = [build_lead(lead_data, tenant) for lead_data in batch.leads]
 
-        # Move CRM update to background task
-        background_tasks.add_task(process_lead_async, lead)
+        # Score the whole batch with one model call per answering model
+        classifications = [None] * len(leads)
+        scored_groups = []
+        for predictor, canary, indices in scoring_groups(leads, tenant):
+            group = [leads[i] for i in indices]
+            version = predictor.bundle.version
+            for i, classification in zip(indices, await classify_leads(group, predictor)):
+                classifications[i] = classification
+                leads[i].status = classification.status
+                leads[i].score = classification.score
+            if explain:
+                explanations = await predictor.explain_batch([lead.engagement_metrics.dict() for lead in group])
+                for lead, explanation in zip(group, explanations):
+                    lead.explanation = explanation
+            if shadow_scorer and tenant.is_default:
+                shadow_scorer.submit(group, version, canary)
+            scored_groups.append((group, version))
+            logger.info("Lead batch scored", extra={**HIGH_VOLUME, "leads": len(group), "model_version": version})
 
-        return LeadResponse(
-            success=True,
-            lead={
+        # Queue the batch durably, or sync it in a single background task
+        if lead_queue:
+            lead_queue.enqueue_many(leads)
+        else:
+            background_tasks.add_task(process_leads_async, leads)
+
+        if analytics_store and tenant.is_default:
+            for group, version in scored_groups:
+                await record_scored(group, version)
+
+        results = [
+            {
                 "id": lead.id,
-                "status": lead.status,
-                "score": lead.score
+                "email": lead.email,
+                "status": classification.status,
+                "score": classification.score,
+                "confidence": classification.confidence
             }
-        )
+            for lead, classification in zip(leads, classifications)
+        ]
+        if explain:
+            for result, lead in zip(results, leads):
+                result["explanation"] = lead.explanation.dict() if lead.explanation else None
+        return LeadBatchResponse(success=True, leads=results)
     except Exception as e:
-        # Return 500 to trigger Zapier retry
+        logger.error("Error processing lead batch", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/webhook/conversions")
+async def receive_conversion(
+    outcome: ConversionData,
+    api_key: str = Security(get_api_key)
+):
+    # Outcomes feed the analytics rollups behind /analytics/performance
+    if analytics_store is None:
+        raise HTTPException(status_code=400, detail="ANALYTICS_DB_PATH is not configured")
+    if outcome.lead_id is None and outcome.email is None:
+        raise HTTPException(status_code=422, detail="lead_id or email is required")
+
+    lead_id = analytics_store.record_outcome(
+        outcome.converted, outcome.lead_id, outcome.email, outcome.converted_at
+    )
+    if lead_id is None:
+        raise HTTPException(status_code=404, detail="No scored lead matches this outcome")
+    return {"success": True, "lead_id": lead_id, "converted": outcome.converted}
+
+@app.get("/analytics/performance")
+async def get_performance(
+    days: int = 30,
+    api_key: str = Security(get_api_key)
+):
+    if analytics_store is None:
+        raise HTTPException(status_code=400, detail="ANALYTICS_DB_PATH is not configured")
+    return analytics_store.performance(days)
+
+@app.get("/analytics/shadow")
+async def get_shadow_comparison(
+    days: int = 7,
+    api_key: str = Security(get_api_key)
+):
+    # How the shadow candidate's scores differ from the live model's
+    if analytics_store is None:
+        raise HTTPException(status_code=400, detail="ANALYTICS_DB_PATH is not configured")
+    return analytics_store.shadow_report(days)
+
 # Add this new endpoint for testing
 @app.get("/webhook/test")
 async def test_webhook():
@@ -105,36 +379,191 @@ async def test_webhook():
 class TrainingData(BaseModel):
     leads: List[dict]
     converted: List[int]  # 1 for converted, 0 for not converted
+    search: bool = False  # cross-validated search; also reports the active model's holdout AUC
+    promote: bool = False  # with search: publish live, not as the shadow candidate
+    estimators: List[str] = ["forest"]  # with search: forest, hist_gradient_boosting
+    shadow: bool = False  # publish as the shadow candidate, not the live model
 
-predictor = LeadPredictor()
+class TrainingFile(BaseModel):
+    path: str  # relative to TRAINING_DATA_DIR
+    format: str = "ndjson"  # ndjson or csv
+    mode: str = "batch"  # batch or incremental
+    chunk_size: int = 10000
+    shadow: bool = False
+
+def training_data_dir() -> Optional[Path]:
+    path = os.getenv("TRAINING_DATA_DIR")
+    return Path(path).resolve() if path else None
+
+@app.on_event("startup")
+async def watch_model():
+    # Pick up models published by other workers or processes
+    reload_interval = float(os.getenv("MODEL_RELOAD_INTERVAL", "5"))
+    if reload_interval > 0:
+        model_registry.watch(reload_interval)
+        if shadow_scorer:
+            shadow_scorer.registry.watch(reload_interval)
+    # Every worker checks; the scheduler's file lock lets one run at a time
+    retrain_interval = float(os.getenv("RETRAIN_INTERVAL", "0"))
+    if retraining_scheduler and retrain_interval > 0:
+        retraining_scheduler.start(retrain_interval)
+    try:
+        model_registry.install_signal_handler()
+    except ValueError:
+        # Not running in the main thread
+        pass
 
-@app.post("/train-model")
+@app.post("/train-model", status_code=202)
 async def train_model(
     data: TrainingData,
     api_key: str = Security(get_api_key)
 ):
+    # Training runs in a separate process; poll the job for the result
+    if data.shadow and shadow_scorer is None:
+        raise HTTPException(status_code=400, detail="SHADOW_MODEL_DIR is not configured")
     try:
-        await predictor.train(data.leads, data.converted)
-        return {"message": "Model trained successfully"}
+        if data.search:
+            job = training_jobs.submit_search(
+                data.leads, data.converted, data.estimators, shadow=data.shadow, promote=data.promote
+            )
+        else:
+            job = training_jobs.submit(data.leads, data.converted, shadow=data.shadow)
+        return job.to_dict()
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to train model: {str(e)}"
         )
 
+@app.post("/train-model/upload", status_code=202)
+async def train_model_upload(
+    request: Request,
+    format: str = "ndjson",
+    mode: str = "batch",
+    chunk_size: int = 10000,
+    shadow: bool = False,
+    api_key: str = Security(get_api_key)
+):
+    if shadow and shadow_scorer is None:
+        raise HTTPException(status_code=400, detail="SHADOW_MODEL_DIR is not configured")
+    # Stream the request body to disk so the export is never held in memory
+    data_dir = training_data_dir()
+    upload = tempfile.NamedTemporaryFile(
+        mode='wb',
+        suffix=f".{format}",
+        dir=data_dir,
+        delete=False
+    )
+    try:
+        with upload:
+            async for chunk in request.stream():
+                upload.write(chunk)
+        job = training_jobs.submit_file(
+            upload.name, format, mode, chunk_size, delete_after=True, shadow=shadow
+        )
+        return job.to_dict()
+    except Exception as e:
+        os.remove(upload.name)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to train model: {str(e)}"
+        )
+
+@app.post("/train-model/from-file", status_code=202)
+async def train_model_from_file(
+    data: TrainingFile,
+    api_key: str = Security(get_api_key)
+):
+    data_dir = training_data_dir()
+    if data_dir is None:
+        raise HTTPException(status_code=400, detail="TRAINING_DATA_DIR is not configured")
+    if data.shadow and shadow_scorer is None:
+        raise HTTPException(status_code=400, detail="SHADOW_MODEL_DIR is not configured")
+
+    path = (data_dir / data.path).resolve()
+    if data_dir not in path.parents or not path.is_file():
+        raise HTTPException(status_code=404, detail="Training file not found")
+
+    try:
+        job = training_jobs.submit_file(
+            str(path), data.format, data.mode, data.chunk_size, shadow=data.shadow
+        )
+        return job.to_dict()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to train model: {str(e)}"
+        )
+
+@app.get("/train-model/{job_id}")
+async def get_training_job(
+    job_id: str,
+    api_key: str = Security(get_api_key)
+):
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return job.to_dict()
+
+@app.delete("/train-model/{job_id}")
+async def cancel_training_job(
+    job_id: str,
+    api_key: str = Security(get_api_key)
+):
+    job = training_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return job.to_dict()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
 @app.get("/health")
 async def health_check():
     return {
         "status": "healthy",
         "version": "1.0.0",
         "crm_type": os.getenv("CRM_TYPE"),
-        "ml_model_loaded": predictor.model is not None
+        "ml_model_loaded": (
+            model_registry.active.model is not None
+            or model_registry.active.compiled is not None
+        ),
+        "ml_model_version": model_registry.active.version,
+        "ml_model_loaded_at": model_registry.active.loaded_at.isoformat(),
+        "score_cache": lead_predictor.score_cache.stats(),
+        "explanation_cache": lead_predictor.explanation_cache.stats(),
+        "crm_identity_cache": crm_integration.identity_cache_stats(),
+        "crm_resilience": crm_integration.resilience_stats(),
+        "lead_queue": lead_queue.stats() if lead_queue else None,
+        "analytics": analytics_store.stats() if analytics_store else None,
+        "lead_dedup": lead_coalescer.stats() if lead_coalescer else None,
+        "shadow_scoring": shadow_scorer.stats() if shadow_scorer else None,
+        "tenants": tenant_pool.stats() if tenant_pool else None
     }
 
-if os.getenv("SENTRY_DSN"):
+def init_sentry():
+    import sentry_sdk
     sentry_sdk.init(
         dsn=os.getenv("SENTRY_DSN"),
         environment=os.getenv("ENVIRONMENT", "production"),
-        traces_sample_rate=1.0
+        # Per-stage timings are always on via /metrics; keep tracing sampled
+        traces_sample_rate=float(os.getenv("SENTRY_TRACES_SAMPLE_RATE", "1.0"))
     )
-    app.add_middleware(SentryAsgiMiddleware) 
\ No newline at end of file
+
+def lazy_sentry_middleware(app):
+    # Starlette builds the middleware stack on the first request
+    from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
+    init_sentry()
+    return SentryAsgiMiddleware(app)
+
+if os.getenv("SENTRY_DSN"):
+    if os.getenv("FAST_STARTUP", "false").lower() == "true":
+        app.add_middleware(lazy_sentry_middleware)
+    else:
+        from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
+        init_sentry()
+        app.add_middleware(SentryAsgiMiddleware) 
\ No newline at end of file
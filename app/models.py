@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, Dict, Literal
+from typing import Optional, Dict, List, Literal
 from datetime import datetime
 
 class EngagementMetrics(BaseModel):
@@ -9,6 +9,11 @@ class EngagementMetrics(BaseModel):
     downloaded_resources: int
     email_interactions: int
 
+class ScoreExplanation(BaseModel):
+    # Score points: baseline plus contributions add up to the unrounded score
+    baseline: float
+    contributions: Dict[str, float]  # per feature
+
 class Lead(BaseModel):
     id: str
     email: EmailStr
@@ -19,6 +24,8 @@ class Lead(BaseModel):
     created_at: datetime
     status: Literal["Hot", "Warm", "Cold"]
     score: int
+    tenant: Optional[str] = None  # None: the environment's CRM and model
+    explanation: Optional[ScoreExplanation] = None  # only when requested
 
 class LeadData(BaseModel):
     email: EmailStr
@@ -38,4 +45,17 @@ class LeadClassificationResult(BaseModel):
 
 class LeadResponse(BaseModel):
     success: bool
-    lead: Dict 
\ No newline at end of file
+    lead: Dict
+
+class LeadBatchData(BaseModel):
+    leads: List[LeadData]
+
+class LeadBatchResponse(BaseModel):
+    success: bool
+    leads: List[Dict]
+
+class ConversionData(BaseModel):
+    lead_id: Optional[str] = None  # id returned when the lead was scored
+    email: Optional[EmailStr] = None  # else the latest lead scored for this email
+    converted: bool = True
+    converted_at: Optional[datetime] = None
\ No newline at end of file
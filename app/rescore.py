@@ -0,0 +1,57 @@
+"""Rescore existing leads with the current model and write back what changed.
+
+Reads leads page by page from the CRM configured as for the API
+(CRM_TYPE and its credentials), or from a CSV/NDJSON/Parquet export,
+scores each page in one vectorized pass and updates the score and
+status (Rating / Lead_Score__c, lead_score / lead_status) of the leads
+whose result changed. Progress is saved to the checkpoint after every
+page; rerun the same command to resume an interrupted run:
+    python -m app.rescore --checkpoint rescore.json
+    python -m app.rescore --file leads.parquet --checkpoint rescore.json
+    python -m app.rescore --file leads.csv --dry-run   # count changes only
+"""
+import argparse
+import asyncio
+import json
+
+from .services.lead_classifier import lead_predictor
+from .services.rescoring import FILE_FORMATS, BulkRescorer, CRMSource, FileSource
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", help="read leads from this export instead of the CRM")
+    parser.add_argument("--format", choices=FILE_FORMATS, help="file format (default: from the file name)")
+    parser.add_argument("--page-size", type=int, help="leads scored per pass (CRMs cap their own pages)")
+    parser.add_argument("--checkpoint", help="JSON file recording progress, for resuming")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="score and count changes without writing")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="seconds between progress lines")
+    args = parser.parse_args()
+
+    adapter = None
+    if not (args.file and args.dry_run):
+        # Imported here so a dry run over a file needs no CRM settings. The
+        # module's adapter, so its login, rate limiter and breaker are shared
+        from .services.crm_integration import crm_integration
+        adapter = crm_integration.crm_adapter
+
+    if args.file:
+        source = FileSource(args.file, args.format, **({"page_size": args.page_size} if args.page_size else {}))
+    else:
+        source = CRMSource(adapter, **({"page_size": args.page_size} if args.page_size else {}))
+
+    rescorer = BulkRescorer(
+        lead_predictor,
+        adapter,
+        checkpoint_path=args.checkpoint,
+        dry_run=args.dry_run,
+        progress_interval=args.progress_interval
+    )
+    try:
+        summary = asyncio.run(rescorer.run(source, restart=args.restart))
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print(json.dumps(summary))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
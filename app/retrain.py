@@ -0,0 +1,31 @@
+"""Retrain the lead model when it is stale or its inputs have drifted.
+
+Needs the API's ANALYTICS_DB_PATH for labeled outcomes. Run once from
+cron, or keep running with a check interval:
+    python -m app.retrain              # one check, e.g. hourly from cron
+    python -m app.retrain --force      # retrain now on all pulled labels
+    python -m app.retrain --interval 3600
+"""
+import argparse
+import json
+import time
+
+from .services.retraining import retraining_scheduler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="retrain even if not due")
+    parser.add_argument("--interval", type=float, help="keep checking every N seconds")
+    args = parser.parse_args()
+
+    if retraining_scheduler is None:
+        raise SystemExit("ANALYTICS_DB_PATH is not set")
+
+    while True:
+        print(json.dumps(retraining_scheduler.run_once(force=args.force)))
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
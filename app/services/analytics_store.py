@@ -0,0 +1,456 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from ..models import Lead
+from .features import INPUT_COLUMNS
+
+SECONDS_PER_DAY = 86400
+SCORE_BUCKETS = 10  # score deciles, for calibration and lift
+
+def email_hash(email: str) -> str:
+    return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+
+def score_bucket(score: int) -> int:
+    return min(max(int(score), 0) * SCORE_BUCKETS // 100, SCORE_BUCKETS - 1)
+
+class AnalyticsStore:
+    """Local record of scored leads and their conversion outcomes.
+
+    Every scored lead is appended to `scored_leads`; in the same
+    transaction a per-day rollup keyed by (day, model version, status,
+    score decile) is incremented. Outcomes reported later adjust the
+    rollup row their lead was counted in, so reports over N days read at
+    most N * versions * 3 * 10 rows and never scan raw events.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS scored_leads (
+                lead_id TEXT PRIMARY KEY,
+                email_hash TEXT NOT NULL,
+                status TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                model_version TEXT NOT NULL,
+                day INTEGER NOT NULL,
+                scored_at REAL NOT NULL,
+                website_visits INTEGER NOT NULL,
+                time_on_site INTEGER NOT NULL,
+                pages_viewed INTEGER NOT NULL,
+                downloaded_resources INTEGER NOT NULL,
+                email_interactions INTEGER NOT NULL,
+                converted INTEGER,
+                outcome_at REAL,
+                outcome_recorded_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS scored_leads_day
+                ON scored_leads (day);
+            CREATE INDEX IF NOT EXISTS scored_leads_email
+                ON scored_leads (email_hash, scored_at);
+            CREATE TABLE IF NOT EXISTS daily_rollup (
+                day INTEGER NOT NULL,
+                model_version TEXT NOT NULL,
+                status TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                leads INTEGER NOT NULL DEFAULT 0,
+                conversions INTEGER NOT NULL DEFAULT 0,
+                score_sum REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, model_version, status, bucket)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS shadow_rollup (
+                day INTEGER NOT NULL,
+                live_version TEXT NOT NULL,
+                candidate_version TEXT NOT NULL,
+                live_status TEXT NOT NULL,
+                candidate_status TEXT NOT NULL,
+                leads INTEGER NOT NULL DEFAULT 0,
+                score_delta_sum REAL NOT NULL DEFAULT 0,
+                abs_score_delta_sum REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, live_version, candidate_version, live_status, candidate_status)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS shadow_disagreements (
+                lead_id TEXT NOT NULL,
+                day INTEGER NOT NULL,
+                scored_at REAL NOT NULL,
+                live_version TEXT NOT NULL,
+                candidate_version TEXT NOT NULL,
+                live_status TEXT NOT NULL,
+                live_score INTEGER NOT NULL,
+                candidate_status TEXT NOT NULL,
+                candidate_score INTEGER NOT NULL,
+                canary INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS shadow_disagreements_day
+                ON shadow_disagreements (day);
+        """)
+        self._migrate()
+
+    def _migrate(self):
+        """Bring a store created by an earlier version up to the current schema"""
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(scored_leads)")}
+        if "outcome_recorded_at" not in columns:
+            # Earlier outcomes were only timestamped by outcome_at
+            self._db.executescript("""
+                ALTER TABLE scored_leads ADD COLUMN outcome_recorded_at REAL;
+                UPDATE scored_leads SET outcome_recorded_at = outcome_at WHERE outcome_at IS NOT NULL;
+            """)
+        self._db.executescript("""
+            DROP INDEX IF EXISTS scored_leads_outcome;
+            CREATE INDEX IF NOT EXISTS scored_leads_outcome_recorded
+                ON scored_leads (outcome_recorded_at);
+        """)
+
+    @classmethod
+    def from_env(cls) -> Optional["AnalyticsStore"]:
+        path = os.getenv("ANALYTICS_DB_PATH")
+        return cls(path) if path else None
+
+    def record_scored(self, leads: List[Lead], model_version: str, scored_at: Optional[float] = None):
+        """Append scored leads and count them in their day's rollup.
+
+        A lead id already recorded (e.g. a retried webhook) is skipped in
+        both, so the rollup always agrees with the raw rows.
+        """
+        now = scored_at or time.time()
+        day = int(now // SECONDS_PER_DAY)
+        rows = []
+        for lead in leads:
+            metrics = lead.engagement_metrics
+            rows.append((
+                lead.id, email_hash(lead.email), lead.status, lead.score,
+                model_version, day, now,
+                metrics.website_visits, metrics.time_on_site, metrics.pages_viewed,
+                metrics.downloaded_resources, metrics.email_interactions
+            ))
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # One row at a time, to see which were new: RETURNING
+                # needs SQLite 3.35, newer than some Python 3.9 builds ship
+                inserted = []
+                for lead, row in zip(leads, rows):
+                    cursor = self._db.execute(
+                        "INSERT OR IGNORE INTO scored_leads (lead_id, email_hash, status, score,"
+                        " model_version, day, scored_at, website_visits, time_on_site,"
+                        " pages_viewed, downloaded_resources, email_interactions)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        row
+                    )
+                    if cursor.rowcount:
+                        inserted.append(lead)
+                self._db.executemany(
+                    "INSERT INTO daily_rollup (day, model_version, status, bucket, leads, score_sum)"
+                    " VALUES (?, ?, ?, ?, 1, ?)"
+                    " ON CONFLICT (day, model_version, status, bucket) DO UPDATE SET leads = leads + 1,"
+                    " score_sum = score_sum + excluded.score_sum",
+                    [(day, model_version, lead.status, score_bucket(lead.score), lead.score)
+                     for lead in inserted]
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def record_outcome(
+        self,
+        converted: bool,
+        lead_id: Optional[str] = None,
+        email: Optional[str] = None,
+        outcome_at: Optional[datetime] = None
+    ) -> Optional[str]:
+        """Record whether a scored lead converted.
+
+        Matches by lead id, or else the most recent lead scored for the
+        email. Returns the matched lead id, or None if no lead matched.
+        Repeated or reversed outcomes adjust the rollup by the difference.
+        `outcome_at` is when the lead converted, for reports; the time it
+        was recorded here is kept separately, since a conversion can be
+        reported long after it happened.
+        """
+        if lead_id is None and email is None:
+            raise ValueError("lead_id or email is required")
+        timestamp = outcome_at.timestamp() if outcome_at else time.time()
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if lead_id is not None:
+                    row = self._db.execute(
+                        "SELECT lead_id, day, model_version, status, score, converted"
+                        " FROM scored_leads WHERE lead_id = ?",
+                        (lead_id,)
+                    ).fetchone()
+                else:
+                    row = self._db.execute(
+                        "SELECT lead_id, day, model_version, status, score, converted"
+                        " FROM scored_leads WHERE email_hash = ?"
+                        " ORDER BY scored_at DESC LIMIT 1",
+                        (email_hash(email),)
+                    ).fetchone()
+                if row is None:
+                    self._db.execute("COMMIT")
+                    return None
+
+                matched_id, day, version, status, score, previous = row
+                self._db.execute(
+                    "UPDATE scored_leads SET converted = ?, outcome_at = ?, outcome_recorded_at = ?"
+                    " WHERE lead_id = ?",
+                    (int(converted), timestamp, time.time(), matched_id)
+                )
+                delta = int(converted) - (previous or 0)
+                if delta:
+                    self._db.execute(
+                        "UPDATE daily_rollup SET conversions = conversions + ?"
+                        " WHERE day = ? AND model_version = ? AND status = ? AND bucket = ?",
+                        (delta, day, version, status, score_bucket(score))
+                    )
+                self._db.execute("COMMIT")
+                return matched_id
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def performance(self, days: int = 30) -> Dict[str, Any]:
+        """Conversion rates by status, and calibration and lift per model version"""
+        since = int(time.time() // SECONDS_PER_DAY) - days + 1
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT model_version, status, bucket, SUM(leads), SUM(conversions), SUM(score_sum)"
+                " FROM daily_rollup WHERE day >= ?"
+                " GROUP BY model_version, status, bucket",
+                (since,)
+            ).fetchall()
+
+        by_status = {status: [0, 0] for status in ("Hot", "Warm", "Cold")}
+        by_version: Dict[str, List[List[float]]] = {}
+        for version, status, bucket, leads, conversions, score_sum in rows:
+            by_status[status][0] += leads
+            by_status[status][1] += conversions
+            buckets = by_version.setdefault(version, [[0, 0, 0.0] for _ in range(SCORE_BUCKETS)])
+            buckets[bucket][0] += leads
+            buckets[bucket][1] += conversions
+            buckets[bucket][2] += score_sum
+
+        return {
+            "days": days,
+            "total_leads": sum(leads for leads, _ in by_status.values()),
+            "total_conversions": sum(conversions for _, conversions in by_status.values()),
+            "by_status": {
+                status: {
+                    "leads": leads,
+                    "conversions": conversions,
+                    "conversion_rate": conversions / leads if leads else 0.0
+                }
+                for status, (leads, conversions) in by_status.items()
+            },
+            "model_versions": {
+                version: {
+                    "calibration": self._calibration(buckets),
+                    "lift": self._lift(buckets)
+                }
+                for version, buckets in sorted(by_version.items())
+            }
+        }
+
+    def record_shadow(
+        self,
+        comparisons: List[Tuple[str, str, str, str, int, str, int, bool]],
+        min_score_delta: int = 10,
+        scored_at: Optional[float] = None
+    ):
+        """Count live vs candidate scores of the same leads.
+
+        Each comparison is (lead_id, live_version, candidate_version,
+        live_status, live_score, candidate_status, candidate_score,
+        canary). All are counted in the day's shadow rollup; those whose
+        status differs or whose scores are `min_score_delta` or more apart
+        are also kept individually.
+        """
+        now = scored_at or time.time()
+        day = int(now // SECONDS_PER_DAY)
+        disagreements = [
+            (lead_id, day, now, live_version, candidate_version,
+             live_status, live_score, candidate_status, candidate_score, int(canary))
+            for (lead_id, live_version, candidate_version, live_status, live_score,
+                 candidate_status, candidate_score, canary) in comparisons
+            if live_status != candidate_status or abs(candidate_score - live_score) >= min_score_delta
+        ]
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT INTO shadow_rollup (day, live_version, candidate_version, live_status,"
+                    " candidate_status, leads, score_delta_sum, abs_score_delta_sum)"
+                    " VALUES (?, ?, ?, ?, ?, 1, ?, ?)"
+                    " ON CONFLICT (day, live_version, candidate_version, live_status, candidate_status)"
+                    " DO UPDATE SET leads = leads + 1,"
+                    " score_delta_sum = score_delta_sum + excluded.score_delta_sum,"
+                    " abs_score_delta_sum = abs_score_delta_sum + excluded.abs_score_delta_sum",
+                    [(day, c[1], c[2], c[3], c[5], c[6] - c[4], abs(c[6] - c[4])) for c in comparisons]
+                )
+                self._db.executemany(
+                    "INSERT INTO shadow_disagreements (lead_id, day, scored_at, live_version,"
+                    " candidate_version, live_status, live_score, candidate_status,"
+                    " candidate_score, canary) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    disagreements
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def shadow_report(self, days: int = 7, examples: int = 20) -> Dict[str, Any]:
+        """Agreement of each candidate model with the live one, from the shadow rollup"""
+        since = int(time.time() // SECONDS_PER_DAY) - days + 1
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT live_version, candidate_version, live_status, candidate_status,"
+                " SUM(leads), SUM(score_delta_sum), SUM(abs_score_delta_sum)"
+                " FROM shadow_rollup WHERE day >= ?"
+                " GROUP BY live_version, candidate_version, live_status, candidate_status",
+                (since,)
+            ).fetchall()
+            recent = self._db.execute(
+                "SELECT lead_id, scored_at, live_version, candidate_version, live_status,"
+                " live_score, candidate_status, candidate_score, canary"
+                " FROM shadow_disagreements WHERE day >= ? ORDER BY scored_at DESC LIMIT ?",
+                (since, examples)
+            ).fetchall()
+
+        pairs: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for live_version, candidate_version, live_status, candidate_status, leads, delta, abs_delta in rows:
+            pair = pairs.setdefault((live_version, candidate_version), {
+                "live_version": live_version,
+                "candidate_version": candidate_version,
+                "leads": 0,
+                "same_status": 0,
+                "score_delta_sum": 0.0,
+                "abs_score_delta_sum": 0.0,
+                "status_matrix": {}
+            })
+            pair["leads"] += leads
+            pair["same_status"] += leads if live_status == candidate_status else 0
+            pair["score_delta_sum"] += delta
+            pair["abs_score_delta_sum"] += abs_delta
+            pair["status_matrix"].setdefault(live_status, {})[candidate_status] = leads
+
+        comparisons = []
+        for pair in pairs.values():
+            leads = pair["leads"]
+            comparisons.append({
+                "live_version": pair["live_version"],
+                "candidate_version": pair["candidate_version"],
+                "leads": leads,
+                "status_agreement": pair["same_status"] / leads,
+                "mean_score_delta": pair["score_delta_sum"] / leads,
+                "mean_abs_score_delta": pair["abs_score_delta_sum"] / leads,
+                # live status -> candidate status -> leads
+                "status_matrix": pair["status_matrix"]
+            })
+
+        columns = ("lead_id", "scored_at", "live_version", "candidate_version", "live_status",
+                   "live_score", "candidate_status", "candidate_score", "canary")
+        return {
+            "days": days,
+            "comparisons": comparisons,
+            "recent_disagreements": [
+                {**dict(zip(columns, row)), "canary": bool(row[-1])} for row in recent
+            ]
+        }
+
+    @staticmethod
+    def _calibration(buckets: List[List[float]]) -> List[Dict[str, Any]]:
+        """Mean predicted probability against observed rate per score decile"""
+        return [
+            {
+                "bucket": f"{bucket * 100 // SCORE_BUCKETS}-{(bucket + 1) * 100 // SCORE_BUCKETS}",
+                "leads": leads,
+                "predicted": score_sum / leads / 100,
+                "observed": conversions / leads
+            }
+            for bucket, (leads, conversions, score_sum) in enumerate(buckets)
+            if leads
+        ]
+
+    @staticmethod
+    def _lift(buckets: List[List[float]]) -> List[Dict[str, Any]]:
+        """Cumulative gains and lift, working down from the highest scores"""
+        total_leads = sum(b[0] for b in buckets)
+        total_conversions = sum(b[1] for b in buckets)
+        base_rate = total_conversions / total_leads if total_leads else 0.0
+
+        curve, leads_so_far, conversions_so_far = [], 0, 0
+        for bucket in reversed(range(SCORE_BUCKETS)):
+            leads, conversions, _ = buckets[bucket]
+            if not leads:
+                continue
+            leads_so_far += leads
+            conversions_so_far += conversions
+            rate = conversions_so_far / leads_so_far
+            curve.append({
+                "min_score": bucket * 100 // SCORE_BUCKETS,
+                "share_of_leads": leads_so_far / total_leads,
+                "share_of_conversions": conversions_so_far / total_conversions if total_conversions else 0.0,
+                "lift": rate / base_rate if base_rate else 0.0
+            })
+        return curve
+
+    def labeled_since(self, since: float) -> Dict[str, np.ndarray]:
+        """Leads whose outcome was recorded after `since`, as columns.
+
+        Returns lead_id, the INPUT_COLUMNS metrics, converted and
+        outcome_recorded_at arrays, read through the outcome_recorded_at
+        index so a retraining run only pulls what is new since its last
+        pull. Filtering on recording time rather than outcome_at means a
+        conversion reported late, with an earlier date, is still pulled.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT lead_id, {', '.join(INPUT_COLUMNS)}, converted, outcome_recorded_at"
+                " FROM scored_leads WHERE outcome_recorded_at > ? ORDER BY outcome_recorded_at",
+                (since,)
+            ).fetchall()
+
+        columns = list(zip(*rows)) or [()] * (len(INPUT_COLUMNS) + 3)
+        batch = {"lead_id": np.array(columns[0], dtype=object)}
+        for i, name in enumerate(INPUT_COLUMNS, start=1):
+            batch[name] = np.array(columns[i], dtype=np.int64)
+        batch["converted"] = np.array(columns[-2], dtype=np.int8)
+        batch["outcome_recorded_at"] = np.array(columns[-1], dtype=np.float64)
+        return batch
+
+    def recent_metrics(self, since: float, limit: int = 50000) -> Dict[str, np.ndarray]:
+        """Engagement metrics of the latest leads scored after `since`, as columns"""
+        since_day = int(since // SECONDS_PER_DAY)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(INPUT_COLUMNS)} FROM scored_leads"
+                " WHERE day >= ? AND scored_at > ? ORDER BY day DESC LIMIT ?",
+                (since_day, since, limit)
+            ).fetchall()
+        matrix = np.array(rows, dtype=np.int64).reshape(-1, len(INPUT_COLUMNS))
+        return {name: matrix[:, i] for i, name in enumerate(INPUT_COLUMNS)}
+
+    def stats(self) -> Dict[str, int]:
+        # From the rollup, so /health never counts raw events
+        with self._lock:
+            leads, conversions = self._db.execute(
+                "SELECT COALESCE(SUM(leads), 0), COALESCE(SUM(conversions), 0) FROM daily_rollup"
+            ).fetchone()
+        return {"scored_leads": leads, "conversions": conversions}
+
+# Create singleton instance when an analytics path is configured
+analytics_store = AnalyticsStore.from_env()
\ No newline at end of file
@@ -0,0 +1,293 @@
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Optional, Tuple
+import json
+import struct
+import threading
+import numpy as np
+
+MAGIC = b"LEADFRST"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+class _Workspace:
+    """Preallocated buffers for scoring up to `capacity` rows at once"""
+
+    def __init__(self, capacity: int, num_features: int, num_trees: int):
+        self.capacity = capacity
+        self.raw = np.zeros((capacity, num_features), dtype=np.float64)
+        self.rounded = np.zeros((capacity, num_features), dtype=np.float32)
+        self.nodes = np.zeros((capacity, num_trees), dtype=np.intp)
+        self.index = np.zeros((capacity, num_trees), dtype=np.intp)
+        self.row_offsets = np.repeat(
+            np.arange(capacity, dtype=np.intp)[:, None] * num_features, num_trees, axis=1
+        )
+        self.values = np.zeros((capacity, num_trees), dtype=np.float64)
+        self.thresholds = np.zeros((capacity, num_trees), dtype=np.float64)
+        self.go_right = np.zeros((capacity, num_trees), dtype=np.bool_)
+        self.out = np.zeros(capacity, dtype=np.float64)
+
+class CompiledForest:
+    """A fitted forest and scaler flattened into array-backed node tables.
+
+    All trees share one set of node arrays. Leaves point to themselves, so
+    every row takes exactly `depth` vectorized steps whatever its path.
+    Scoring reuses per-thread buffers instead of allocating per call.
+    Probabilities match `predict_proba(...)[:, 1]` to within float
+    rounding of the final average.
+
+    Saved with `save()`, the tables load with NumPy alone, so a process
+    that only scores never has to import sklearn, and are memory-mapped
+    so uvicorn workers share them.
+    """
+
+    ARRAYS = ("feature", "threshold", "children", "leaf_value", "roots", "mean", "scale")
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children: np.ndarray,
+        leaf_value: np.ndarray,
+        roots: np.ndarray,
+        depth: int,
+        num_features: int,
+        mean: Optional[np.ndarray] = None,
+        scale: Optional[np.ndarray] = None,
+        model_version: Optional[str] = None
+    ):
+        self.feature = feature.astype(np.intp, copy=False)
+        self.threshold = threshold
+        self.children = children.astype(np.intp, copy=False)
+        self.leaf_value = leaf_value
+        self.roots = roots.astype(np.intp, copy=False)
+        self.depth = depth
+        self.num_trees = len(roots)
+        self.num_features = num_features
+        self.mean = mean
+        self.scale = scale
+        self.model_version = model_version
+        self._local = threading.local()
+
+    @classmethod
+    def compile(cls, model: Any, scaler: Optional[Any]) -> Optional["CompiledForest"]:
+        """Compile a binary forest classifier, or return None if unsupported"""
+        from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+        from sklearn.preprocessing import StandardScaler
+
+        if type(model) not in (RandomForestClassifier, ExtraTreesClassifier):
+            return None
+        if not hasattr(model, "estimators_"):
+            return None
+        if getattr(model, "n_outputs_", 1) != 1 or len(model.classes_) != 2:
+            return None
+        if scaler is not None and (
+            type(scaler) is not StandardScaler
+            or scaler.n_features_in_ != model.n_features_in_
+        ):
+            return None
+        return cls.from_model(model, scaler)
+
+    @classmethod
+    def from_model(cls, model: Any, scaler: Optional[Any]) -> "CompiledForest":
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        num_features = int(model.n_features_in_)
+
+        sizes = [tree.node_count for tree in trees]
+        roots = np.cumsum([0] + sizes[:-1]).astype(np.intp)
+
+        num_nodes = sum(sizes)
+        feature = np.zeros(num_nodes, dtype=np.intp)
+        threshold = np.full(num_nodes, np.inf, dtype=np.float64)
+        # children[2 * node] is the left child, children[2 * node + 1] the right
+        children = np.zeros(2 * num_nodes, dtype=np.intp)
+        # Class-1 value of every node; internal ones are used for explanations
+        leaf_value = np.zeros(num_nodes, dtype=np.float64)
+
+        for root, tree in zip(roots, trees):
+            nodes = np.arange(tree.node_count, dtype=np.intp)
+            is_leaf = tree.children_left == -1
+            split = ~is_leaf
+            feature[root + nodes[split]] = tree.feature[split]
+            threshold[root + nodes[split]] = tree.threshold[split]
+            children[2 * (root + nodes)] = np.where(is_leaf, nodes, tree.children_left) + root
+            children[2 * (root + nodes) + 1] = np.where(is_leaf, nodes, tree.children_right) + root
+
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :]
+            normalizer = value.sum(axis=1)
+            normalizer[normalizer == 0.0] = 1.0
+            leaf_value[root + nodes] = value[:, 1] / normalizer
+
+        mean = scale = None
+        if scaler is not None:
+            mean = scaler.mean_ if scaler.with_mean else np.zeros(num_features)
+            scale = scaler.scale_ if scaler.with_std else np.ones(num_features)
+
+        return cls(
+            feature, threshold, children, leaf_value, roots,
+            depth=max(tree.max_depth for tree in trees),
+            num_features=num_features,
+            mean=mean,
+            scale=scale,
+            model_version=getattr(model, "model_version_", None)
+        )
+
+    def save(self, f: BinaryIO):
+        """Write the tables in the flat file format read by `load()`.
+
+        Layout: MAGIC, a little-endian u64 header length, a JSON header,
+        then each array's raw bytes at a 64-byte aligned offset so it can
+        be memory-mapped in place.
+        """
+        arrays = {
+            name: np.ascontiguousarray(getattr(self, name)) for name in self.ARRAYS
+            if getattr(self, name) is not None
+        }
+        entries, offset = {}, 0
+        for name, array in arrays.items():
+            entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += _aligned(array.nbytes)
+
+        header = json.dumps({
+            "format": FORMAT_VERSION,
+            "model_version": self.model_version,
+            "depth": self.depth,
+            "num_features": self.num_features,
+            "arrays": entries
+        }).encode()
+        prefix = len(MAGIC) + 8 + len(header)
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(b"\0" * (_aligned(prefix) - prefix))
+        for array in arrays.values():
+            f.write(array.tobytes())
+            f.write(b"\0" * (_aligned(array.nbytes) - array.nbytes))
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "CompiledForest":
+        """Read a saved forest, by default memory-mapping its arrays.
+
+        Mapped pages come from the OS page cache, so every process that
+        loads the same file shares one copy of the tables. Publishers must
+        replace the file by rename, never rewrite it in place.
+        """
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a compiled forest file")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len))
+        if header["format"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled forest format: {header['format']}")
+
+        data_start = _aligned(len(MAGIC) + 8 + header_len)
+        arrays = {}
+        for name, entry in header["arrays"].items():
+            dtype = np.dtype(entry["dtype"])
+            shape = tuple(entry["shape"])
+            offset = data_start + entry["offset"]
+            if mmap:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+            else:
+                arrays[name] = np.fromfile(
+                    path, dtype=dtype, count=int(np.prod(shape)), offset=offset
+                ).reshape(shape)
+
+        return cls(
+            depth=header["depth"],
+            num_features=header["num_features"],
+            model_version=header["model_version"],
+            **arrays
+        )
+
+    def predict_one(self, fill: Callable[[Any, np.ndarray], None], source: Any) -> float:
+        """Score one row written in place by `fill(source, row)`"""
+        workspace = self._workspace(1)
+        fill(source, workspace.raw[0])
+        return float(self._score(workspace, 1)[0])
+
+    def predict_batch(self, features: np.ndarray) -> np.ndarray:
+        """Score an (n, num_features) matrix of unscaled features"""
+        n = len(features)
+        workspace = self._workspace(n)
+        np.copyto(workspace.raw[:n], features)
+        return self._score(workspace, n).copy()
+
+    def explain_batch(self, features: np.ndarray) -> Tuple[float, np.ndarray]:
+        """Per-feature contributions to the scores of unscaled features.
+
+        Saabas tree-path attribution: walking each row down each tree, the
+        change in the node's class-1 value at every split is credited to
+        the split's feature. Returns the forest's mean root value and an
+        (n, num_features) matrix, averaged over trees, so each row's
+        contributions plus the baseline equal its `predict_batch` score.
+        """
+        x = np.asarray(features, dtype=np.float64)
+        if self.mean is not None:
+            x = (x - self.mean) / self.scale
+        # Same float32 rounding of inputs as scoring
+        flat = x.astype(np.float32).astype(np.float64).reshape(-1)
+
+        n = len(x)
+        row_offsets = np.arange(n, dtype=np.intp)[:, None] * self.num_features
+        nodes = np.repeat(self.roots[None, :], n, axis=0)
+        contributions = np.zeros(n * self.num_features)
+        # Leaves point to themselves, so steps past a leaf add nothing
+        for _ in range(self.depth):
+            index = self.feature[nodes] + row_offsets
+            go_right = flat[index] > self.threshold[nodes]
+            children = self.children[2 * nodes + go_right]
+            delta = self.leaf_value[children] - self.leaf_value[nodes]
+            contributions += np.bincount(
+                index.reshape(-1), weights=delta.reshape(-1), minlength=len(contributions)
+            )
+            nodes = children
+
+        baseline = float(np.mean(self.leaf_value[self.roots]))
+        return baseline, contributions.reshape(n, self.num_features) / self.num_trees
+
+    def _workspace(self, rows: int) -> _Workspace:
+        workspace = getattr(self._local, "workspace", None)
+        if workspace is None or workspace.capacity < rows:
+            capacity = max(rows, 2 * workspace.capacity if workspace else 1)
+            workspace = _Workspace(capacity, self.num_features, self.num_trees)
+            self._local.workspace = workspace
+        return workspace
+
+    def _score(self, workspace: _Workspace, n: int) -> np.ndarray:
+        raw = workspace.raw[:n]
+        rounded = workspace.rounded[:n]
+        nodes = workspace.nodes[:n]
+        index = workspace.index[:n]
+        row_offsets = workspace.row_offsets[:n]
+        values = workspace.values[:n]
+        thresholds = workspace.thresholds[:n]
+        go_right = workspace.go_right[:n]
+        out = workspace.out[:n]
+
+        if self.mean is not None:
+            np.subtract(raw, self.mean, out=raw)
+            np.divide(raw, self.scale, out=raw)
+        # Trees compare float32 inputs against float64 thresholds
+        np.copyto(rounded, raw, casting="same_kind")
+        np.copyto(raw, rounded)
+
+        flat = workspace.raw.reshape(-1)
+        np.copyto(nodes, self.roots)
+        for _ in range(self.depth):
+            np.take(self.feature, nodes, out=index)
+            np.add(index, row_offsets, out=index)
+            np.take(flat, index, out=values)
+            np.take(self.threshold, nodes, out=thresholds)
+            np.greater(values, thresholds, out=go_right)
+            np.multiply(nodes, 2, out=index)
+            np.add(index, go_right, out=index, casting="unsafe")
+            np.take(self.children, index, out=nodes)
+
+        np.take(self.leaf_value, nodes, out=values)
+        np.sum(values, axis=1, out=out)
+        np.divide(out, self.num_trees, out=out)
+        return out
\ No newline at end of file
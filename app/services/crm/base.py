@@ -1,10 +1,249 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
-from ...models import Lead
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Any, Callable, ClassVar, List, Mapping, NamedTuple, Optional, Tuple
+import asyncio
+import os
+import time
+from .resilience import AdaptiveRateLimiter, CircuitBreaker, CRMUnavailable, OUTAGE_RETRY_DELAY, retry_after_seconds
+from ..features import INPUT_COLUMNS
+from ...models import Lead, ScoreExplanation
+from ...utils.metrics import crm_call_errors, crm_call_rejections, crm_call_seconds
+
+DEFAULT_MAX_CONCURRENCY = 10
+
+# Account of the CRM configured through the process environment
+DEFAULT_ACCOUNT = "default"
+
+# Errors that mean the CRM could not be reached, rather than a bad request
+CONNECTION_ERRORS = (OSError, asyncio.TimeoutError)
+
+# Times a throttled call is retried in place before it is handed back
+THROTTLE_RETRIES = 2
+
+def format_explanation(explanation: ScoreExplanation) -> str:
+    """A score explanation as CRM text, largest contributions first"""
+    terms = sorted(explanation.contributions.items(), key=lambda item: -abs(item[1]))
+    return ", ".join(
+        [f"{name} {value:+.1f}" for name, value in terms] + [f"baseline {explanation.baseline:.1f}"]
+    )
+
+class ScoreUpdate(NamedTuple):
+    """A new score for an existing lead, written by `CRMAdapter.update_scores`"""
+    record_id: Optional[str]  # None: find the lead by email
+    email: str
+    status: str
+    score: int
+
+def latest_by_email(leads: List[Lead]) -> Tuple[List[Lead], List[int]]:
+    """Collapse leads sharing an email, case-insensitively, to the last one given.
+
+    Returns the distinct leads, in order of first appearance, and for
+    each input lead the position of the distinct lead that covers it.
+    Batch writes need this: HubSpot rejects a whole batch upsert over a
+    duplicate id, and Salesforce would create the lead twice.
+    """
+    positions: Dict[str, int] = {}
+    distinct: List[Lead] = []
+    covered_by = []
+    for lead in leads:
+        email = lead.email.lower()
+        if email in positions:
+            distinct[positions[email]] = lead
+        else:
+            positions[email] = len(distinct)
+            distinct.append(lead)
+        covered_by.append(positions[email])
+    return distinct, covered_by
+
+def _number(value: Any) -> float:
+    return float(value) if value not in (None, "") else 0.0
+
+def rescore_record(
+    record_id: Optional[str],
+    email: str,
+    status: Optional[str],
+    score: Any,
+    metrics: Mapping[str, Any]
+) -> Dict[str, Any]:
+    """An existing lead as read for rescoring: id, email, current status and
+    score (None when unset) and the INPUT_COLUMNS metrics as numbers"""
+    return {
+        "id": record_id,
+        "email": email,
+        "status": status.capitalize() if status else None,
+        "score": round(float(score)) if score not in (None, "") else None,
+        **{name: _number(metrics.get(name)) for name in INPUT_COLUMNS}
+    }
 
 class CRMAdapter(ABC):
     """Base CRM adapter class that defines the interface for CRM integrations"""
-    
+
+    # Name used for per-CRM settings, e.g. HUBSPOT_MAX_CONCURRENCY
+    crm_name: ClassVar[str] = "crm"
+
+    # Calls per second when <CRM>_RATE_LIMIT / CRM_RATE_LIMIT are unset (0: no limit)
+    default_rate_limit: ClassVar[float] = 0.0
+
+    # One bounded executor and HTTP connection pool per CRM, shared by
+    # every adapter instance; one rate limiter and circuit breaker per
+    # CRM account, since limits and credentials are per account
+    _executors: ClassVar[Dict[str, ThreadPoolExecutor]] = {}
+    _http_pools: ClassVar[Dict[str, Any]] = {}
+    _rate_limiters: ClassVar[Dict[Tuple[str, str], AdaptiveRateLimiter]] = {}
+    _circuit_breakers: ClassVar[Dict[Tuple[str, str], CircuitBreaker]] = {}
+
+    def __init__(self, settings: Optional[Mapping[str, str]] = None, account: str = DEFAULT_ACCOUNT):
+        # Credentials and endpoints: a tenant's own, or the process environment
+        self.settings = os.environ if settings is None else settings
+        self.account = account
+        # Store explanations of leads scored with ?explain=true
+        self.write_explanation = self.setting("WRITE_EXPLANATION", "false").lower() == "true"
+
+    @property
+    def identity_namespace(self) -> str:
+        """Identity cache namespace, so accounts never share record ids"""
+        if self.account == DEFAULT_ACCOUNT:
+            return self.crm_name
+        return f"{self.crm_name}:{self.account}"
+
+    @classmethod
+    def env_setting(cls, name: str, default: Any) -> str:
+        """Per-CRM setting from the process environment, e.g. HUBSPOT_RATE_LIMIT,
+        falling back to CRM_RATE_LIMIT; for what every account shares"""
+        return os.getenv(f"{cls.crm_name.upper()}_{name}", os.getenv(f"CRM_{name}", str(default)))
+
+    def setting(self, name: str, default: Any) -> str:
+        """Per-CRM setting from this account's settings, then the environment"""
+        for key in (f"{self.crm_name.upper()}_{name}", f"CRM_{name}"):
+            if key in self.settings:
+                return self.settings[key]
+        return self.env_setting(name, default)
+
+    def explanation_text(self, lead: Lead) -> Optional[str]:
+        if not self.write_explanation or lead.explanation is None:
+            return None
+        return format_explanation(lead.explanation)
+
+    @classmethod
+    def max_concurrency(cls) -> int:
+        """Maximum number of in-flight calls to this CRM"""
+        return int(cls.env_setting("MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+
+    @classmethod
+    def executor(cls) -> ThreadPoolExecutor:
+        if cls.crm_name not in CRMAdapter._executors:
+            CRMAdapter._executors[cls.crm_name] = ThreadPoolExecutor(
+                max_workers=cls.max_concurrency(),
+                thread_name_prefix=f"{cls.crm_name}-crm"
+            )
+        return CRMAdapter._executors[cls.crm_name]
+
+    @classmethod
+    def http_pool(cls, build: Callable[[], Any]) -> Any:
+        """The CRM's shared HTTP connection pool, built on first use"""
+        if cls.crm_name not in CRMAdapter._http_pools:
+            CRMAdapter._http_pools[cls.crm_name] = build()
+        return CRMAdapter._http_pools[cls.crm_name]
+
+    def rate_limiter(self) -> AdaptiveRateLimiter:
+        key = (self.crm_name, self.account)
+        if key not in CRMAdapter._rate_limiters:
+            CRMAdapter._rate_limiters[key] = AdaptiveRateLimiter(
+                self.crm_name,
+                rate=float(self.setting("RATE_LIMIT", self.default_rate_limit)),
+                burst=float(self.setting("RATE_BURST", 0)) or None,
+                max_wait=float(self.setting("RATE_MAX_WAIT", 10))
+            )
+        return CRMAdapter._rate_limiters[key]
+
+    def circuit_breaker(self) -> CircuitBreaker:
+        key = (self.crm_name, self.account)
+        if key not in CRMAdapter._circuit_breakers:
+            CRMAdapter._circuit_breakers[key] = CircuitBreaker(
+                self.crm_name,
+                failure_threshold=int(self.setting("BREAKER_THRESHOLD", 5)),
+                reset_timeout=float(self.setting("BREAKER_RESET_SECONDS", 30))
+            )
+        return CRMAdapter._circuit_breakers[key]
+
+    def resilience_stats(self) -> Dict[str, Any]:
+        return {
+            "circuit_breaker": self.circuit_breaker().stats(),
+            "rate_limiter": self.rate_limiter().stats()
+        }
+
+    def _throttle_delay(self, error: Exception) -> Optional[float]:
+        """Seconds to back off if `error` is the CRM throttling us, else None"""
+        if getattr(error, "status", None) == 429:
+            return retry_after_seconds(getattr(error, "headers", None))
+        return None
+
+    def _is_outage(self, error: Exception) -> bool:
+        """Whether `error` means the CRM is down, as opposed to rejecting one request"""
+        status = getattr(error, "status", None)
+        return isinstance(error, CONNECTION_ERRORS) or (isinstance(status, int) and status >= 500)
+
+    async def _run(self, operation: str, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking CRM SDK call on the CRM's thread pool.
+
+        Keeps the event loop free while the request is in flight; calls
+        beyond the concurrency limit wait in the executor queue. Calls
+        first pass the CRM's rate limiter and circuit breaker, which raise
+        CRMUnavailable rather than wait on a throttled or failing CRM. A
+        call the CRM throttles is retried once its Retry-After has passed,
+        if that is within the limiter's max wait. Connection errors and 5xx
+        responses also raise CRMUnavailable, so callers retry them later
+        rather than count the lead as failed. Latency (including the
+        waits) and errors are recorded per `operation`.
+        """
+        limiter = self.rate_limiter()
+        start = time.perf_counter()
+        try:
+            for attempt in range(THROTTLE_RETRIES + 1):
+                try:
+                    return await self._attempt(operation, func, *args, **kwargs)
+                except CRMUnavailable as e:
+                    crm_call_rejections.inc(crm=self.crm_name, reason=e.reason)
+                    if e.reason != "throttled" or attempt == THROTTLE_RETRIES or e.retry_after > limiter.max_wait:
+                        raise
+        finally:
+            crm_call_seconds.observe(
+                time.perf_counter() - start, crm=self.crm_name, operation=operation
+            )
+
+    async def _attempt(self, operation: str, func: Callable, *args, **kwargs) -> Any:
+        limiter, breaker = self.rate_limiter(), self.circuit_breaker()
+        await limiter.acquire()
+        breaker.allow()
+
+        healthy = None
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self.executor(), partial(func, *args, **kwargs)
+            )
+            healthy = True
+            limiter.succeed()
+            return result
+        except Exception as e:
+            crm_call_errors.inc(crm=self.crm_name, operation=operation)
+            # A throttled or rejected request still shows the CRM is up
+            healthy = not self._is_outage(e)
+            delay = self._throttle_delay(e)
+            if delay is not None:
+                limiter.throttle(delay)
+                raise CRMUnavailable(self.crm_name, "throttled", delay) from e
+            if not healthy:
+                raise CRMUnavailable(self.crm_name, "outage", OUTAGE_RETRY_DELAY) from e
+            raise
+        finally:
+            if healthy is None:
+                breaker.release()  # cancelled
+            elif healthy:
+                breaker.succeed()
+            else:
+                breaker.fail()
+
     @abstractmethod
     async def update_lead(self, lead: Lead) -> bool:
         """Update or create a lead in the CRM"""
@@ -18,4 +257,35 @@ class CRMAdapter(ABC):
     @abstractmethod
     async def create_task(self, lead: Lead) -> bool:
         """Create a follow-up task in CRM"""
-        pass 
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def bulk_update_leads(self, leads: List[Lead]) -> List[bool]:
+        """Upsert many leads, plus tasks for hot leads, in as few calls as possible.
+
+        Returns one success flag per lead, in input order.
+        """
+        pass
+
+    @abstractmethod
+    async def query_leads(
+        self,
+        page_size: int,
+        after: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of existing leads, as `rescore_record`s, in a stable order.
+
+        Returns the page and the cursor to pass as `after` for the next
+        one, or None after the last page. Cursors are plain strings, so a
+        bulk job can store them and resume.
+        """
+        pass
+
+    @abstractmethod
+    async def update_scores(self, updates: List[ScoreUpdate]) -> List[bool]:
+        """Write new scores and statuses to existing leads, in as few calls as possible.
+
+        Touches only the score fields and never creates leads. Returns
+        one success flag per update, in input order.
+        """
+        pass
\ No newline at end of file
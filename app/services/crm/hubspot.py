@@ -1,54 +1,155 @@
 import hubspot
-from hubspot.crm.contacts import SimplePublicObjectInput
+from hubspot.crm.contacts import (
+    SimplePublicObjectInput,
+    SimplePublicObjectInputForCreate,
+    BatchInputSimplePublicObjectBatchInputUpsert,
+    SimplePublicObjectBatchInputUpsert,
+    BatchInputSimplePublicObjectBatchInput,
+    SimplePublicObjectBatchInput,
+    BatchReadInputSimplePublicObjectId,
+    SimplePublicObjectId
+)
+from hubspot.crm.objects.tasks import (
+    SimplePublicObjectInputForCreate as TaskInputForCreate,
+    BatchInputSimplePublicObjectBatchInputForCreate as TaskBatchInput,
+    SimplePublicObjectBatchInputForCreate as TaskBatchInputForCreate,
+    PublicAssociationsForObject,
+    PublicObjectId,
+    AssociationSpec
+)
 from hubspot.crm.contacts.exceptions import ApiException
-from typing import Dict, Any
-import os
-from .base import CRMAdapter
+from typing import Dict, Any, List, Mapping, Optional, Tuple
+import urllib3
+from .base import CRMAdapter, DEFAULT_ACCOUNT, ScoreUpdate, latest_by_email, rescore_record
+from .identity_cache import CRMIdentityCache
+from .resilience import CRMUnavailable, DAILY_LIMIT_PAUSE
+from ..features import INPUT_COLUMNS
 from ...models import Lead
+from ...utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# HubSpot accepts at most 100 inputs per batch call, and lists 100 records per page
+BATCH_LIMIT = 100
+
+# Contact properties read for rescoring
+RESCORE_PROPERTIES = ("email", "lead_status", "lead_score") + INPUT_COLUMNS
+
+# HubSpot-defined association type for task -> contact
+TASK_TO_CONTACT_ASSOCIATION = 204
 
 class HubSpotAdapter(CRMAdapter):
-    def __init__(self):
-        self.client = hubspot.Client.create(
-            access_token=os.getenv("HUBSPOT_API_KEY")
-        )
+    crm_name = "hubspot"
+
+    # HubSpot's lowest tier allows 100 calls per 10 seconds
+    default_rate_limit = 10.0
+
+    def __init__(self, settings: Optional[Mapping[str, str]] = None, account: str = DEFAULT_ACCOUNT):
+        super().__init__(settings, account)
+        client_config = {
+            "access_token": self.settings.get("HUBSPOT_API_KEY"),
+            # Size the HTTP pool to the number of concurrent calls we allow
+            "connection_pool_maxsize": self.max_concurrency()
+        }
+        if self.settings.get("HUBSPOT_API_HOST"):
+            client_config["host"] = self.settings.get("HUBSPOT_API_HOST")
+        self.client = hubspot.Client.create(**client_config)
+
+        # Every `basic_api` access builds a new ApiClient with its own
+        # connection pool, so build them once. The token travels in each
+        # request's headers, so all of them, for every account, share the
+        # first one's keep-alive pool
+        self.contacts_api = self.client.crm.contacts.basic_api
+        self.tasks_api = self.client.crm.objects.tasks.basic_api
+        self.contacts_batch_api = self.client.crm.contacts.batch_api
+        self.tasks_batch_api = self.client.crm.objects.tasks.batch_api
+        pool = self.http_pool(lambda: self.contacts_api.api_client.rest_client.pool_manager)
+        for api in (self.contacts_api, self.tasks_api, self.contacts_batch_api, self.tasks_batch_api):
+            api.api_client.rest_client.pool_manager = pool
+
+        self.identity_cache = CRMIdentityCache.from_env(self.identity_namespace)
+
+    def _throttle_delay(self, error: Exception) -> Optional[float]:
+        delay = super()._throttle_delay(error)
+        # 429s name the exhausted policy: DAILY, or a rolling secondly window
+        if delay is not None and "DAILY" in str(getattr(error, "body", "") or ""):
+            return DAILY_LIMIT_PAUSE
+        return delay
+
+    def _is_outage(self, error: Exception) -> bool:
+        return super()._is_outage(error) or isinstance(error, urllib3.exceptions.HTTPError)
+
+    def _contact_properties(self, lead: Lead) -> Dict[str, str]:
+        properties = {
+            "email": lead.email,
+            "firstname": lead.name.split()[0],
+            "lastname": lead.name.split()[-1] if len(lead.name.split()) > 1 else "",
+            "company": lead.company,
+            "lead_source": lead.source,
+            "lead_score": str(lead.score),
+            "lead_status": lead.status.lower(),
+            "website_visits": str(lead.engagement_metrics.website_visits),
+            "time_on_site": str(lead.engagement_metrics.time_on_site),
+            "pages_viewed": str(lead.engagement_metrics.pages_viewed),
+            "downloaded_resources": str(lead.engagement_metrics.downloaded_resources),
+            "email_interactions": str(lead.engagement_metrics.email_interactions)
+        }
+        explanation = self.explanation_text(lead)
+        if explanation is not None:
+            properties["lead_score_explanation"] = explanation
+        return properties
+
+    def _task_properties(self, lead: Lead) -> Dict[str, str]:
+        return {
+            "hs_task_subject": f"Follow up with {lead.name} (Hot Lead)",
+            "hs_task_priority": "HIGH",
+            "hs_task_status": "NOT_STARTED",
+            "hs_task_type": "SALES_OUTREACH",
+            "hs_timestamp": str(int(lead.created_at.timestamp() * 1000))
+        }
 
     async def update_lead(self, lead: Lead) -> bool:
         try:
             # Prepare lead properties
-            properties = {
-                "email": lead.email,
-                "firstname": lead.name.split()[0],
-                "lastname": lead.name.split()[-1] if len(lead.name.split()) > 1 else "",
-                "company": lead.company,
-                "lead_source": lead.source,
-                "lead_score": str(lead.score),
-                "lead_status": lead.status.lower(),
-                "website_visits": str(lead.engagement_metrics["website_visits"]),
-                "time_on_site": str(lead.engagement_metrics["time_on_site"]),
-                "pages_viewed": str(lead.engagement_metrics["pages_viewed"]),
-                "downloaded_resources": str(lead.engagement_metrics["downloaded_resources"]),
-                "email_interactions": str(lead.engagement_metrics["email_interactions"])
-            }
-
-            # Check if contact exists
-            try:
-                contact = self.client.crm.contacts.basic_api.get_by_id(
-                    contact_id=lead.email
-                )
-                # Update existing contact
-                self.client.crm.contacts.basic_api.update(
-                    contact_id=contact.id,
-                    simple_public_object_input=SimplePublicObjectInput(
-                        properties=properties
+            properties = self._contact_properties(lead)
+
+            # Known contacts are updated directly, skipping the lookup
+            contact_id = self.identity_cache.get(lead.email)
+            if contact_id:
+                try:
+                    await self._update_contact(contact_id, properties)
+                except ApiException as e:
+                    if e.status != 404:
+                        raise
+                    # Deleted or merged in HubSpot since we cached it
+                    self.identity_cache.invalidate(lead.email)
+                    contact_id = None
+
+            if not contact_id:
+                # Check if contact exists
+                try:
+                    contact = await self._run(
+                        "get_contact",
+                        self.contacts_api.get_by_id,
+                        contact_id=lead.email,
+                        id_property="email"
                     )
-                )
-            except ApiException:
-                # Create new contact
-                self.client.crm.contacts.basic_api.create(
-                    simple_public_object_input=SimplePublicObjectInput(
-                        properties=properties
+                    # Update existing contact
+                    await self._update_contact(contact.id, properties)
+                    contact_id = contact.id
+                except ApiException as e:
+                    if e.status != 404:
+                        raise
+                    # Create new contact
+                    contact = await self._run(
+                        "create_contact",
+                        self.contacts_api.create,
+                        simple_public_object_input_for_create=SimplePublicObjectInputForCreate(
+                            properties=properties
+                        )
                     )
-                )
+                    contact_id = contact.id
+                self.identity_cache.set(lead.email, contact_id)
 
             # Create task for hot leads
             if lead.status == "Hot":
@@ -56,35 +157,208 @@ class HubSpotAdapter(CRMAdapter):
 
             return True
 
+        except CRMUnavailable:
+            raise
         except Exception as e:
-            print(f"HubSpot Error: {str(e)}")
+            logger.error("HubSpot error", extra={"lead_id": lead.id, "error": str(e)})
             return False
 
+    async def _update_contact(self, contact_id: str, properties: Dict[str, str]):
+        await self._run(
+            "update_contact",
+            self.contacts_api.update,
+            contact_id=contact_id,
+            simple_public_object_input=SimplePublicObjectInput(
+                properties=properties
+            )
+        )
+
     async def get_lead(self, email: str) -> Dict[str, Any]:
         try:
-            contact = self.client.crm.contacts.basic_api.get_by_id(
-                contact_id=email
+            contact = await self._run(
+                "get_contact",
+                self.contacts_api.get_by_id,
+                contact_id=email,
+                id_property="email"
             )
+            self.identity_cache.set(email, contact.id)
             return contact.properties
         except ApiException:
+            self.identity_cache.invalidate(email)
             return {}
 
     async def create_task(self, lead: Lead) -> bool:
         try:
-            task_properties = {
-                "hs_task_subject": f"Follow up with {lead.name} (Hot Lead)",
-                "hs_task_priority": "HIGH",
-                "hs_task_status": "NOT_STARTED",
-                "hs_task_type": "SALES_OUTREACH",
-                "hs_timestamp": str(int(lead.created_at.timestamp() * 1000))
-            }
-
-            self.client.crm.tasks.basic_api.create(
-                simple_public_object_input=SimplePublicObjectInput(
-                    properties=task_properties
+            await self._run(
+                "create_task",
+                self.tasks_api.create,
+                simple_public_object_input_for_create=TaskInputForCreate(
+                    properties=self._task_properties(lead)
                 )
             )
             return True
+        except CRMUnavailable:
+            raise
         except Exception as e:
-            print(f"Error creating HubSpot task: {str(e)}")
-            return False 
\ No newline at end of file
+            logger.error("Error creating HubSpot task", extra={"lead_id": lead.id, "error": str(e)})
+            return False
+
+    async def bulk_update_leads(self, leads: List[Lead]) -> List[bool]:
+        distinct, covered_by = latest_by_email(leads)
+        results = []
+        for start in range(0, len(distinct), BATCH_LIMIT):
+            results.extend(await self._bulk_update_chunk(distinct[start:start + BATCH_LIMIT]))
+        return [results[i] for i in covered_by]
+
+    async def _bulk_update_chunk(self, leads: List[Lead]) -> List[bool]:
+        # Upsert contacts keyed on email: no existence lookups needed
+        try:
+            response = await self._run(
+                "batch_upsert_contacts",
+                self.contacts_batch_api.upsert,
+                batch_input_simple_public_object_batch_input_upsert=BatchInputSimplePublicObjectBatchInputUpsert(
+                    inputs=[
+                        SimplePublicObjectBatchInputUpsert(
+                            id=lead.email,
+                            id_property="email",
+                            properties=self._contact_properties(lead)
+                        )
+                        for lead in leads
+                    ]
+                )
+            )
+        except CRMUnavailable:
+            raise
+        except Exception as e:
+            logger.error("HubSpot batch upsert error", extra={"leads": len(leads), "error": str(e)})
+            return [False] * len(leads)
+
+        contact_ids = {
+            (result.properties or {}).get("email", "").lower(): result.id
+            for result in response.results
+        }
+        for email, contact_id in contact_ids.items():
+            self.identity_cache.set(email, contact_id)
+
+        # Create all hot-lead tasks with one call, associated to their contacts
+        hot_leads = [
+            lead for lead in leads
+            if lead.status == "Hot" and lead.email.lower() in contact_ids
+        ]
+        if hot_leads:
+            try:
+                await self._run(
+                    "batch_create_tasks",
+                    self.tasks_batch_api.create,
+                    batch_input_simple_public_object_batch_input_for_create=TaskBatchInput(
+                        inputs=[
+                            TaskBatchInputForCreate(
+                                properties=self._task_properties(lead),
+                                associations=[PublicAssociationsForObject(
+                                    to=PublicObjectId(id=contact_ids[lead.email.lower()]),
+                                    types=[AssociationSpec(
+                                        association_category="HUBSPOT_DEFINED",
+                                        association_type_id=TASK_TO_CONTACT_ASSOCIATION
+                                    )]
+                                )]
+                            )
+                            for lead in hot_leads
+                        ]
+                    )
+                )
+            except CRMUnavailable:
+                raise
+            except Exception as e:
+                logger.error("Error creating HubSpot tasks", extra={"tasks": len(hot_leads), "error": str(e)})
+
+        return [lead.email.lower() in contact_ids for lead in leads]
+
+    async def query_leads(
+        self,
+        page_size: int,
+        after: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        page = await self._run(
+            "list_contacts",
+            self.contacts_api.get_page,
+            limit=min(page_size, BATCH_LIMIT),
+            after=after,
+            properties=list(RESCORE_PROPERTIES),
+            archived=False
+        )
+        records = []
+        for contact in page.results:
+            properties = contact.properties or {}
+            records.append(rescore_record(
+                contact.id,
+                properties.get("email") or "",
+                properties.get("lead_status"),
+                properties.get("lead_score"),
+                properties
+            ))
+        next_page = page.paging.next if page.paging else None
+        return records, next_page.after if next_page else None
+
+    async def update_scores(self, updates: List[ScoreUpdate]) -> List[bool]:
+        results = []
+        for start in range(0, len(updates), BATCH_LIMIT):
+            results.extend(await self._update_scores_chunk(updates[start:start + BATCH_LIMIT]))
+        return results
+
+    async def _update_scores_chunk(self, updates: List[ScoreUpdate]) -> List[bool]:
+        try:
+            contact_ids = await self._contact_ids([u.email for u in updates if not u.record_id])
+            targets = [(u, u.record_id or contact_ids.get(u.email.lower())) for u in updates]
+            inputs = [
+                SimplePublicObjectBatchInput(
+                    id=contact_id,
+                    properties={"lead_score": str(u.score), "lead_status": u.status.lower()}
+                )
+                for u, contact_id in targets if contact_id
+            ]
+            if not inputs:
+                return [False] * len(updates)
+            response = await self._run(
+                "batch_update_contacts",
+                self.contacts_batch_api.update,
+                batch_input_simple_public_object_batch_input=BatchInputSimplePublicObjectBatchInput(
+                    inputs=inputs
+                )
+            )
+        except CRMUnavailable:
+            raise
+        except Exception as e:
+            logger.error("HubSpot batch update error", extra={"updates": len(updates), "error": str(e)})
+            return [False] * len(updates)
+
+        updated = {result.id for result in response.results}
+        return [contact_id in updated for _, contact_id in targets]
+
+    async def _contact_ids(self, emails: List[str]) -> Dict[str, str]:
+        """Contact ids by lowercased email, from the identity cache or one batch read"""
+        contact_ids = {}
+        uncached = []
+        for email in emails:
+            contact_id = self.identity_cache.get(email)
+            if contact_id:
+                contact_ids[email.lower()] = contact_id
+            else:
+                uncached.append(email)
+        if not uncached:
+            return contact_ids
+
+        response = await self._run(
+            "batch_read_contacts",
+            self.contacts_batch_api.read,
+            batch_read_input_simple_public_object_id=BatchReadInputSimplePublicObjectId(
+                id_property="email",
+                properties=["email"],
+                properties_with_history=[],
+                inputs=[SimplePublicObjectId(id=email) for email in uncached]
+            )
+        )
+        for result in response.results:
+            email = (result.properties or {}).get("email", "")
+            contact_ids[email.lower()] = result.id
+            self.identity_cache.set(email, result.id)
+        return contact_ids
\ No newline at end of file
@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import os
+import sqlite3
+import threading
+import time
+
+class CRMIdentityCache:
+    """Maps lead email to CRM record id so updates can skip existence lookups.
+
+    Entries live in an in-process LRU with a TTL. When `db_path` is set they
+    are also written to a local SQLite file, so the mapping survives
+    restarts and is shared by workers on the same host.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_size: int = 10000,
+        ttl_seconds: float = 86400,
+        db_path: Optional[str] = None
+    ):
+        self.namespace = namespace
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS crm_identity ("
+                " namespace TEXT NOT NULL,"
+                " email TEXT NOT NULL,"
+                " record_id TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, email))"
+            )
+
+    @classmethod
+    def from_env(cls, namespace: str) -> "CRMIdentityCache":
+        return cls(
+            namespace,
+            max_size=int(os.getenv("CRM_IDENTITY_CACHE_SIZE", "10000")),
+            ttl_seconds=float(os.getenv("CRM_IDENTITY_CACHE_TTL", "86400")),
+            db_path=os.getenv("CRM_IDENTITY_CACHE_PATH")
+        )
+
+    @staticmethod
+    def _key(email: str) -> str:
+        return email.strip().lower()
+
+    def get(self, email: str) -> Optional[str]:
+        """Return the cached record id for an email, or None on a miss"""
+        key = self._key(email)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT record_id, expires_at FROM crm_identity"
+                    " WHERE namespace = ? AND email = ? AND expires_at > ?",
+                    (self.namespace, key, now)
+                ).fetchone()
+                if row:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, email: str, record_id: str):
+        """Record the id the CRM returned for an email"""
+        key = self._key(email)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, record_id, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO crm_identity VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, record_id, expires_at)
+                )
+
+    def invalidate(self, email: str):
+        """Drop an email whose record the CRM no longer knows about"""
+        key = self._key(email)
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM crm_identity WHERE namespace = ? AND email = ?",
+                    (self.namespace, key)
+                )
+
+    def _remember(self, key: str, record_id: str, expires_at: float):
+        self._entries[key] = (record_id, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries)
+        }
\ No newline at end of file
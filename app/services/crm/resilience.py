@@ -0,0 +1,172 @@
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+import asyncio
+import random
+import time
+
+# Back-off when a throttling response gives no Retry-After
+DEFAULT_THROTTLE_DELAY = 1.0
+
+# Back-off after a daily API limit is exhausted; a probe then finds out
+# whether it has reset
+DAILY_LIMIT_PAUSE = 3600.0
+
+# Back-off after a connection error or 5xx response
+OUTAGE_RETRY_DELAY = 5.0
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]]) -> float:
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    value = (headers or {}).get("Retry-After")
+    if not value:
+        return DEFAULT_THROTTLE_DELAY
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return DEFAULT_THROTTLE_DELAY
+
+class CRMUnavailable(Exception):
+    """The CRM call did not go through because the CRM is throttling us or down.
+
+    `retry_after` is the number of seconds until a call is expected to
+    succeed, so callers can store the work and retry it later.
+    """
+
+    def __init__(self, crm_name: str, reason: str, retry_after: float):
+        super().__init__(f"{crm_name} unavailable ({reason}), retry in {retry_after:.1f}s")
+        self.crm_name = crm_name
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def retry_delay(self) -> float:
+        """retry_after plus up to half again, so work stored for a retry
+        does not all arrive the moment the CRM comes back"""
+        return self.retry_after * random.uniform(1.0, 1.5)
+
+class AdaptiveRateLimiter:
+    """Token bucket that backs off when the CRM throttles us.
+
+    Calls take a token, waiting for one when the bucket is empty. A
+    throttling response pauses the bucket for its Retry-After and halves
+    the rate; every success adds back a small share of the configured rate
+    (AIMD). A call that would wait more than `max_wait` raises
+    CRMUnavailable instead, so long pauses such as an exhausted daily
+    limit fail fast. A rate of 0 means no limit, but pauses still apply.
+    Used from one event loop, so its state needs no lock.
+    """
+
+    def __init__(self, crm_name: str, rate: float, burst: Optional[float] = None, max_wait: float = 10.0):
+        self.crm_name = crm_name
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self.max_wait = max_wait
+        self.min_rate = rate / 20
+        self.tokens = self.burst
+        self.paused_until = 0.0
+        self.throttled = 0
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            wait = self.paused_until - now
+            if wait <= 0:
+                if not self.max_rate:
+                    return
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            if wait > self.max_wait:
+                raise CRMUnavailable(self.crm_name, "rate limited", wait)
+            await asyncio.sleep(wait)
+
+    def throttle(self, retry_after: float):
+        """The CRM rejected a call as over its limit"""
+        self.throttled += 1
+        self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+
+    def succeed(self):
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 50)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        if self.max_rate:
+            self._refill(now)
+        return {
+            "rate_per_second": round(self.rate, 2) if self.max_rate else None,
+            "max_rate_per_second": self.max_rate or None,
+            "available_tokens": round(self.tokens, 2) if self.max_rate else None,
+            "paused_for_seconds": round(max(0.0, self.paused_until - now), 2),
+            "throttled": self.throttled
+        }
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+class CircuitBreaker:
+    """Fails CRM calls fast after repeated outage errors.
+
+    Closed: calls go through and consecutive outage errors are counted.
+    After `failure_threshold` of them the breaker opens and rejects every
+    call with CRMUnavailable for `reset_timeout` seconds. Then a single
+    probe call is let through (half-open): success closes the breaker,
+    another outage reopens it.
+    """
+
+    def __init__(self, crm_name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.crm_name = crm_name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probing = False
+
+    def allow(self):
+        """Raise CRMUnavailable unless a call may go through now"""
+        if self.state == "closed":
+            return
+        remaining = self.opened_at + self.reset_timeout - time.monotonic()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return
+        self.rejected += 1
+        raise CRMUnavailable(self.crm_name, "circuit open", max(remaining, 1.0))
+
+    def succeed(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def release(self):
+        """A call ended without an answer from the CRM, e.g. cancelled"""
+        self._probing = False
+
+    def fail(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = self.opened_at + self.reset_timeout - time.monotonic()
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_in_seconds": round(max(0.0, retry_in), 2) if self.state != "closed" else None,
+            "rejected": self.rejected
+        }
\ No newline at end of file
@@ -1,48 +1,128 @@
-from simple_salesforce import Salesforce
-from typing import Dict, Any
-import os
-from .base import CRMAdapter
+from simple_salesforce import Salesforce, format_soql
+from simple_salesforce.exceptions import SalesforceResourceNotFound
+from requests.adapters import HTTPAdapter
+import requests
+from typing import Dict, Any, List, Mapping, Optional, Tuple
+from .base import CRMAdapter, DEFAULT_ACCOUNT, ScoreUpdate, latest_by_email, rescore_record
+from .identity_cache import CRMIdentityCache
+from .resilience import CRMUnavailable, DAILY_LIMIT_PAUSE
 from ...models import Lead
+from ...utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# sObject Collections accept at most 200 records per call
+COLLECTION_LIMIT = 200
+
+# Records a query returns before it must be continued with nextRecordsUrl
+QUERY_LIMIT = 2000
+
+# Lead fields holding the engagement metrics, by INPUT_COLUMNS name
+METRIC_FIELDS = {
+    'website_visits': 'Website_Visits__c',
+    'time_on_site': 'Time_On_Site__c',
+    'pages_viewed': 'Pages_Viewed__c',
+    'downloaded_resources': 'Downloaded_Resources__c',
+    'email_interactions': 'Email_Interactions__c'
+}
+
+# Save errors meaning the record behind a cached Id is gone
+STALE_ID_ERRORS = {"ENTITY_IS_DELETED", "INVALID_CROSS_REFERENCE_KEY", "NOT_FOUND"}
 
 class SalesforceAdapter(CRMAdapter):
-    def __init__(self):
-        self.sf = Salesforce(
-            username=os.getenv("SALESFORCE_USERNAME"),
-            password=os.getenv("SALESFORCE_PASSWORD"),
-            security_token=os.getenv("SALESFORCE_TOKEN"),
-            domain='login'  # or 'test' for sandbox
-        )
+    crm_name = "salesforce"
+
+    def __init__(self, settings: Optional[Mapping[str, str]] = None, account: str = DEFAULT_ACCOUNT):
+        super().__init__(settings, account)
+        # Keep-alive session over a connection pool shared by every
+        # account, sized to our concurrency limit per org instance
+        session = requests.Session()
+        pool = self.http_pool(lambda: HTTPAdapter(
+            pool_connections=int(self.env_setting("POOL_HOSTS", 10)),
+            pool_maxsize=self.max_concurrency()
+        ))
+        session.mount("https://", pool)
+        session.mount("http://", pool)
+
+        if self.settings.get("SALESFORCE_SESSION_ID"):
+            # Pre-authorized session (e.g. from an OAuth flow); no login call
+            self.sf = Salesforce(
+                instance_url=self.settings.get("SALESFORCE_INSTANCE_URL"),
+                session_id=self.settings.get("SALESFORCE_SESSION_ID"),
+                session=session
+            )
+        else:
+            self.sf = Salesforce(
+                username=self.settings.get("SALESFORCE_USERNAME"),
+                password=self.settings.get("SALESFORCE_PASSWORD"),
+                security_token=self.settings.get("SALESFORCE_TOKEN"),
+                domain='login',  # or 'test' for sandbox
+                session=session
+            )
+
+        self.identity_cache = CRMIdentityCache.from_env(self.identity_namespace)
+
+    def _throttle_delay(self, error: Exception) -> Optional[float]:
+        # Salesforce reports an exhausted API allocation as a 403
+        if getattr(error, "status", None) == 403 and "REQUEST_LIMIT_EXCEEDED" in str(getattr(error, "content", "")):
+            return DAILY_LIMIT_PAUSE
+        return super()._throttle_delay(error)
+
+    def _lead_fields(self, lead: Lead) -> Dict[str, Any]:
+        fields = {
+            'Email': lead.email,
+            'FirstName': lead.name.split()[0],
+            'LastName': lead.name.split()[-1] if len(lead.name.split()) > 1 else "",
+            'Company': lead.company,
+            'LeadSource': lead.source,
+            'Rating': lead.status,  # Hot/Warm/Cold maps to Salesforce Rating
+            'Lead_Score__c': lead.score,
+            'Website_Visits__c': lead.engagement_metrics.website_visits,
+            'Time_On_Site__c': lead.engagement_metrics.time_on_site,
+            'Pages_Viewed__c': lead.engagement_metrics.pages_viewed,
+            'Downloaded_Resources__c': lead.engagement_metrics.downloaded_resources,
+            'Email_Interactions__c': lead.engagement_metrics.email_interactions
+        }
+        explanation = self.explanation_text(lead)
+        if explanation is not None:
+            fields['Lead_Score_Explanation__c'] = explanation
+        return fields
+
+    def _task_fields(self, lead: Lead, lead_id: str) -> Dict[str, Any]:
+        return {
+            'Subject': f'Follow up with {lead.name} (Hot Lead)',
+            'Priority': 'High',
+            'Status': 'Not Started',
+            'WhoId': lead_id,
+            'Type': 'Call'
+        }
 
     async def update_lead(self, lead: Lead) -> bool:
         try:
             # Prepare lead data
-            lead_data = {
-                'Email': lead.email,
-                'FirstName': lead.name.split()[0],
-                'LastName': lead.name.split()[-1] if len(lead.name.split()) > 1 else "",
-                'Company': lead.company,
-                'LeadSource': lead.source,
-                'Rating': lead.status,  # Hot/Warm/Cold maps to Salesforce Rating
-                'Lead_Score__c': lead.score,
-                'Website_Visits__c': lead.engagement_metrics["website_visits"],
-                'Time_On_Site__c': lead.engagement_metrics["time_on_site"],
-                'Pages_Viewed__c': lead.engagement_metrics["pages_viewed"],
-                'Downloaded_Resources__c': lead.engagement_metrics["downloaded_resources"],
-                'Email_Interactions__c': lead.engagement_metrics["email_interactions"]
-            }
-
-            # Check if lead exists
-            existing_lead = self.sf.query(
-                f"SELECT Id FROM Lead WHERE Email = '{lead.email}'"
-            )
+            lead_data = self._lead_fields(lead)
+
+            # Known leads are updated directly, skipping the SOQL lookup
+            lead_id = self.identity_cache.get(lead.email)
+            if lead_id:
+                try:
+                    await self._run("update_lead", self.sf.Lead.update, lead_id, lead_data)
+                except SalesforceResourceNotFound:
+                    # Deleted or converted since we cached it
+                    self.identity_cache.invalidate(lead.email)
+                    lead_id = None
 
-            if existing_lead['totalSize'] > 0:
-                # Update existing lead
-                lead_id = existing_lead['records'][0]['Id']
-                self.sf.Lead.update(lead_id, lead_data)
-            else:
-                # Create new lead
-                self.sf.Lead.create(lead_data)
+            if not lead_id:
+                # Check if lead exists
+                lead_id = await self._query_lead_id(lead.email)
+
+                if lead_id:
+                    # Update existing lead
+                    await self._run("update_lead", self.sf.Lead.update, lead_id, lead_data)
+                else:
+                    # Create new lead
+                    created = await self._run("create_lead", self.sf.Lead.create, lead_data)
+                    self.identity_cache.set(lead.email, created['id'])
 
             # Create task for hot leads
             if lead.status == "Hot":
@@ -50,40 +130,235 @@ class SalesforceAdapter(CRMAdapter):
 
             return True
 
+        except CRMUnavailable:
+            raise
         except Exception as e:
-            print(f"Salesforce Error: {str(e)}")
+            logger.error("Salesforce error", extra={"lead_id": lead.id, "error": str(e)})
             return False
 
+    async def _query_lead_id(self, email: str) -> Optional[str]:
+        """Look up a lead Id by email and remember it"""
+        result = await self._run(
+            "query_lead_id",
+            self.sf.query,
+            format_soql("SELECT Id FROM Lead WHERE Email = {}", email)
+        )
+        if result['totalSize'] == 0:
+            self.identity_cache.invalidate(email)
+            return None
+
+        lead_id = result['records'][0]['Id']
+        self.identity_cache.set(email, lead_id)
+        return lead_id
+
     async def get_lead(self, email: str) -> Dict[str, Any]:
         try:
-            result = self.sf.query(
-                f"SELECT Id, FirstName, LastName, Company, Rating, Lead_Score__c "
-                f"FROM Lead WHERE Email = '{email}'"
+            result = await self._run(
+                "get_lead",
+                self.sf.query,
+                format_soql(
+                    "SELECT Id, FirstName, LastName, Company, Rating, Lead_Score__c"
+                    " FROM Lead WHERE Email = {}",
+                    email
+                )
             )
-            return result['records'][0] if result['totalSize'] > 0 else {}
+            if result['totalSize'] == 0:
+                self.identity_cache.invalidate(email)
+                return {}
+
+            record = result['records'][0]
+            self.identity_cache.set(email, record['Id'])
+            return record
+        except CRMUnavailable:
+            raise
         except Exception:
             return {}
 
     async def create_task(self, lead: Lead) -> bool:
         try:
-            # Find the lead ID
-            lead_query = self.sf.query(
-                f"SELECT Id FROM Lead WHERE Email = '{lead.email}'"
-            )
-            if lead_query['totalSize'] == 0:
+            # Find the lead ID, usually already cached by update_lead
+            lead_id = self.identity_cache.get(lead.email) or await self._query_lead_id(lead.email)
+            if not lead_id:
                 return False
 
-            lead_id = lead_query['records'][0]['Id']
-
             # Create task
-            self.sf.Task.create({
-                'Subject': f'Follow up with {lead.name} (Hot Lead)',
-                'Priority': 'High',
-                'Status': 'Not Started',
-                'WhoId': lead_id,
-                'Type': 'Call'
-            })
+            await self._run("create_task", self.sf.Task.create, self._task_fields(lead, lead_id))
             return True
+        except CRMUnavailable:
+            raise
         except Exception as e:
-            print(f"Error creating Salesforce task: {str(e)}")
-            return False 
\ No newline at end of file
+            logger.error("Error creating Salesforce task", extra={"lead_id": lead.id, "error": str(e)})
+            return False
+
+    async def bulk_update_leads(self, leads: List[Lead]) -> List[bool]:
+        distinct, covered_by = latest_by_email(leads)
+        results = []
+        for start in range(0, len(distinct), COLLECTION_LIMIT):
+            results.extend(await self._bulk_update_chunk(distinct[start:start + COLLECTION_LIMIT]))
+        return [results[i] for i in covered_by]
+
+    async def _save_collection(self, method: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create (POST) or update (PATCH) records through sObject Collections.
+
+        Returns the per-record save results, in request order.
+        """
+        if not records:
+            return []
+        action = "create" if method == "POST" else "update"
+        return await self._run(
+            f"{action}_{records[0]['attributes']['type'].lower()}s",
+            self.sf.restful,
+            "composite/sobjects",
+            method=method,
+            json={"allOrNone": False, "records": records}
+        )
+
+    async def _bulk_update_chunk(self, leads: List[Lead]) -> List[bool]:
+        try:
+            lead_ids = {}
+            uncached = []
+            for lead in leads:
+                lead_id = self.identity_cache.get(lead.email)
+                if lead_id:
+                    lead_ids[lead.email.lower()] = lead_id
+                else:
+                    uncached.append(lead.email)
+
+            # One query resolves every uncached lead in the chunk
+            if uncached:
+                existing = await self._run(
+                    "query_lead_ids",
+                    self.sf.query_all,
+                    format_soql(
+                        "SELECT Id, Email FROM Lead WHERE Email IN {emails}",
+                        emails=uncached
+                    )
+                )
+                for record in existing['records']:
+                    lead_ids[record['Email'].lower()] = record['Id']
+                    self.identity_cache.set(record['Email'], record['Id'])
+
+            to_update = [lead for lead in leads if lead.email.lower() in lead_ids]
+            to_create = [lead for lead in leads if lead.email.lower() not in lead_ids]
+
+            updated = await self._save_collection("PATCH", [
+                {"attributes": {"type": "Lead"}, "Id": lead_ids[lead.email.lower()], **self._lead_fields(lead)}
+                for lead in to_update
+            ])
+            created = await self._save_collection("POST", [
+                {"attributes": {"type": "Lead"}, **self._lead_fields(lead)}
+                for lead in to_create
+            ])
+        except CRMUnavailable:
+            raise
+        except Exception as e:
+            logger.error("Salesforce bulk upsert error", extra={"leads": len(leads), "error": str(e)})
+            return [False] * len(leads)
+
+        success = {}
+        for lead, result in zip(to_update, updated):
+            success[lead.email.lower()] = result.get("success", False)
+            error_codes = {error.get("statusCode") for error in result.get("errors") or []}
+            if error_codes & STALE_ID_ERRORS:
+                self.identity_cache.invalidate(lead.email)
+        for lead, result in zip(to_create, created):
+            success[lead.email.lower()] = result.get("success", False)
+            if result.get("success"):
+                lead_ids[lead.email.lower()] = result["id"]
+                self.identity_cache.set(lead.email, result["id"])
+
+        # Tasks reuse the Ids we just resolved or created; no re-query
+        hot_leads = [
+            lead for lead in leads
+            if lead.status == "Hot" and success.get(lead.email.lower())
+        ]
+        try:
+            await self._save_collection("POST", [
+                {"attributes": {"type": "Task"}, **self._task_fields(lead, lead_ids[lead.email.lower()])}
+                for lead in hot_leads
+            ])
+        except CRMUnavailable:
+            raise
+        except Exception as e:
+            logger.error("Error creating Salesforce tasks", extra={"tasks": len(hot_leads), "error": str(e)})
+
+        return [success.get(lead.email.lower(), False) for lead in leads]
+
+    async def query_leads(
+        self,
+        page_size: int,
+        after: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # Keyset pagination on Id: resumable from the last Id, unlike a query locator
+        page_size = min(page_size, QUERY_LIMIT)
+        soql = (
+            f"SELECT Id, Email, Rating, Lead_Score__c, {', '.join(METRIC_FIELDS.values())} "
+            f"FROM Lead WHERE IsConverted = false"
+        )
+        if after:
+            soql += format_soql(" AND Id > {}", after)
+        result = await self._run("query_leads", self.sf.query, f"{soql} ORDER BY Id LIMIT {page_size}")
+
+        records = [
+            rescore_record(
+                record['Id'],
+                record.get('Email') or "",
+                record.get('Rating'),
+                record.get('Lead_Score__c'),
+                {name: record.get(field) for name, field in METRIC_FIELDS.items()}
+            )
+            for record in result['records']
+        ]
+        return records, records[-1]["id"] if len(records) == page_size else None
+
+    async def update_scores(self, updates: List[ScoreUpdate]) -> List[bool]:
+        results = []
+        for start in range(0, len(updates), COLLECTION_LIMIT):
+            results.extend(await self._update_scores_chunk(updates[start:start + COLLECTION_LIMIT]))
+        return results
+
+    async def _update_scores_chunk(self, updates: List[ScoreUpdate]) -> List[bool]:
+        try:
+            lead_ids = {}
+            uncached = []
+            for update in updates:
+                if update.record_id:
+                    continue
+                lead_id = self.identity_cache.get(update.email)
+                if lead_id:
+                    lead_ids[update.email.lower()] = lead_id
+                else:
+                    uncached.append(update.email)
+            if uncached:
+                existing = await self._run(
+                    "query_lead_ids",
+                    self.sf.query_all,
+                    format_soql(
+                        "SELECT Id, Email FROM Lead WHERE Email IN {emails}",
+                        emails=uncached
+                    )
+                )
+                for record in existing['records']:
+                    lead_ids[record['Email'].lower()] = record['Id']
+                    self.identity_cache.set(record['Email'], record['Id'])
+
+            targets = [(u, u.record_id or lead_ids.get(u.email.lower())) for u in updates]
+            saved = await self._save_collection("PATCH", [
+                {"attributes": {"type": "Lead"}, "Id": lead_id, 'Rating': u.status, 'Lead_Score__c': u.score}
+                for u, lead_id in targets if lead_id
+            ])
+        except CRMUnavailable:
+            raise
+        except Exception as e:
+            logger.error("Salesforce score update error", extra={"updates": len(updates), "error": str(e)})
+            return [False] * len(updates)
+
+        success = []
+        results = iter(saved)
+        for update, lead_id in targets:
+            result = next(results) if lead_id else {}
+            error_codes = {error.get("statusCode") for error in result.get("errors") or []}
+            if error_codes & STALE_ID_ERRORS:
+                self.identity_cache.invalidate(update.email)
+            success.append(result.get("success", False))
+        return success
\ No newline at end of file
@@ -0,0 +1,79 @@
+from typing import List, Optional, Set, Tuple
+import asyncio
+from .base import CRMAdapter
+from .resilience import CRMUnavailable
+from ...models import Lead
+from ...utils.logger import get_logger, lead_id_var, request_id_var
+
+logger = get_logger(__name__)
+
+class WriteBehindBuffer:
+    """Collects scored leads and flushes them to the CRM in batches.
+
+    A batch is flushed when it reaches `max_items` leads or when the oldest
+    lead has waited `max_wait_ms`, whichever comes first. Each caller of
+    `submit` gets its own lead's success flag once the batch completes, or
+    CRMUnavailable when the CRM turned the batch away.
+    """
+
+    def __init__(self, adapter: CRMAdapter, max_items: int = 100, max_wait_ms: int = 500):
+        self.adapter = adapter
+        self.max_items = max_items
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[Lead, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def submit(self, lead: Lead) -> bool:
+        """Queue a lead for the next batch and wait for its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((lead, future))
+
+        if len(self._pending) >= self.max_items:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush_pending)
+
+        return await future
+
+    async def flush(self):
+        """Flush whatever is buffered and wait for all in-flight batches"""
+        self._flush_pending()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def _flush_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._write_batch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _write_batch(self, batch: List[Tuple[Lead, asyncio.Future]]):
+        # The batch holds many requests' leads: its logs belong to none of
+        # them, least of all the one whose submission flushed it
+        request_id_var.set(None)
+        lead_id_var.set(None)
+
+        # The adapter collapses repeat submissions for one email to the latest
+        leads = [lead for lead, _ in batch]
+        try:
+            results = await self.adapter.bulk_update_leads(leads)
+        except CRMUnavailable as e:
+            # Let each submitter store its lead for a later retry
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except Exception as e:
+            logger.error("Error flushing CRM batch", extra={"leads": len(leads), "error": str(e)})
+            results = [False] * len(leads)
+
+        for (_, future), ok in zip(batch, results):
+            if not future.done():
+                future.set_result(ok)
\ No newline at end of file
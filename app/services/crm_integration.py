@@ -1,46 +1,172 @@
 import os
-from typing import Optional
-from .crm.base import CRMAdapter
-from .crm.hubspot import HubSpotAdapter
-from .crm.salesforce import SalesforceAdapter
+import threading
+from typing import Any, Dict, List, Mapping, Optional
+from .crm.base import CRMAdapter, DEFAULT_ACCOUNT
+from .crm.resilience import CRMUnavailable
+from .crm.write_behind import WriteBehindBuffer
+from .lead_queue import LeadQueue, lead_queue
 from ..models import Lead
+from ..utils.logger import HIGH_VOLUME, get_logger
+from ..utils.metrics import crm_sync_deferred, crm_sync_failures
+
+logger = get_logger(__name__)
 
 class CRMIntegration:
-    def __init__(self):
-        self.crm_adapter: Optional[CRMAdapter] = None
-        self._initialize_adapter()
+    def __init__(
+        self,
+        lazy: bool = False,
+        retry_queue: Optional[LeadQueue] = None,
+        settings: Optional[Mapping[str, str]] = None,
+        account: str = DEFAULT_ACCOUNT
+    ):
+        # Lazy mode defers importing the CRM SDK and opening its session
+        # (a Salesforce login) until the first CRM call
+        self._crm_adapter: Optional[CRMAdapter] = None
+        # CRM_TYPE, credentials and batching settings; a tenant's own, or
+        # the process environment
+        self.settings = os.environ if settings is None else settings
+        self.account = account
+        self.write_buffer: Optional[WriteBehindBuffer] = None
+        # Where leads go when the CRM is throttling us or down
+        self.retry_queue = retry_queue
+        self._init_lock = threading.Lock()
+        if not lazy:
+            self._initialize()
+
+    @property
+    def crm_adapter(self) -> CRMAdapter:
+        if self._crm_adapter is None:
+            with self._init_lock:
+                if self._crm_adapter is None:
+                    self._initialize()
+        return self._crm_adapter
+
+    def _initialize(self):
+        self._initialize_write_buffer(self._initialize_adapter())
 
-    def _initialize_adapter(self):
-        crm_type = os.getenv("CRM_TYPE", "").lower()
+    def _initialize_adapter(self) -> CRMAdapter:
+        # Only the configured CRM's SDK is imported
+        crm_type = self.settings.get("CRM_TYPE", "").lower()
         if crm_type == "hubspot":
-            self.crm_adapter = HubSpotAdapter()
+            from .crm.hubspot import HubSpotAdapter
+            self._crm_adapter = HubSpotAdapter(self.settings, self.account)
         elif crm_type == "salesforce":
-            self.crm_adapter = SalesforceAdapter()
+            from .crm.salesforce import SalesforceAdapter
+            self._crm_adapter = SalesforceAdapter(self.settings, self.account)
         else:
             raise ValueError(f"Unsupported CRM type: {crm_type}")
+        return self._crm_adapter
+
+    def _initialize_write_buffer(self, adapter: CRMAdapter):
+        # CRM_BATCH_SIZE > 1 turns on write-behind batching of single leads
+        batch_size = int(self.settings.get("CRM_BATCH_SIZE", "1"))
+        if batch_size > 1:
+            self.write_buffer = WriteBehindBuffer(
+                adapter,
+                max_items=batch_size,
+                max_wait_ms=int(self.settings.get("CRM_BATCH_MAX_WAIT_MS", "500"))
+            )
+
+    def identity_cache_stats(self) -> Optional[Dict[str, float]]:
+        """Identity cache stats, without creating the adapter just to report them"""
+        if self._crm_adapter is None:
+            return None
+        return self._crm_adapter.identity_cache.stats()
+
+    def resilience_stats(self) -> Optional[Dict[str, Any]]:
+        """Circuit breaker state and rate limiter headroom of the CRM"""
+        if self._crm_adapter is None:
+            return None
+        return self._crm_adapter.resilience_stats()
 
-    async def update_crm(self, lead: Lead) -> bool:
-        """Update lead information in the CRM"""
+    def _defer(self, leads: List[Lead], error: CRMUnavailable) -> bool:
+        """Store leads the CRM turned away in the retry queue.
+
+        Returns True if they were stored.
+        """
+        crm_name = self.crm_adapter.crm_name
+        if self.retry_queue is None:
+            logger.error("Error updating CRM; set LEAD_QUEUE_PATH to retry instead of dropping", extra={
+                "crm": crm_name, "leads": len(leads), "error": str(error)
+            })
+            crm_sync_failures.inc(len(leads), crm=crm_name)
+            return False
+
+        self.retry_queue.enqueue_many(leads, delay=error.retry_delay())
+        crm_sync_deferred.inc(len(leads), crm=crm_name)
+        return True
+
+    async def update_crm(self, lead: Lead, defer: bool = True) -> bool:
+        """Update lead information in the CRM, or store it for a retry if unavailable.
+
+        With `defer` False, CRMUnavailable is raised instead: the queue
+        worker reschedules its own job, keeping its attempt count.
+        """
         if not self.crm_adapter:
             raise ValueError("CRM adapter not initialized")
         
         try:
-            # Update lead in CRM
-            success = await self.crm_adapter.update_lead(lead)
+            # Update lead in CRM, batched with other leads when enabled
+            if self.write_buffer:
+                success = await self.write_buffer.submit(lead)
+            else:
+                success = await self.crm_adapter.update_lead(lead)
             
             if not success:
-                print(f"Failed to update lead {lead.email} in CRM")
+                logger.warning("Failed to update lead in CRM", extra={
+                    **HIGH_VOLUME, "lead_id": lead.id, "crm": self.crm_adapter.crm_name
+                })
+                crm_sync_failures.inc(crm=self.crm_adapter.crm_name)
                 return False
                 
             return True
-            
+
+        except CRMUnavailable as e:
+            if not defer:
+                raise
+            return self._defer([lead], e)
         except Exception as e:
-            print(f"Error updating CRM: {str(e)}")
+            logger.error("Error updating CRM", extra={
+                "lead_id": lead.id, "crm": self.crm_adapter.crm_name, "error": str(e)
+            })
+            crm_sync_failures.inc(crm=self.crm_adapter.crm_name)
             return False
 
+    async def update_crm_batch(self, leads: List[Lead]) -> List[bool]:
+        """Upsert a batch of leads in the CRM, returning per-lead success"""
+        if not self.crm_adapter:
+            raise ValueError("CRM adapter not initialized")
+
+        try:
+            results = await self.crm_adapter.bulk_update_leads(leads)
+        except CRMUnavailable as e:
+            return [self._defer(leads, e)] * len(leads)
+        except Exception as e:
+            logger.error("Error updating CRM batch", extra={
+                "crm": self.crm_adapter.crm_name, "leads": len(leads), "error": str(e)
+            })
+            crm_sync_failures.inc(len(leads), crm=self.crm_adapter.crm_name)
+            return [False] * len(leads)
+
+        for lead, success in zip(leads, results):
+            if not success:
+                logger.warning("Failed to update lead in CRM", extra={
+                    **HIGH_VOLUME, "lead_id": lead.id, "crm": self.crm_adapter.crm_name
+                })
+                crm_sync_failures.inc(crm=self.crm_adapter.crm_name)
+
+        return results
+
 # Create singleton instance
-crm_integration = CRMIntegration()
+crm_integration = CRMIntegration(
+    lazy=os.getenv("FAST_STARTUP", "false").lower() == "true",
+    retry_queue=lead_queue
+)
 
-async def update_crm(lead: Lead) -> bool:
+async def update_crm(lead: Lead, defer: bool = True) -> bool:
     """Convenience function to update CRM"""
-    return await crm_integration.update_crm(lead) 
\ No newline at end of file
+    return await crm_integration.update_crm(lead, defer)
+
+async def update_crm_batch(leads: List[Lead]) -> List[bool]:
+    """Convenience function to update CRM with a batch of leads"""
+    return await crm_integration.update_crm_batch(leads)
\ No newline at end of file
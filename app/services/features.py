@@ -0,0 +1,146 @@
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+import numpy as np
+
+# Raw engagement metrics, in the order they are stored and read
+INPUT_COLUMNS = (
+    "website_visits",
+    "time_on_site",
+    "pages_viewed",
+    "downloaded_resources",
+    "email_interactions"
+)
+
+# A column batch: dict of 1-D arrays, a structured array with these field
+# names, or an (n, len(INPUT_COLUMNS)) matrix in INPUT_COLUMNS order
+ColumnBatch = Union[Mapping[str, Any], np.ndarray]
+
+class FeatureSchemaError(ValueError):
+    """A model was trained on different features than this pipeline builds"""
+
+class FeaturePipeline:
+    """The one definition of the model's features, for training and inference.
+
+    Bump `version` whenever a feature is added, removed, reordered or
+    computed differently; models record the schema they were trained with
+    and the registry refuses to serve one that does not match.
+    """
+    version = 1
+    feature_names = INPUT_COLUMNS + ("engagement_rate", "avg_time_per_visit")
+
+    @property
+    def num_features(self) -> int:
+        return len(self.feature_names)
+
+    def schema(self) -> Dict[str, Any]:
+        return {"version": self.version, "features": list(self.feature_names)}
+
+    def transform(
+        self,
+        columns: ColumnBatch,
+        out: Optional[np.ndarray] = None,
+        dtype: Any = np.float64
+    ) -> np.ndarray:
+        """Compute the (n, num_features) matrix column by column.
+
+        Writes into `out` when given, so callers can fill a slice of a
+        preallocated training matrix without an intermediate copy.
+        """
+        inputs = self._input_columns(columns)
+        n = len(inputs[0])
+        if out is None:
+            out = np.empty((n, self.num_features), dtype=dtype)
+
+        for i, column in enumerate(inputs):
+            out[:, i] = column
+
+        # Derived features, from the columns already cast to the output dtype
+        visits = np.maximum(out[:, 0], 1)
+        np.divide(out[:, 2], visits, out=out[:, 5])
+        np.divide(out[:, 1], visits, out=out[:, 6])
+        return out
+
+    def transform_records(self, records: Sequence[Mapping[str, Any]], dtype: Any = np.float64) -> np.ndarray:
+        """Featurize a list of metric dicts, e.g. a webhook batch"""
+        return self.transform(self.records_to_columns(records), dtype=dtype)
+
+    def records_to_columns(self, records: Sequence[Mapping[str, Any]]) -> Dict[str, np.ndarray]:
+        n = len(records)
+        return {
+            name: np.fromiter((record[name] for record in records), dtype=np.float64, count=n)
+            for name in INPUT_COLUMNS
+        }
+
+    def fill_row(self, metrics: Mapping[str, Any], row: np.ndarray):
+        """Write one lead's features into a preallocated row.
+
+        The scalar twin of `transform` for single-lead scoring, where
+        building arrays would cost more than the model itself.
+        """
+        visits = max(metrics["website_visits"], 1)
+        row[0] = metrics["website_visits"]
+        row[1] = metrics["time_on_site"]
+        row[2] = metrics["pages_viewed"]
+        row[3] = metrics["downloaded_resources"]
+        row[4] = metrics["email_interactions"]
+        row[5] = metrics["pages_viewed"] / visits
+        row[6] = metrics["time_on_site"] / visits
+
+    def check(self, metadata: Mapping[str, Any], num_features: Optional[int] = None):
+        """Raise FeatureSchemaError unless a model was trained on these features.
+
+        Models published before schemas were recorded are accepted when
+        their input width matches.
+        """
+        schema = metadata.get("feature_schema")
+        if schema is None:
+            if num_features is not None and num_features != self.num_features:
+                raise FeatureSchemaError(
+                    f"model expects {num_features} features, pipeline builds {self.num_features}"
+                )
+            return
+        if schema.get("version") != self.version or list(schema.get("features", [])) != list(self.feature_names):
+            raise FeatureSchemaError(
+                f"model trained on feature schema v{schema.get('version')} {schema.get('features')},"
+                f" pipeline builds v{self.version} {list(self.feature_names)}"
+            )
+
+    def profile(self, features: np.ndarray, bins: int = 10) -> Dict[str, Any]:
+        """Per-feature decile edges and shares, stored with a model for drift checks"""
+        # Deciles of an evenly strided sample are plenty for drift checks
+        features = features[::max(1, len(features) // 100000)]
+        profile = {}
+        for name, column in zip(self.feature_names, features.T):
+            edges = np.unique(np.quantile(column, np.linspace(0, 1, bins + 1)[1:-1]))
+            counts = np.bincount(np.searchsorted(edges, column, side="right"), minlength=len(edges) + 1)
+            profile[name] = {
+                "edges": edges.tolist(),
+                "shares": (counts / max(len(column), 1)).tolist()
+            }
+        return profile
+
+    def drift(self, profile: Mapping[str, Any], features: np.ndarray) -> Dict[str, float]:
+        """Population stability index of each feature against a training profile.
+
+        Below 0.1 is usually read as stable and above 0.25 as a shift
+        large enough to retrain for.
+        """
+        psi = {}
+        for name, column in zip(self.feature_names, features.T):
+            if name not in profile or not len(column):
+                continue
+            edges = np.asarray(profile[name]["edges"])
+            expected = np.maximum(np.asarray(profile[name]["shares"]), 1e-4)
+            counts = np.bincount(np.searchsorted(edges, column, side="right"), minlength=len(expected))
+            actual = np.maximum(counts / len(column), 1e-4)
+            psi[name] = float(np.sum((actual - expected) * np.log(actual / expected)))
+        return psi
+
+    def _input_columns(self, columns: ColumnBatch) -> List[np.ndarray]:
+        if isinstance(columns, np.ndarray) and columns.dtype.names is None:
+            if columns.ndim != 2 or columns.shape[1] != len(INPUT_COLUMNS):
+                raise ValueError(f"Expected an (n, {len(INPUT_COLUMNS)}) matrix of {INPUT_COLUMNS}")
+            return [columns[:, i] for i in range(len(INPUT_COLUMNS))]
+        return [np.asarray(columns[name]) for name in INPUT_COLUMNS]
+
+# Create singleton instance
+feature_pipeline = FeaturePipeline()
\ No newline at end of file
@@ -1,32 +1,51 @@
+from typing import List, Optional
 from ..models import Lead, LeadClassificationResult, EngagementMetrics
 from .ml_predictor import LeadPredictor
+from ..utils.metrics import leads_scored, stage_seconds
+
+classify_stage = stage_seconds.labels(stage="classify")
 
 # Initialize the predictor
 lead_predictor = LeadPredictor()
 
-async def classify_lead(lead: Lead) -> LeadClassificationResult:
-    # Get conversion probability from ML model
-    conversion_prob = await lead_predictor.predict_conversion(
+async def classify_lead(lead: Lead, predictor: Optional[LeadPredictor] = None) -> LeadClassificationResult:
+    # Get conversion probability from ML model, the tenant's if given
+    conversion_prob = await (predictor or lead_predictor).predict_conversion(
         lead.engagement_metrics.dict()
     )
     
+    with classify_stage.time():
+        return build_classification(conversion_prob)
+
+async def classify_leads(leads: List[Lead], predictor: Optional[LeadPredictor] = None) -> List[LeadClassificationResult]:
+    """Classify a batch of leads with a single model call, preserving order"""
+    conversion_probs = await (predictor or lead_predictor).predict_conversion_batch(
+        [lead.engagement_metrics.dict() for lead in leads]
+    )
+
+    with classify_stage.time():
+        return [build_classification(prob) for prob in conversion_probs]
+
+def build_classification(conversion_prob: float) -> LeadClassificationResult:
     # Calculate score (0-100)
-    score = round(conversion_prob * 100)
-    
-    # Determine lead status based on score
-    if score >= 80:
-        status = "Hot"
-    elif score >= 50:
-        status = "Warm"
-    else:
-        status = "Cold"
+    score = round(float(conversion_prob) * 100)
+    status = score_status(score)
 
+    leads_scored.labels(status=status).inc()
     return LeadClassificationResult(
         status=status,
         score=score,
         confidence=calculate_confidence(score)
     )
 
+def score_status(score: int) -> str:
+    # Determine lead status based on score
+    if score >= 80:
+        return "Hot"
+    elif score >= 50:
+        return "Warm"
+    return "Cold"
+
 def calculate_engagement_score(metrics: EngagementMetrics) -> int:
     weights = {
         "website_visits": 10,
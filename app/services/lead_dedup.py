@@ -0,0 +1,296 @@
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from .lead_queue import LeadQueue
+from ..models import Lead
+from ..utils.metrics import leads_coalesced
+
+MERGE_POLICIES = ("max", "latest")
+
+# A shared window still not taken this long after it closed is presumed
+# to belong to a worker that died, and the next submission takes it over
+ABANDONED_AFTER_SECONDS = 60.0
+
+def dedup_key(lead: Lead) -> str:
+    # Tenants never share leads, even for the same email
+    email = lead.email.strip().lower()
+    return f"{lead.tenant}/{email}" if lead.tenant else email
+
+def merge_leads(existing: Lead, incoming: Lead, policy: str = "max") -> Lead:
+    """Fold a repeat submission into the pending lead.
+
+    Keeps the first submission's id and created_at, so every duplicate
+    maps to one lead; other fields take the latest non-empty value, and
+    engagement metrics take the per-metric max or the latest.
+    """
+    if policy == "max":
+        old, new = existing.engagement_metrics.dict(), incoming.engagement_metrics.dict()
+        metrics = {name: max(old[name], new[name]) for name in old}
+    else:
+        metrics = incoming.engagement_metrics.dict()
+
+    return existing.copy(update={
+        "name": incoming.name or existing.name,
+        "company": incoming.company or existing.company,
+        "source": incoming.source or existing.source,
+        "engagement_metrics": existing.engagement_metrics.copy(update=metrics),
+        "status": incoming.status,
+        "score": incoming.score,
+        "explanation": incoming.explanation
+    })
+
+@dataclass
+class PendingLead:
+    """A lead waiting out its coalescing window before its one CRM write"""
+    key: str
+    lead: Lead
+    first_seen: float
+    token: str = field(default_factory=lambda: uuid.uuid4().hex)
+    duplicates: int = 0
+    # Already in the durable queue, due when the window closes; the worker syncs it
+    queued: bool = False
+
+class LeadCoalescer:
+    """Collapses repeat submissions of a lead within a time window.
+
+    The first submission for an email opens a window and its caller owns
+    the CRM sync: `take()` waits for the window to close and returns the
+    lead with every duplicate merged in, so one CRM write covers them all.
+    Duplicates are still scored and answered immediately.
+
+    The in-memory index buckets entries by window, so expiry drops whole
+    buckets and lookups check at most two; it holds at most `max_entries`
+    leads, evicting the oldest bucket first. With `db_path` the index
+    lives in SQLite instead, shared by every worker on the host; a window
+    there takes duplicates until its owner has taken it. With a durable
+    `queue` the window is the queued job itself: the first submission is
+    on disk, due when the window closes, before its webhook returns, and
+    duplicates merge into that job, so a restart loses nothing.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float,
+        policy: str = "max",
+        max_entries: int = 10000,
+        db_path: Optional[str] = None,
+        queue: Optional[LeadQueue] = None
+    ):
+        if policy not in MERGE_POLICIES:
+            raise ValueError(f"Unsupported merge policy: {policy}")
+        self.window = window_seconds
+        self.policy = policy
+        self.max_entries = max_entries
+        self.suppressed = 0
+        self.evicted = 0
+        self._buckets: Dict[int, Dict[str, PendingLead]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._queue = queue
+        self._db = None
+        if db_path and queue is None:
+            self._db = sqlite3.connect(
+                db_path, timeout=30, check_same_thread=False, isolation_level=None
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS pending_leads (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    first_seen REAL NOT NULL,
+                    token TEXT NOT NULL,
+                    duplicates INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+
+    @classmethod
+    def from_env(cls) -> Optional["LeadCoalescer"]:
+        window = float(os.getenv("LEAD_DEDUP_WINDOW_SECONDS", "0"))
+        if window <= 0:
+            return None
+        from .lead_queue import lead_queue
+        return cls(
+            window,
+            policy=os.getenv("LEAD_DEDUP_MERGE", "max").lower(),
+            max_entries=int(os.getenv("LEAD_DEDUP_MAX_ENTRIES", "10000")),
+            db_path=os.getenv("LEAD_DEDUP_DB_PATH"),
+            queue=lead_queue
+        )
+
+    def merge(self, lead: Lead) -> Lead:
+        """The lead to score: merged with a pending submission, if any"""
+        if self._queue is not None:
+            waiting = self._queue.coalescing(dedup_key(lead))
+            return merge_leads(waiting, lead, self.policy) if waiting else lead
+        pending = self._get(dedup_key(lead), time.time())
+        return merge_leads(pending.lead, lead, self.policy) if pending else lead
+
+    def put(self, lead: Lead) -> Optional[PendingLead]:
+        """Record a scored lead; returns its entry if the caller owns the sync.
+
+        None means a submission in the open window already owns the CRM
+        write, and this one was merged into it. A `queued` entry needs no
+        `take()`: the queue worker syncs it.
+        """
+        key, now = dedup_key(lead), time.time()
+        if self._queue is not None:
+            opened = self._queue.enqueue_coalesced(
+                lead, key, self.window, lambda waiting, incoming: merge_leads(waiting, incoming, self.policy)
+            )
+            if not opened:
+                self._count_duplicate()
+                return None
+            return PendingLead(key, lead, now, queued=True)
+        if self._db is not None:
+            return self._put_shared(key, lead, now)
+
+        with self._lock:
+            pending = self._get(key, now)
+            if pending is not None:
+                pending.lead = merge_leads(pending.lead, lead, self.policy)
+                pending.duplicates += 1
+                self._count_duplicate()
+                return None
+
+            pending = PendingLead(key, lead, now)
+            self._buckets.setdefault(self._bucket(now), {})[key] = pending
+            self._size += 1
+            self._expire(now)
+            return pending
+
+    async def take(self, pending: PendingLead) -> Optional[Lead]:
+        """Wait for the window to close, then remove and return the merged lead.
+
+        None means a later window took this one over and will sync it.
+        """
+        await asyncio.sleep(max(0.0, pending.first_seen + self.window - time.time()))
+        if self._db is not None:
+            return self._take_shared(pending)
+
+        with self._lock:
+            bucket = self._buckets.get(self._bucket(pending.first_seen), {})
+            if bucket.get(pending.key) is pending:
+                del bucket[pending.key]
+                self._size -= 1
+        # Evicted entries are still synced with what they had merged
+        return pending.lead
+
+    def stats(self) -> Dict[str, int]:
+        if self._queue is not None:
+            pending = self._queue.stats()["coalescing"]
+        elif self._db is not None:
+            with self._lock:
+                pending = self._db.execute("SELECT COUNT(*) FROM pending_leads").fetchone()[0]
+        else:
+            pending = self._size
+        return {"pending": pending, "suppressed_duplicates": self.suppressed, "evicted": self.evicted}
+
+    def _count_duplicate(self):
+        self.suppressed += 1
+        leads_coalesced.inc()
+
+    def _bucket(self, timestamp: float) -> int:
+        return int(timestamp // self.window)
+
+    def _get(self, key: str, now: float) -> Optional[PendingLead]:
+        if self._db is not None:
+            # Open until its owner takes it, so nothing merges into a row
+            # that is then replaced before the owner gets to it
+            row = self._db.execute(
+                "SELECT payload, first_seen, token, duplicates FROM pending_leads"
+                " WHERE key = ? AND first_seen > ?",
+                (key, now - self.window - ABANDONED_AFTER_SECONDS)
+            ).fetchone()
+            return PendingLead(key, Lead.parse_raw(row[0]), row[1], row[2], row[3]) if row else None
+
+        # An open window started in this bucket or the one before it
+        current = self._bucket(now)
+        for bucket in (current, current - 1):
+            pending = self._buckets.get(bucket, {}).get(key)
+            if pending is not None and now - pending.first_seen < self.window:
+                return pending
+        return None
+
+    def _expire(self, now: float):
+        """Drop buckets too old to hold an open window, then enforce the size bound"""
+        oldest_open = self._bucket(now) - 1
+        for bucket in sorted(self._buckets):
+            entries = self._buckets[bucket]
+            if bucket >= oldest_open and self._size <= self.max_entries:
+                break
+            while entries and (bucket < oldest_open or self._size > self.max_entries):
+                entries.pop(next(iter(entries)))
+                self._size -= 1
+                if bucket >= oldest_open:
+                    self.evicted += 1
+            if not entries:
+                del self._buckets[bucket]
+
+    def _put_shared(self, key: str, lead: Lead, now: float) -> Optional[PendingLead]:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                pending = self._get(key, now)
+                duplicate = pending is not None
+                if duplicate:
+                    self._db.execute(
+                        "UPDATE pending_leads SET payload = ?, duplicates = duplicates + 1"
+                        " WHERE key = ? AND token = ?",
+                        (merge_leads(pending.lead, lead, self.policy).json(), key, pending.token)
+                    )
+                else:
+                    pending = PendingLead(key, lead, now)
+                    abandoned = self._db.execute(
+                        "SELECT payload, duplicates FROM pending_leads WHERE key = ?", (key,)
+                    ).fetchone()
+                    if abandoned:
+                        # Its worker died: this window syncs what it had merged,
+                        # under the new submission's id
+                        merged = merge_leads(Lead.parse_raw(abandoned[0]), lead, self.policy)
+                        pending.lead = merged.copy(update={"id": lead.id, "created_at": lead.created_at})
+                        pending.duplicates = abandoned[1] + 1
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO pending_leads (key, payload, first_seen, token, duplicates)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        (key, pending.lead.json(), now, pending.token, pending.duplicates)
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+        if duplicate:
+            self._count_duplicate()
+            return None
+        return pending
+
+    def _take_shared(self, pending: PendingLead) -> Optional[Lead]:
+        # Select and delete in one transaction: DELETE ... RETURNING needs
+        # SQLite 3.35, newer than some Python 3.9 builds ship
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT payload FROM pending_leads WHERE key = ? AND token = ?",
+                    (pending.key, pending.token)
+                ).fetchone()
+                if row:
+                    self._db.execute(
+                        "DELETE FROM pending_leads WHERE key = ? AND token = ?",
+                        (pending.key, pending.token)
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        # Gone: a later submission took the window over, merged leads and all
+        return Lead.parse_raw(row[0]) if row else None
+
+# Create singleton instance when a dedup window is configured
+lead_coalescer = LeadCoalescer.from_env()
\ No newline at end of file
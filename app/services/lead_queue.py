@@ -0,0 +1,275 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+import os
+import random
+import sqlite3
+import threading
+import time
+from ..models import Lead
+
+# A job's dedup window is open until it first comes due
+OPEN_WINDOW = "available_at > ? AND attempts = 0 AND leased_until IS NULL"
+
+@dataclass
+class QueuedLead:
+    job_id: int
+    lead: Lead
+    attempts: int
+
+class LeadQueue:
+    """Durable on-disk queue of scored leads awaiting CRM sync.
+
+    Backed by SQLite in WAL mode so the webhook can append cheaply while
+    one or more worker processes lease, retry and acknowledge jobs. Jobs
+    that exhaust their retries move to a dead-letter table, as do jobs a
+    throttled or failing CRM has kept turning away for `max_defer_seconds`;
+    those rejections do not count as attempts. A job can
+    also wait out a lead dedup window, due when it closes, with repeat
+    submissions merged into it meanwhile.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_attempts: int = 8,
+        base_delay: float = 2.0,
+        max_delay: float = 900.0,
+        lease_seconds: float = 300.0,
+        max_defer_seconds: float = 86400.0
+    ):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease_seconds = lease_seconds
+        self.max_defer_seconds = max_defer_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS lead_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                lead_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                leased_until REAL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                dedup_key TEXT
+            );
+            CREATE INDEX IF NOT EXISTS lead_queue_available
+                ON lead_queue (available_at);
+            CREATE TABLE IF NOT EXISTS dead_letter (
+                id INTEGER PRIMARY KEY,
+                lead_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                failed_at REAL NOT NULL
+            );
+        """)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(lead_queue)")}
+        if "dedup_key" not in columns:
+            self._db.execute("ALTER TABLE lead_queue ADD COLUMN dedup_key TEXT")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS lead_queue_dedup ON lead_queue (dedup_key)"
+            " WHERE dedup_key IS NOT NULL"
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional["LeadQueue"]:
+        path = os.getenv("LEAD_QUEUE_PATH")
+        if not path:
+            return None
+        return cls(
+            path,
+            max_attempts=int(os.getenv("LEAD_QUEUE_MAX_ATTEMPTS", "8")),
+            base_delay=float(os.getenv("LEAD_QUEUE_BASE_DELAY", "2")),
+            max_delay=float(os.getenv("LEAD_QUEUE_MAX_DELAY", "900")),
+            max_defer_seconds=float(os.getenv("LEAD_QUEUE_MAX_DEFER_SECONDS", "86400"))
+        )
+
+    def enqueue(self, lead: Lead, delay: float = 0.0):
+        self.enqueue_many([lead], delay)
+
+    def enqueue_many(self, leads: List[Lead], delay: float = 0.0):
+        """Append leads in a single transaction"""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT INTO lead_queue (lead_id, payload, available_at, created_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    [(lead.id, lead.json(), now + delay, now) for lead in leads]
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def coalescing(self, key: str) -> Optional[Lead]:
+        """The lead waiting in `key`'s open dedup window, if any"""
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT payload FROM lead_queue WHERE dedup_key = ? AND {OPEN_WINDOW}"
+                " ORDER BY id DESC LIMIT 1",
+                (key, time.time())
+            ).fetchone()
+        return Lead.parse_raw(row[0]) if row else None
+
+    def enqueue_coalesced(
+        self,
+        lead: Lead,
+        key: str,
+        window: float,
+        merge: Callable[[Lead, Lead], Lead]
+    ) -> bool:
+        """Merge `lead` into the job waiting in `key`'s open dedup window, or
+        queue it to open one, due `window` seconds from now.
+
+        Returns True if it opened a window. Either way the lead is on disk
+        before this returns.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    f"SELECT id, payload FROM lead_queue WHERE dedup_key = ? AND {OPEN_WINDOW}"
+                    " ORDER BY id DESC LIMIT 1",
+                    (key, now)
+                ).fetchone()
+                if row:
+                    self._db.execute(
+                        "UPDATE lead_queue SET payload = ? WHERE id = ?",
+                        (merge(Lead.parse_raw(row[1]), lead).json(), row[0])
+                    )
+                else:
+                    self._db.execute(
+                        "INSERT INTO lead_queue (lead_id, payload, available_at, created_at, dedup_key)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        (lead.id, lead.json(), now + window, now, key)
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return row is None
+
+    def lease(self, limit: int) -> List[QueuedLead]:
+        """Claim up to `limit` due jobs for this worker.
+
+        A leased job is hidden from other workers until it is acknowledged,
+        rescheduled, or its lease expires (e.g. the worker crashed).
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT id, payload, attempts FROM lead_queue"
+                    " WHERE available_at <= ?"
+                    " AND (leased_until IS NULL OR leased_until < ?)"
+                    " ORDER BY available_at LIMIT ?",
+                    (now, now, limit)
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE lead_queue SET leased_until = ? WHERE id = ?",
+                    [(now + self.lease_seconds, row[0]) for row in rows]
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+        return [
+            QueuedLead(job_id=row[0], lead=Lead.parse_raw(row[1]), attempts=row[2])
+            for row in rows
+        ]
+
+    def ack(self, job_id: int):
+        with self._lock:
+            self._db.execute("DELETE FROM lead_queue WHERE id = ?", (job_id,))
+
+    def fail(self, job: QueuedLead, error: str) -> bool:
+        """Reschedule a failed job with backoff, or dead-letter it.
+
+        Returns True if the job will be retried.
+        """
+        attempts = job.attempts + 1
+        with self._lock:
+            if attempts >= self.max_attempts:
+                self._dead_letter(job.job_id, attempts, error)
+                return False
+
+            self._db.execute(
+                "UPDATE lead_queue SET attempts = ?, available_at = ?,"
+                " leased_until = NULL, last_error = ? WHERE id = ?",
+                (attempts, time.time() + self.backoff(attempts), error, job.job_id)
+            )
+            return True
+
+    def defer(self, job: QueuedLead, error: str, delay: float) -> bool:
+        """Reschedule a job the CRM turned away, `delay` seconds from now.
+
+        The CRM never saw the lead, so this is not an attempt. A job still
+        turned away `max_defer_seconds` after it was queued is
+        dead-lettered. Returns True if the job will be retried.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT created_at FROM lead_queue WHERE id = ?", (job.job_id,)
+            ).fetchone()
+            if row and now - row[0] >= self.max_defer_seconds:
+                self._dead_letter(job.job_id, job.attempts, error)
+                return False
+
+            self._db.execute(
+                "UPDATE lead_queue SET available_at = ?,"
+                " leased_until = NULL, last_error = ? WHERE id = ?",
+                (now + delay, error, job.job_id)
+            )
+            return True
+
+    def _dead_letter(self, job_id: int, attempts: int, error: str):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            self._db.execute(
+                "INSERT INTO dead_letter"
+                " SELECT id, lead_id, payload, ?, ?, created_at, ?"
+                " FROM lead_queue WHERE id = ?",
+                (attempts, error, time.time(), job_id)
+            )
+            self._db.execute("DELETE FROM lead_queue WHERE id = ?", (job_id,))
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def backoff(self, attempts: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempts))
+
+    def stats(self) -> Dict[str, int]:
+        now = time.time()
+        with self._lock:
+            pending, leased = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(leased_until >= ?), 0) FROM lead_queue",
+                (now,)
+            ).fetchone()
+            dead = self._db.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+            coalescing = self._db.execute(
+                f"SELECT COUNT(*) FROM lead_queue WHERE dedup_key IS NOT NULL AND {OPEN_WINDOW}",
+                (now,)
+            ).fetchone()[0]
+        return {"pending": pending, "leased": leased, "dead_letter": dead, "coalescing": coalescing}
+
+# Create singleton instance when a queue path is configured
+lead_queue = LeadQueue.from_env()
\ No newline at end of file
@@ -1,147 +1,248 @@
-import joblib
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
-from typing import List, Dict, Optional
-import os
-from pathlib import Path
-import json
+from typing import Any, List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
+import os
+from .compiled_forest import CompiledForest
+from .model_registry import ModelRegistry, ModelBundle, model_registry
+from .score_cache import ScoreCache
+from .features import INPUT_COLUMNS, ColumnBatch, feature_pipeline
+from ..models import ScoreExplanation
+from ..utils.metrics import stage_seconds
+
+features_stage = stage_seconds.labels(stage="features")
+predict_stage = stage_seconds.labels(stage="predict")
+explain_stage = stage_seconds.labels(stage="explain")
+
+# Fallback heuristic: weight of each metric, and the value that earns it in full
+HEURISTIC_WEIGHTS = {
+    "website_visits": 0.2,
+    "time_on_site": 0.2,
+    "pages_viewed": 0.2,
+    "downloaded_resources": 0.25,
+    "email_interactions": 0.15
+}
+HEURISTIC_CAPS = {
+    "website_visits": 10,
+    "time_on_site": 300,
+    "pages_viewed": 5,
+    "downloaded_resources": 2,
+    "email_interactions": 3
+}
 
 class LeadPredictor:
-    def __init__(self):
-        self.model: Optional[RandomForestClassifier] = None
-        self.scaler: Optional[StandardScaler] = None
-        self.model_path = Path("app/models/lead_predictor.joblib")
-        self.scaler_path = Path("app/models/scaler.joblib")
+    def __init__(self, registry: Optional[ModelRegistry] = None, score_cache: Optional[ScoreCache] = None):
+        # All predictors share the process-wide registry by default, so a
+        # retrain is visible everywhere without reloading from disk
+        self.registry = registry or model_registry
         self.version = "1.0.0"
-        self.metadata_path = Path("app/models/metadata.json")
-        self._load_model()
-        self._load_metadata()
-
-    def _load_model(self):
-        """Load the trained model and scaler if they exist"""
-        try:
-            if self.model_path.exists() and self.scaler_path.exists():
-                self.model = joblib.load(self.model_path)
-                self.scaler = joblib.load(self.scaler_path)
-        except Exception as e:
-            print(f"Error loading model: {str(e)}")
-
-    def _load_metadata(self):
-        if self.metadata_path.exists():
-            with open(self.metadata_path, 'r') as f:
-                self.metadata = json.load(f)
-        else:
-            self.metadata = {
-                "version": self.version,
-                "training_date": None,
-                "num_samples": 0,
-                "performance_metrics": {}
-            }
-
-    def _prepare_features(self, metrics: Dict) -> np.ndarray:
-        """Convert engagement metrics to feature array with additional features"""
-        basic_features = np.array([
-            metrics["website_visits"],
-            metrics["time_on_site"],
-            metrics["pages_viewed"],
-            metrics["downloaded_resources"],
-            metrics["email_interactions"]
-        ])
-        
-        # Add derived features
-        engagement_rate = metrics["pages_viewed"] / max(metrics["website_visits"], 1)
-        avg_time_per_visit = metrics["time_on_site"] / max(metrics["website_visits"], 1)
-        
-        features = np.concatenate([
-            basic_features,
-            [engagement_rate, avg_time_per_visit]
-        ]).reshape(1, -1)
-        
-        if self.scaler:
-            features = self.scaler.transform(features)
-        
+        self.score_cache = score_cache or ScoreCache.from_env()
+        self.explanation_cache = ScoreCache(max_size=int(os.getenv("EXPLANATION_CACHE_SIZE", "10000")))
+        # Forest compiled for explanations when scoring runs without one
+        self._explainer: Tuple[Optional[str], Optional[CompiledForest]] = (None, None)
+        self.registry.on_swap(lambda _: self.score_cache.clear())
+        self.registry.on_swap(lambda _: self.explanation_cache.clear())
+
+    @property
+    def bundle(self) -> ModelBundle:
+        return self.registry.active
+
+    @property
+    def model(self) -> Optional[Any]:
+        return self.registry.active.model
+
+    @property
+    def scaler(self) -> Optional[Any]:
+        return self.registry.active.scaler
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.registry.active.metadata
+
+    def _prepare_features(self, metrics: Dict, scaler: Optional[Any] = None) -> np.ndarray:
+        """Convert engagement metrics to a (1, n_features) feature array"""
+        return self._prepare_features_batch([metrics], scaler)
+
+    def _prepare_features_batch(self, metrics_batch: List[Dict], scaler: Optional[Any] = None) -> np.ndarray:
+        """Convert a batch of engagement metrics to a single feature matrix"""
+        features = feature_pipeline.transform_records(metrics_batch)
+        if scaler:
+            features = scaler.transform(features)
         return features
 
     async def predict_conversion(self, metrics: Dict) -> float:
         """Predict conversion probability for a lead"""
-        if not self.model:
+        bundle = self.bundle
+        key = ScoreCache.key(bundle.version, metrics)
+        score = self.score_cache.get(key)
+        if score is None:
+            score = self._predict(bundle, metrics)
+            self.score_cache.set(key, score)
+        return score
+
+    async def predict_conversion_batch(self, metrics_batch: List[Dict]) -> np.ndarray:
+        """Predict conversion probabilities for many leads in one pass.
+
+        Returns one probability per input, in input order. Only leads
+        missing from the score cache are sent to the model.
+        """
+        return self.score_batch(metrics_batch)
+
+    def score_batch(self, metrics_batch: List[Dict]) -> np.ndarray:
+        """predict_conversion_batch for callers off the event loop"""
+        if not metrics_batch:
+            return np.empty(0)
+
+        bundle = self.bundle
+        keys = [ScoreCache.key(bundle.version, metrics) for metrics in metrics_batch]
+        cached = self.score_cache.get_many(keys)
+        misses = [i for i, score in enumerate(cached) if score is None]
+
+        scores = np.array([np.nan if score is None else score for score in cached])
+        if misses:
+            scores[misses] = self._predict_batch(bundle, [metrics_batch[i] for i in misses])
+            self.score_cache.set_many([(keys[i], float(scores[i])) for i in misses])
+        return scores
+
+    def score_columns(self, columns: ColumnBatch) -> np.ndarray:
+        """Score a column batch (see features.ColumnBatch) straight through the model.
+
+        Skips the score cache, for bulk jobs such as rescoring where
+        most leads are seen once.
+        """
+        return self._predict_columns(self.bundle, columns)
+
+    async def explain_batch(self, metrics_batch: List[Dict]) -> List[Optional[ScoreExplanation]]:
+        """Per-feature contributions to each lead's score, in input order.
+
+        Forests are explained by tree-path attribution on their compiled
+        tables and the heuristic by its weighted terms. Other models (e.g.
+        gradient boosting) give None. Cached by model version and metrics.
+        """
+        bundle = self.bundle
+        keys = [ScoreCache.key(bundle.version, metrics) for metrics in metrics_batch]
+        explanations = self.explanation_cache.get_many(keys)
+        misses = [i for i, explanation in enumerate(explanations) if explanation is None]
+        if not misses:
+            return explanations
+
+        forest = self._explainer_for(bundle)
+        if forest is None and bundle.model is not None:
+            return explanations
+
+        batch = [metrics_batch[i] for i in misses]
+        with explain_stage.time():
+            if forest is not None:
+                names = feature_pipeline.feature_names
+                baseline, contributions = forest.explain_batch(feature_pipeline.transform_records(batch))
+            else:
+                names = INPUT_COLUMNS
+                baseline, contributions = 0.0, self._heuristic_terms(batch)
+            # In score points
+            baseline = round(baseline * 100, 2)
+            for i, row in zip(misses, np.round(contributions * 100, 2).tolist()):
+                explanations[i] = ScoreExplanation(baseline=baseline, contributions=dict(zip(names, row)))
+        self.explanation_cache.set_many([(keys[i], explanations[i]) for i in misses])
+        return explanations
+
+    def _explainer_for(self, bundle: ModelBundle) -> Optional[CompiledForest]:
+        if bundle.compiled is not None:
+            if bundle.compiled.num_features == feature_pipeline.num_features:
+                return bundle.compiled
+            return None
+        if bundle.model is None:
+            return None
+        version, forest = self._explainer
+        if version != bundle.version:
+            forest = CompiledForest.compile(bundle.model, bundle.scaler)
+            self._explainer = (bundle.version, forest)
+        return forest
+
+    def _predict(self, bundle: ModelBundle, metrics: Dict) -> float:
+        if bundle.compiled and bundle.compiled.num_features == feature_pipeline.num_features:
+            # Feature prep is fused into the compiled walk
+            with predict_stage.time():
+                return bundle.compiled.predict_one(feature_pipeline.fill_row, metrics)
+
+        if not bundle.model:
             # Return a heuristic-based score if model isn't trained
-            return self._calculate_heuristic_score(metrics)
+            with predict_stage.time():
+                return self._calculate_heuristic_score(metrics)
 
-        features = self._prepare_features(metrics)
-        probabilities = self.model.predict_proba(features)
+        with features_stage.time():
+            features = self._prepare_features(metrics, bundle.scaler)
+        with predict_stage.time():
+            probabilities = bundle.model.predict_proba(features)
         return float(probabilities[0][1])  # Probability of conversion
 
+    def _predict_batch(self, bundle: ModelBundle, metrics_batch: List[Dict]) -> np.ndarray:
+        with features_stage.time():
+            columns = feature_pipeline.records_to_columns(metrics_batch)
+        return self._predict_columns(bundle, columns)
+
+    def _predict_columns(self, bundle: ModelBundle, columns: ColumnBatch) -> np.ndarray:
+        if bundle.compiled and bundle.compiled.num_features == feature_pipeline.num_features:
+            with features_stage.time():
+                features = feature_pipeline.transform(columns)
+            with predict_stage.time():
+                return bundle.compiled.predict_batch(features)
+
+        if not bundle.model:
+            with predict_stage.time():
+                return self._heuristic_columns(columns).sum(axis=1)
+
+        with features_stage.time():
+            features = feature_pipeline.transform(columns)
+            if bundle.scaler:
+                features = bundle.scaler.transform(features)
+        with predict_stage.time():
+            probabilities = bundle.model.predict_proba(features)
+        return probabilities[:, 1]
+
     def _calculate_heuristic_score(self, metrics: Dict) -> float:
         """Fallback heuristic scoring when model isn't trained"""
-        weights = {
-            "website_visits": 0.2,
-            "time_on_site": 0.2,
-            "pages_viewed": 0.2,
-            "downloaded_resources": 0.25,
-            "email_interactions": 0.15
-        }
-        
-        normalized_metrics = {
-            "website_visits": min(metrics["website_visits"] / 10, 1),
-            "time_on_site": min(metrics["time_on_site"] / 300, 1),
-            "pages_viewed": min(metrics["pages_viewed"] / 5, 1),
-            "downloaded_resources": min(metrics["downloaded_resources"] / 2, 1),
-            "email_interactions": min(metrics["email_interactions"] / 3, 1)
-        }
-        
-        score = sum(normalized_metrics[k] * weights[k] for k in weights)
-        return score
-
-    async def train(self, training_data: List[Dict], labels: List[int]):
-        """Train the model with historical data"""
-        if len(training_data) < 10:
-            raise ValueError("Insufficient training data")
-
-        # Prepare features
-        X = np.array([[
-            lead["website_visits"],
-            lead["time_on_site"],
-            lead["pages_viewed"],
-            lead["downloaded_resources"],
-            lead["email_interactions"]
-        ] for lead in training_data])
-
-        # Scale features
-        self.scaler = StandardScaler()
-        X_scaled = self.scaler.fit_transform(X)
-
-        # Train model
-        self.model = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=5,
-            random_state=42
+        return sum(
+            min(metrics[k] / HEURISTIC_CAPS[k], 1) * HEURISTIC_WEIGHTS[k]
+            for k in HEURISTIC_WEIGHTS
         )
-        self.model.fit(X_scaled, labels)
-
-        # Save model and scaler
-        os.makedirs(self.model_path.parent, exist_ok=True)
-        joblib.dump(self.model, self.model_path)
-        joblib.dump(self.scaler, self.scaler_path)
-
-        # Calculate and store performance metrics
-        from sklearn.metrics import accuracy_score, precision_score, recall_score
-        y_pred = self.model.predict(X_scaled)
-        
-        self.metadata.update({
-            "training_date": datetime.utcnow().isoformat(),
-            "num_samples": len(training_data),
-            "performance_metrics": {
-                "accuracy": float(accuracy_score(labels, y_pred)),
-                "precision": float(precision_score(labels, y_pred)),
-                "recall": float(recall_score(labels, y_pred))
-            }
-        })
-
-        with open(self.metadata_path, 'w') as f:
-            json.dump(self.metadata, f, indent=2)
+
+    def _heuristic_terms(self, metrics_batch: List[Dict]) -> np.ndarray:
+        """Each metric's term of the heuristic score, as (n, len(INPUT_COLUMNS))"""
+        return self._heuristic_columns(feature_pipeline.records_to_columns(metrics_batch))
+
+    def _heuristic_columns(self, columns: ColumnBatch) -> np.ndarray:
+        inputs = feature_pipeline.transform(columns)[:, :len(INPUT_COLUMNS)]
+        caps = np.array([HEURISTIC_CAPS[k] for k in INPUT_COLUMNS], dtype=np.float64)
+        weights = np.array([HEURISTIC_WEIGHTS[k] for k in INPUT_COLUMNS])
+        return np.minimum(inputs / caps, 1) * weights
+
+    async def train(
+        self,
+        training_data: List[Dict],
+        labels: List[int],
+        search: bool = False,
+        promote: bool = False
+    ) -> bool:
+        """Train the model with historical data.
+
+        With `search`, hyperparameters are chosen by cross-validation and
+        the result is published only with `promote`: the active model may
+        have trained on these rows, so the holdout cannot show the new
+        one is better. Returns whether a new model was published.
+        """
+        # Imported here so scoring-only processes never load sklearn
+        from .model_training import compare_with_active, fit_lead_model, fit_lead_model_search
+
+        base_metadata = {**self.metadata, "version": self.version}
+        if search:
+            model, scaler, metadata, holdout = fit_lead_model_search(training_data, labels, base_metadata)
+            if not compare_with_active(self.bundle, metadata, holdout, force=promote):
+                return False
+        else:
+            model, scaler, metadata = fit_lead_model(training_data, labels, base_metadata)
+
+        # Save model and scaler, then swap them in for every predictor
+        self.registry.publish(model, scaler, metadata)
+        return True
 
     def needs_retraining(self) -> bool:
         """Check if model needs retraining"""
@@ -0,0 +1,275 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import json
+import os
+import signal
+import threading
+import time
+from .compiled_forest import CompiledForest
+from .features import FeatureSchemaError, feature_pipeline
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+HEURISTIC_VERSION = "heuristic"
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """One immutable, consistent set of model, scaler and metadata.
+
+    Predictions read the registry's active bundle once and use it for the
+    whole call, so a swap never mixes a new model with an old scaler.
+    """
+    model: Optional[Any]
+    scaler: Optional[Any]
+    metadata: Dict[str, Any]
+    version: str
+    loaded_at: datetime = field(default_factory=datetime.utcnow)
+    # Flattened copy of model and scaler for fast scoring, if supported
+    compiled: Optional[CompiledForest] = field(default=None, repr=False)
+
+def default_metadata(app_version: str = "1.0.0") -> Dict[str, Any]:
+    return {
+        "version": app_version,
+        "model_version": None,
+        "training_date": None,
+        "num_samples": 0,
+        "performance_metrics": {}
+    }
+
+def _num_features(model: Any, compiled: Optional[CompiledForest]) -> Optional[int]:
+    if model is not None:
+        return getattr(model, "n_features_in_", None)
+    return compiled.num_features if compiled is not None else None
+
+class ModelRegistry:
+    """Process-wide owner of the loaded lead scoring model.
+
+    Swaps are a single reference assignment, so in-flight predictions keep
+    the bundle they started with. Other processes (e.g. uvicorn workers)
+    pick up a newly published model via `watch()` or a SIGHUP.
+    """
+
+    def __init__(self, model_dir: Path, compile_models: bool = True, prefer_compiled: bool = False):
+        self.model_dir = Path(model_dir)
+        self.compile_models = compile_models
+        # Load only the memory-mapped compiled tables when they match,
+        # skipping joblib/sklearn, so workers share one copy of the model
+        self.prefer_compiled = prefer_compiled
+        self.model_path = self.model_dir / "lead_predictor.joblib"
+        self.scaler_path = self.model_dir / "scaler.joblib"
+        self.compiled_path = self.model_dir / "lead_predictor.forest"
+        self.metadata_path = self.model_dir / "metadata.json"
+        self._swap_lock = threading.Lock()
+        self._listeners: List[Callable[[ModelBundle], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._active = self._load()
+
+    @property
+    def active(self) -> ModelBundle:
+        return self._active
+
+    def on_swap(self, listener: Callable[[ModelBundle], None]):
+        """Register a callback run after every model swap"""
+        self._listeners.append(listener)
+
+    def install(
+        self,
+        model: Any,
+        scaler: Any,
+        metadata: Dict[str, Any],
+        compiled: Optional[CompiledForest] = None
+    ) -> ModelBundle:
+        """Swap in an in-memory model without touching disk.
+
+        Raises FeatureSchemaError if the model was trained on other features.
+        """
+        feature_pipeline.check(metadata, _num_features(model, compiled))
+        bundle = self._bundle(
+            model, scaler, metadata, metadata.get("model_version") or HEURISTIC_VERSION, compiled
+        )
+        with self._swap_lock:
+            self._active = bundle
+        for listener in self._listeners:
+            listener(bundle)
+        return bundle
+
+    def publish(self, model: Any, scaler: Any, metadata: Dict[str, Any]) -> ModelBundle:
+        """Persist a newly trained model and make it the active one.
+
+        Each file is written to a temporary name and renamed into place;
+        metadata goes last, so watchers only react once the model and
+        scaler are complete. Supported forests are also saved as compiled
+        tables for processes running with `prefer_compiled`.
+        """
+        import joblib
+
+        feature_pipeline.check(metadata, _num_features(model, None))
+        version = metadata["model_version"]
+        # Stamp the artifacts so a reader can detect a torn set of files
+        model.model_version_ = version
+        scaler.model_version_ = version
+
+        compiled = CompiledForest.compile(model, scaler) if self.compile_models else None
+
+        os.makedirs(self.model_dir, exist_ok=True)
+        self._atomic_write(self.model_path, lambda f: joblib.dump(model, f))
+        self._atomic_write(self.scaler_path, lambda f: joblib.dump(scaler, f))
+        if compiled is not None:
+            self._atomic_write(self.compiled_path, compiled.save)
+        elif self.compiled_path.exists():
+            os.remove(self.compiled_path)
+        self._atomic_write(
+            self.metadata_path,
+            lambda f: f.write(json.dumps(metadata, indent=2).encode())
+        )
+
+        if self.prefer_compiled and compiled is not None:
+            # Serve from the shared mapping like every other worker
+            return self.install(None, None, metadata, CompiledForest.load(self.compiled_path))
+        return self.install(model, scaler, metadata, compiled)
+
+    def reload(self) -> bool:
+        """Load the model on disk if it differs from the active one"""
+        metadata = self._read_metadata()
+        version = metadata.get("model_version") or HEURISTIC_VERSION
+        if version == self._active.version:
+            return False
+
+        bundle = self._load()
+        # A bundle other than the published version means the load failed;
+        # keep serving the active model rather than swap in a fallback
+        if bundle.version != version or bundle.version == self._active.version:
+            return False
+        with self._swap_lock:
+            self._active = bundle
+        for listener in self._listeners:
+            listener(bundle)
+        return True
+
+    def watch(self, interval: float = 5.0):
+        """Poll the metadata file and reload when another process publishes"""
+        if self._watcher is not None:
+            return
+
+        def poll():
+            last_mtime = self._metadata_mtime()
+            while True:
+                time.sleep(interval)
+                mtime = self._metadata_mtime()
+                if mtime != last_mtime:
+                    last_mtime = mtime
+                    try:
+                        self.reload()
+                    except Exception as e:
+                        logger.error("Error reloading model", extra={"error": str(e)})
+
+        self._watcher = threading.Thread(target=poll, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def install_signal_handler(self):
+        """Reload the model on SIGHUP (main thread only, POSIX only)"""
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda *_: self.reload())
+
+    def _load(self) -> ModelBundle:
+        """Load the model and scaler if they exist"""
+        # A publish in another process may be mid-rename; retry briefly
+        # until model, scaler and metadata agree on a version
+        for _ in range(5):
+            metadata = self._read_metadata()
+            version = metadata.get("model_version")
+            if self.prefer_compiled and version:
+                compiled = self._load_compiled(version)
+                if compiled is not None:
+                    return self._checked(ModelBundle(None, None, metadata, version, compiled=compiled))
+
+            if not (self.model_path.exists() and self.scaler_path.exists()):
+                return ModelBundle(None, None, metadata, HEURISTIC_VERSION)
+
+            import joblib
+            try:
+                model = joblib.load(self.model_path)
+                scaler = joblib.load(self.scaler_path)
+            except Exception as e:
+                logger.error("Error loading model", extra={"error": str(e)})
+                return self._fallback(metadata)
+
+            stamps = {getattr(model, "model_version_", None), getattr(scaler, "model_version_", None)}
+            if stamps <= {version, None}:
+                return self._checked(self._bundle(model, scaler, metadata, version or "unversioned"))
+            time.sleep(0.1)
+
+        logger.error("Error loading model: model, scaler and metadata versions disagree")
+        return self._fallback(default_metadata())
+
+    def _fallback(self, metadata: Dict[str, Any]) -> ModelBundle:
+        """What to serve when the model on disk cannot be loaded: the active
+        bundle if there is one, else the heuristic"""
+        if hasattr(self, "_active"):
+            return self._active
+        return ModelBundle(None, None, metadata, HEURISTIC_VERSION)
+
+    def _checked(self, bundle: ModelBundle) -> ModelBundle:
+        """Fall back rather than serve a mismatched model"""
+        try:
+            feature_pipeline.check(bundle.metadata, _num_features(bundle.model, bundle.compiled))
+        except FeatureSchemaError as e:
+            logger.error("Error loading model", extra={"error": str(e)})
+            return self._fallback(bundle.metadata)
+        return bundle
+
+    def _load_compiled(self, version: str) -> Optional[CompiledForest]:
+        try:
+            compiled = CompiledForest.load(self.compiled_path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error("Error loading compiled model", extra={"error": str(e)})
+            return None
+        return compiled if compiled.model_version == version else None
+
+    def _bundle(
+        self,
+        model: Any,
+        scaler: Any,
+        metadata: Dict[str, Any],
+        version: str,
+        compiled: Optional[CompiledForest] = None
+    ) -> ModelBundle:
+        if compiled is None and self.compile_models and model is not None:
+            compiled = CompiledForest.compile(model, scaler)
+        return ModelBundle(model, scaler, metadata, version, compiled=compiled)
+
+    def _read_metadata(self) -> Dict[str, Any]:
+        if self.metadata_path.exists():
+            with open(self.metadata_path, 'r') as f:
+                return {**default_metadata(), **json.load(f)}
+        return default_metadata()
+
+    def _metadata_mtime(self) -> Optional[float]:
+        try:
+            return self.metadata_path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _atomic_write(path: Path, write: Callable):
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+# Create singleton instance
+model_registry = ModelRegistry(
+    Path("app/models"),
+    compile_models=os.getenv("MODEL_COMPILED_INFERENCE", "true").lower() == "true",
+    prefer_compiled=(
+        os.getenv("MODEL_MMAP", "true").lower() == "true"
+        or os.getenv("FAST_STARTUP", "false").lower() == "true"
+    )
+)
\ No newline at end of file
@@ -0,0 +1,319 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import os
+import time
+import uuid
+from datetime import datetime
+from .features import feature_pipeline
+from .training_data import iter_chunks, load_matrix
+
+MIN_TRAINING_SAMPLES = 10
+# Per-run metadata that must not carry over from the model being replaced
+RUN_METADATA_KEYS = ("search", "promotion", "feature_profile", "retraining")
+
+def _forest_search_space():
+    return RandomForestClassifier(random_state=42), {
+        "n_estimators": [50, 100, 200, 300],
+        "max_depth": [4, 6, 8, 12, None],
+        "min_samples_leaf": [1, 2, 4, 8, 16],
+        "max_features": ["sqrt", 0.5, 1.0],
+        "class_weight": [None, "balanced"]
+    }
+
+def _hist_gradient_boosting_search_space():
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    # Early stopping on an internal validation split ends weak fits early
+    return HistGradientBoostingClassifier(
+        max_iter=500, early_stopping=True, n_iter_no_change=10, random_state=42
+    ), {
+        "learning_rate": [0.03, 0.1, 0.3],
+        "max_leaf_nodes": [15, 31, 63],
+        "max_depth": [None, 4, 8],
+        "min_samples_leaf": [10, 20, 50],
+        "l2_regularization": [0.0, 0.1, 1.0]
+    }
+
+SEARCH_SPACES = {
+    "forest": _forest_search_space,
+    "hist_gradient_boosting": _hist_gradient_boosting_search_space
+}
+
+def validate_training_data(training_data: List[Dict], labels: List[int]):
+    if len(training_data) < MIN_TRAINING_SAMPLES:
+        raise ValueError("Insufficient training data")
+    if len(training_data) != len(labels):
+        raise ValueError("Number of leads and labels must match")
+
+def fit_lead_model(
+    training_data: List[Dict],
+    labels: List[int],
+    base_metadata: Dict[str, Any]
+) -> Tuple[RandomForestClassifier, StandardScaler, Dict[str, Any]]:
+    """Fit the scaler and model and compute metadata for a new version.
+
+    Pure CPU work with no registry or disk access, so it can run in a
+    worker process.
+    """
+    validate_training_data(training_data, labels)
+
+    # Same features as inference, in float32 to halve the training matrix
+    X = feature_pipeline.transform_records(training_data, dtype=np.float32)
+
+    return fit_lead_model_arrays(X, np.asarray(labels), base_metadata)
+
+def fit_lead_model_arrays(
+    X: np.ndarray,
+    y: np.ndarray,
+    base_metadata: Dict[str, Any]
+) -> Tuple[RandomForestClassifier, StandardScaler, Dict[str, Any]]:
+    """Fit on a prepared feature matrix, scaling it in place"""
+    if len(X) < MIN_TRAINING_SAMPLES:
+        raise ValueError("Insufficient training data")
+
+    # Profile the raw features before they are scaled in place
+    feature_profile = feature_pipeline.profile(X)
+
+    # Scale features without a second copy of the matrix
+    scaler = StandardScaler(copy=False)
+    X_scaled = scaler.fit_transform(X)
+    scaler.copy = True  # never modify callers' arrays at inference
+
+    # Train model
+    model = RandomForestClassifier(
+        n_estimators=100,
+        max_depth=5,
+        random_state=42
+    )
+    model.fit(X_scaled, y)
+
+    # Calculate and store performance metrics
+    from sklearn.metrics import accuracy_score, precision_score, recall_score
+    y_pred = model.predict(X_scaled)
+
+    metadata = _versioned_metadata(base_metadata, len(X), {
+        "accuracy": float(accuracy_score(y, y_pred)),
+        "precision": float(precision_score(y, y_pred)),
+        "recall": float(recall_score(y, y_pred))
+    })
+    metadata["feature_profile"] = feature_profile
+    return model, scaler, metadata
+
+def fit_lead_model_search(
+    training_data: List[Dict],
+    labels: List[int],
+    base_metadata: Dict[str, Any],
+    **kwargs
+) -> Tuple[Any, StandardScaler, Dict[str, Any], Tuple[np.ndarray, np.ndarray]]:
+    """Hyperparameter search on lead dicts; see fit_lead_model_search_arrays"""
+    validate_training_data(training_data, labels)
+    X = feature_pipeline.transform_records(training_data, dtype=np.float32)
+    return fit_lead_model_search_arrays(X, np.asarray(labels), base_metadata, **kwargs)
+
+def fit_lead_model_search_arrays(
+    X: np.ndarray,
+    y: np.ndarray,
+    base_metadata: Dict[str, Any],
+    estimators: Sequence[str] = ("forest",),
+    n_jobs: Optional[int] = None,
+    cv: int = 3,
+    max_candidates: int = 24,
+    holdout_fraction: float = 0.2,
+    holdout_mask: Optional[np.ndarray] = None
+) -> Tuple[Any, StandardScaler, Dict[str, Any], Tuple[np.ndarray, np.ndarray]]:
+    """Pick hyperparameters by cross-validated successive halving.
+
+    A stratified holdout is set aside first. Each estimator family is
+    searched with HalvingRandomSearchCV on the rest, scored by ROC AUC:
+    candidates start on a small sample and only the best third advance to
+    three times the data, so most of the budget goes to promising fits.
+    Folds run across a joblib process pool of `n_jobs` workers
+    (TRAINING_N_JOBS, default all cores). The best model is refit on the
+    training split and its holdout metrics are recorded.
+
+    Also returns the holdout features and labels, so the caller can score
+    the current model on the same rows before promoting this one. Pass
+    `holdout_mask` to choose those rows, e.g. ones the current model was
+    not trained on.
+    """
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import HalvingRandomSearchCV, StratifiedKFold, train_test_split
+
+    if len(X) < MIN_TRAINING_SAMPLES:
+        raise ValueError("Insufficient training data")
+    unknown = set(estimators) - set(SEARCH_SPACES)
+    if unknown:
+        raise ValueError(f"Unsupported estimators: {sorted(unknown)}")
+    if np.bincount(y, minlength=2).min() < cv + 1:
+        raise ValueError(f"Need at least {cv + 1} converted and unconverted leads to search")
+    if n_jobs is None:
+        n_jobs = int(os.getenv("TRAINING_N_JOBS", "-1"))
+
+    if holdout_mask is not None:
+        X_train, X_holdout = X[~holdout_mask], X[holdout_mask]
+        y_train, y_holdout = y[~holdout_mask], y[holdout_mask]
+    else:
+        X_train, X_holdout, y_train, y_holdout = train_test_split(
+            X, y, test_size=holdout_fraction, stratify=y, random_state=42
+        )
+    scaler = StandardScaler().fit(X_train)
+    X_train_scaled = scaler.transform(X_train)
+
+    # First-round sample: enough rows per fold for early stopping's own
+    # validation split, otherwise sized so the search can halve to one
+    min_resources = min(len(y_train), max(100 * cv, len(y_train) // 27))
+
+    start = time.perf_counter()
+    best = None
+    for name in estimators:
+        estimator, params = SEARCH_SPACES[name]()
+        search = HalvingRandomSearchCV(
+            estimator,
+            params,
+            n_candidates=max_candidates,
+            factor=3,
+            min_resources=min_resources,
+            scoring="roc_auc",
+            cv=StratifiedKFold(cv, shuffle=True, random_state=42),
+            n_jobs=n_jobs,
+            random_state=42
+        )
+        search.fit(X_train_scaled, y_train)
+        if best is None or search.best_score_ > best[1].best_score_:
+            best = (name, search)
+
+    name, search = best
+    model = search.best_estimator_
+    metrics = holdout_metrics(model.predict_proba(scaler.transform(X_holdout))[:, 1], y_holdout)
+
+    metadata = _versioned_metadata(base_metadata, len(X_train), metrics)
+    metadata["feature_profile"] = feature_pipeline.profile(X_train)
+    metadata["search"] = {
+        "estimator": name,
+        "params": dict(search.best_params_),
+        "cv_auc": float(search.best_score_),
+        "candidates": int(sum(search.n_candidates_)),
+        "n_jobs": n_jobs,
+        "duration_seconds": round(time.perf_counter() - start, 2),
+        "holdout_samples": len(y_holdout)
+    }
+    return model, scaler, metadata, (X_holdout, y_holdout)
+
+def holdout_metrics(scores: np.ndarray, y: np.ndarray) -> Dict[str, float]:
+    from sklearn.metrics import accuracy_score, precision_score, recall_score, roc_auc_score
+    y_pred = (scores >= 0.5).astype(int)
+    return {
+        "auc": float(roc_auc_score(y, scores)),
+        "accuracy": float(accuracy_score(y, y_pred)),
+        "precision": float(precision_score(y, y_pred, zero_division=0)),
+        "recall": float(recall_score(y, y_pred, zero_division=0))
+    }
+
+def compare_with_active(
+    bundle: Any,
+    metadata: Dict[str, Any],
+    holdout: Tuple[np.ndarray, np.ndarray],
+    holdout_unseen: bool = False,
+    force: bool = False
+) -> bool:
+    """Score the active model on the candidate's holdout; True to promote.
+
+    Records the comparison in `metadata["promotion"]`. The candidate is
+    promoted only if it beats the active model on a holdout that
+    `holdout_unseen` says the active model never trained on; on other
+    rows the active model's AUC is inflated, so the comparison cannot
+    show the candidate is better. `force` promotes regardless. A
+    heuristic or otherwise unscorable active model is always replaced.
+    """
+    from sklearn.metrics import roc_auc_score
+    X_holdout, y_holdout = holdout
+
+    baseline_auc = None
+    if bundle.compiled is not None and bundle.compiled.num_features == X_holdout.shape[1]:
+        baseline_auc = float(roc_auc_score(y_holdout, bundle.compiled.predict_batch(X_holdout)))
+    elif bundle.model is not None and bundle.scaler is not None:
+        try:
+            scores = bundle.model.predict_proba(bundle.scaler.transform(X_holdout))[:, 1]
+            baseline_auc = float(roc_auc_score(y_holdout, scores))
+        except ValueError:
+            pass  # trained on other features; replace it
+
+    candidate_auc = metadata["performance_metrics"]["auc"]
+    beats = baseline_auc is None or (holdout_unseen and candidate_auc > baseline_auc)
+    promoted = force or beats
+    metadata["promotion"] = {
+        "baseline_version": bundle.version,
+        "baseline_holdout_auc": baseline_auc,
+        "holdout_auc": candidate_auc,
+        "holdout_unseen": holdout_unseen,
+        "forced": force and not beats,
+        "promoted": promoted
+    }
+    return promoted
+
+def fit_lead_model_from_file(
+    path: str,
+    fmt: str,
+    base_metadata: Dict[str, Any],
+    mode: str = "batch",
+    chunk_size: int = 10000,
+    epochs: int = 5
+) -> Tuple[Any, StandardScaler, Dict[str, Any]]:
+    """Train from an NDJSON or CSV file without materializing Python rows.
+
+    "batch" fills a preallocated float32 matrix and fits the usual forest.
+    "incremental" never holds more than one chunk: it fits the scaler and
+    an SGD logistic model with partial_fit, for data larger than memory.
+    """
+    if mode == "batch":
+        X, y = load_matrix(path, fmt, chunk_size)
+        return fit_lead_model_arrays(X, y, base_metadata)
+    if mode != "incremental":
+        raise ValueError(f"Unsupported training mode: {mode}")
+
+    scaler = StandardScaler()
+    num_samples = 0
+    for X_chunk, _ in iter_chunks(path, fmt, chunk_size):
+        scaler.partial_fit(feature_pipeline.transform(X_chunk, dtype=np.float32))
+        num_samples += len(X_chunk)
+    if num_samples < MIN_TRAINING_SAMPLES:
+        raise ValueError("Insufficient training data")
+
+    model = SGDClassifier(loss="log_loss", random_state=42)
+    for _ in range(epochs):
+        for X_chunk, y_chunk in iter_chunks(path, fmt, chunk_size):
+            features = feature_pipeline.transform(X_chunk, dtype=np.float32)
+            model.partial_fit(scaler.transform(features), y_chunk, classes=[0, 1])
+
+    # Streaming confusion counts for the training metrics
+    tp = fp = fn = correct = 0
+    for X_chunk, y_chunk in iter_chunks(path, fmt, chunk_size):
+        y_pred = model.predict(scaler.transform(feature_pipeline.transform(X_chunk, dtype=np.float32)))
+        tp += int(np.sum((y_pred == 1) & (y_chunk == 1)))
+        fp += int(np.sum((y_pred == 1) & (y_chunk == 0)))
+        fn += int(np.sum((y_pred == 0) & (y_chunk == 1)))
+        correct += int(np.sum(y_pred == y_chunk))
+
+    return model, scaler, _versioned_metadata(base_metadata, num_samples, {
+        "accuracy": correct / num_samples,
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0
+    })
+
+def _versioned_metadata(
+    base_metadata: Dict[str, Any],
+    num_samples: int,
+    performance_metrics: Dict[str, float]
+) -> Dict[str, Any]:
+    training_date = datetime.utcnow()
+    return {
+        # These describe the run and data that produced the previous model
+        **{k: v for k, v in base_metadata.items() if k not in RUN_METADATA_KEYS},
+        "model_version": f"{training_date:%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}",
+        "training_date": training_date.isoformat(),
+        "num_samples": num_samples,
+        "feature_schema": feature_pipeline.schema(),
+        "performance_metrics": performance_metrics
+    }
\ No newline at end of file
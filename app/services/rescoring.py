@@ -0,0 +1,237 @@
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import csv
+import json
+import os
+import time
+import numpy as np
+from .crm.base import CRMAdapter, ScoreUpdate, rescore_record
+from .features import INPUT_COLUMNS, feature_pipeline
+from .lead_classifier import score_status
+from .ml_predictor import LeadPredictor
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+FILE_FORMATS = ("csv", "ndjson", "parquet")
+
+# Leads per page read from a file; CRMs cap their own pages lower
+DEFAULT_FILE_PAGE_SIZE = 10000
+DEFAULT_CRM_PAGE_SIZE = 2000
+
+def file_format(path: Path) -> str:
+    """The lead file format implied by a file name"""
+    suffix = Path(path).suffix.lower().lstrip(".")
+    return {"jsonl": "ndjson", "json": "ndjson", "pq": "parquet"}.get(suffix, suffix)
+
+def _file_rows(path: Path, fmt: str) -> Iterator[Dict[str, Any]]:
+    """Yield each record of a lead file as a dict, reading a line or row batch at a time"""
+    if fmt == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Reading Parquet files needs pyarrow (pip install pyarrow)")
+        parquet = pq.ParquetFile(path)
+        wanted = {"id", "email", "status", "score", *INPUT_COLUMNS}
+        columns = [name for name in parquet.schema_arrow.names if name in wanted]
+        for batch in parquet.iter_batches(batch_size=DEFAULT_FILE_PAGE_SIZE, columns=columns):
+            yield from batch.to_pylist()
+        return
+
+    with open(path, 'r', newline='') as f:
+        if fmt == "ndjson":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            raise ValueError(f"Unsupported lead file format: {fmt}")
+
+class FileSource:
+    """Leads from a CSV, NDJSON or Parquet export.
+
+    Each record needs the INPUT_COLUMNS metrics and an `email` or CRM
+    record `id`. Optional `status` and `score` columns hold the current
+    result; records without them are always written back. The cursor is
+    the number of records already read.
+    """
+
+    def __init__(self, path: Path, fmt: Optional[str] = None, page_size: int = DEFAULT_FILE_PAGE_SIZE):
+        self.path = Path(path)
+        self.fmt = fmt or file_format(self.path)
+        if self.fmt not in FILE_FORMATS:
+            raise ValueError(f"Unsupported lead file format: {self.fmt}")
+        self.page_size = page_size
+
+    @property
+    def name(self) -> str:
+        return f"file:{self.path.resolve()}"
+
+    async def pages(self, cursor: Optional[str] = None) -> AsyncIterator[Tuple[List[Dict[str, Any]], str]]:
+        skip = int(cursor or 0)
+        page = []
+        position = 0
+        for row in _file_rows(self.path, self.fmt):
+            position += 1
+            if position <= skip:
+                continue
+            if position == skip + 1:
+                missing = [name for name in INPUT_COLUMNS if name not in row]
+                if missing:
+                    raise ValueError(f"{self.path} has no {', '.join(missing)} column")
+            page.append(rescore_record(
+                str(row["id"]) if row.get("id") else None,
+                row.get("email") or "",
+                row.get("status"),
+                row.get("score"),
+                row
+            ))
+            if len(page) == self.page_size:
+                yield page, str(position)
+                page = []
+        if page:
+            yield page, str(position)
+
+class CRMSource:
+    """Leads paged out of the CRM with the adapter's resumable cursor"""
+
+    def __init__(self, adapter: CRMAdapter, page_size: int = DEFAULT_CRM_PAGE_SIZE):
+        self.adapter = adapter
+        self.page_size = page_size
+
+    @property
+    def name(self) -> str:
+        return f"crm:{self.adapter.identity_namespace}"
+
+    async def pages(self, cursor: Optional[str] = None) -> AsyncIterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        while True:
+            records, cursor = await self.adapter.query_leads(self.page_size, cursor)
+            if records:
+                yield records, cursor
+            if cursor is None:
+                return
+
+class BulkRescorer:
+    """Rescores existing leads page by page and writes back the ones that changed.
+
+    Holds one page at a time, so memory stays flat however many leads
+    the source has. After each page's writes the cursor and counts are
+    saved to `checkpoint_path`, and a rerun with the same source and
+    model continues from there.
+    """
+
+    def __init__(
+        self,
+        predictor: LeadPredictor,
+        adapter: Optional[CRMAdapter] = None,
+        checkpoint_path: Optional[Path] = None,
+        dry_run: bool = False,
+        progress_interval: float = 10.0
+    ):
+        if adapter is None and not dry_run:
+            raise ValueError("A CRM adapter is needed unless this is a dry run")
+        self.predictor = predictor
+        self.adapter = adapter
+        # Dry runs write nothing, so they leave no checkpoint for a real run to trip over
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path and not dry_run else None
+        self.dry_run = dry_run
+        self.progress_interval = progress_interval
+
+    def updates_for(self, page: List[Dict[str, Any]]) -> Tuple[List[ScoreUpdate], int]:
+        """Score a page in one vectorized pass.
+
+        Returns updates for the leads whose score or status changed, and
+        how many changed leads had neither an id nor an email to write to.
+        """
+        probabilities = self.predictor.score_columns(feature_pipeline.records_to_columns(page))
+        updates = []
+        unmatched = 0
+        for record, score in zip(page, np.rint(probabilities * 100).astype(int).tolist()):
+            status = score_status(score)
+            if record["score"] == score and record["status"] == status:
+                continue
+            if not record["id"] and not record["email"]:
+                unmatched += 1
+                continue
+            updates.append(ScoreUpdate(record["id"], record["email"], status, score))
+        return updates, unmatched
+
+    async def run(self, source: Any, restart: bool = False) -> Dict[str, Any]:
+        version = self.predictor.bundle.version
+        state = {
+            "source": source.name,
+            "model_version": version,
+            "cursor": None,
+            "done": False,
+            "rows": 0,
+            "changed": 0,
+            "written": 0,
+            "failed": 0,
+            "unmatched": 0,
+            "elapsed_s": 0.0
+        }
+        saved = self._load_checkpoint() if not restart else None
+        if saved is not None:
+            if saved["source"] != source.name or saved["model_version"] != version:
+                raise ValueError(
+                    f"{self.checkpoint_path} is for {saved['source']} with model {saved['model_version']};"
+                    f" restart to rescore {source.name} with model {version}"
+                )
+            state = saved
+        if state["done"]:
+            return self._summary(state, 0, 0.0)
+
+        start = time.perf_counter()
+        resumed_rows = state["rows"]
+        elapsed_before = state["elapsed_s"]
+        last_report = start
+        async for page, cursor in source.pages(state["cursor"]):
+            updates, unmatched = self.updates_for(page)
+            state["rows"] += len(page)
+            state["changed"] += len(updates) + unmatched
+            state["unmatched"] += unmatched
+            if updates and not self.dry_run:
+                results = await self.adapter.update_scores(updates)
+                state["written"] += sum(results)
+                state["failed"] += len(results) - sum(results)
+            state["cursor"] = cursor
+            state["elapsed_s"] = elapsed_before + time.perf_counter() - start
+            self._save_checkpoint(state)
+
+            now = time.perf_counter()
+            if now - last_report >= self.progress_interval:
+                last_report = now
+                logger.info("Rescoring progress", extra={
+                    "rows_per_s": round((state["rows"] - resumed_rows) / (now - start), 1),
+                    **{key: state[key] for key in ("rows", "changed", "written", "failed")}
+                })
+
+        state["done"] = True
+        state["elapsed_s"] = elapsed_before + time.perf_counter() - start
+        self._save_checkpoint(state)
+        return self._summary(state, state["rows"] - resumed_rows, time.perf_counter() - start)
+
+    def _summary(self, state: Dict[str, Any], rows: int, elapsed: float) -> Dict[str, Any]:
+        summary = {key: value for key, value in state.items() if key != "cursor"}
+        summary["elapsed_s"] = round(state["elapsed_s"], 3)
+        summary["dry_run"] = self.dry_run
+        # Throughput of this invocation, excluding rows read before a resume
+        summary["rows_this_run"] = rows
+        summary["rows_per_s"] = round(rows / elapsed, 1) if elapsed else None
+        return summary
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        if self.checkpoint_path is None or not self.checkpoint_path.exists():
+            return None
+        with open(self.checkpoint_path) as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, state: Dict[str, Any]):
+        if self.checkpoint_path is None:
+            return
+        # Write then rename, so a crash mid-write leaves the previous checkpoint
+        tmp_path = self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)
\ No newline at end of file
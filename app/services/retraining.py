@@ -0,0 +1,249 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+import multiprocessing
+import os
+import threading
+import time
+import numpy as np
+from .analytics_store import AnalyticsStore, analytics_store
+from .features import INPUT_COLUMNS, feature_pipeline
+from .lead_classifier import lead_predictor
+from .ml_predictor import LeadPredictor
+from .training_jobs import _train_in_subprocess, _wait_for_result, training_lock
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SNAPSHOT_COLUMNS = ("lead_id",) + INPUT_COLUMNS + ("converted", "outcome_recorded_at")
+DRIFT_WINDOW_SECONDS = 7 * 86400
+
+def _empty_snapshot() -> Dict[str, np.ndarray]:
+    snapshot = {name: np.empty(0, dtype=np.int64) for name in INPUT_COLUMNS}
+    snapshot["lead_id"] = np.empty(0, dtype="U36")
+    snapshot["converted"] = np.empty(0, dtype=np.int8)
+    snapshot["outcome_recorded_at"] = np.empty(0, dtype=np.float64)
+    return snapshot
+
+def _timestamp(isoformat: Optional[str]) -> float:
+    if not isoformat:
+        return 0.0
+    return datetime.fromisoformat(isoformat).replace(tzinfo=timezone.utc).timestamp()
+
+class RetrainingScheduler:
+    """Retrains the lead model when it is stale or its inputs have drifted.
+
+    Labeled outcomes are pulled from the analytics store incrementally:
+    each run reads only outcomes recorded after the previous pull and
+    merges them into a local training snapshot. A run retrains when there
+    are enough new labels and the model is older than needs_retraining()
+    allows, or recent leads have drifted from its training profile.
+    Fitting happens in a separate process and the result is published to
+    the registry, so API workers hot-swap it. The registry's training lock
+    keeps runs from API workers, the CLI and cron from ever overlapping
+    with each other or with /train-model jobs.
+    """
+
+    def __init__(
+        self,
+        predictor: LeadPredictor,
+        store: AnalyticsStore,
+        data_dir: Path,
+        min_new_labels: int = 100,
+        drift_threshold: float = 0.25,
+        search: bool = False
+    ):
+        self.predictor = predictor
+        self.store = store
+        self.snapshot_path = Path(data_dir) / "training_snapshot.npz"
+        self.min_new_labels = min_new_labels
+        self.drift_threshold = drift_threshold
+        self.search = search
+        self._thread: Optional[threading.Thread] = None
+        self._context = multiprocessing.get_context("spawn")
+
+    @classmethod
+    def from_env(cls, predictor: LeadPredictor) -> Optional["RetrainingScheduler"]:
+        if analytics_store is None:
+            return None
+        return cls(
+            predictor,
+            analytics_store,
+            Path(os.getenv("RETRAIN_DATA_DIR") or predictor.registry.model_dir),
+            min_new_labels=int(os.getenv("RETRAIN_MIN_NEW_LABELS", "100")),
+            drift_threshold=float(os.getenv("RETRAIN_DRIFT_THRESHOLD", "0.25")),
+            search=os.getenv("RETRAIN_SEARCH", "false").lower() == "true"
+        )
+
+    def start(self, interval: float):
+        """Check for due retraining every `interval` seconds on a background thread"""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error("Error retraining model", extra={"error": str(e)})
+
+        self._thread = threading.Thread(target=loop, name="retraining", daemon=True)
+        self._thread.start()
+
+    def run_once(self, force: bool = False) -> Dict[str, Any]:
+        """Pull new labels and retrain if due; returns a summary of the run"""
+        with training_lock(self.predictor.registry.model_dir) as acquired:
+            if not acquired:
+                return {"status": "skipped", "reason": "another training run is in progress"}
+            return self._run(force)
+
+    def _run(self, force: bool) -> Dict[str, Any]:
+        start = time.perf_counter()
+        snapshot, pulled = self._pull()
+        trained_at = _timestamp(self.predictor.metadata.get("training_date"))
+        # Labels recorded after the active model was trained are ones it never saw
+        new_labels = int(np.sum(snapshot["outcome_recorded_at"] > trained_at))
+        summary = {
+            "samples": len(snapshot["lead_id"]),
+            "pulled_labels": pulled,
+            "new_labels": new_labels
+        }
+
+        trigger = self._trigger(snapshot, new_labels, trained_at, summary, force)
+        if trigger is None:
+            summary.update(status="not_due", duration_seconds=round(time.perf_counter() - start, 2))
+            return summary
+
+        summary["trigger"] = trigger
+        X = feature_pipeline.transform(snapshot, dtype=np.float32)
+        y = snapshot["converted"]
+        holdout_mask = self._unseen_holdout(y, snapshot["outcome_recorded_at"] > trained_at) if self.search else None
+        outcome, payload = self._fit(X, y, holdout_mask)
+        summary["duration_seconds"] = round(time.perf_counter() - start, 2)
+        if outcome != "ok":
+            summary.update(status="failed", error=payload)
+            logger.error("Retraining failed", extra={
+                "trigger": trigger, "duration_seconds": summary["duration_seconds"], "error": payload
+            })
+            return summary
+
+        model, scaler, metadata, *holdout = payload
+        metadata["retraining"] = {k: v for k, v in summary.items() if k != "drift"}
+        if holdout:
+            from .model_training import compare_with_active
+            # Only a holdout of labels the active model never saw can show
+            # the new model is better
+            if not compare_with_active(
+                self.predictor.bundle, metadata, holdout[0], holdout_unseen=holdout_mask is not None
+            ):
+                summary.update(status="rejected", promotion=metadata["promotion"])
+                logger.info("Retrained model not promoted: it did not beat the active model on unseen labels", extra={
+                    "trigger": trigger, "samples": summary["samples"], "new_labels": new_labels,
+                    "duration_seconds": summary["duration_seconds"], "model_version": self.predictor.bundle.version
+                })
+                return summary
+
+        self.predictor.registry.publish(model, scaler, metadata)
+        summary.update(status="published", model_version=metadata["model_version"])
+        logger.info("Retrained model published", extra={
+            "trigger": trigger, "samples": summary["samples"], "new_labels": new_labels,
+            "duration_seconds": summary["duration_seconds"], "model_version": metadata["model_version"]
+        })
+        return summary
+
+    def _trigger(
+        self,
+        snapshot: Dict[str, np.ndarray],
+        new_labels: int,
+        trained_at: float,
+        summary: Dict[str, Any],
+        force: bool
+    ) -> Optional[str]:
+        from .model_training import MIN_TRAINING_SAMPLES
+        if len(snapshot["lead_id"]) < MIN_TRAINING_SAMPLES or len(np.unique(snapshot["converted"])) < 2:
+            return "forced" if force else None
+        if force:
+            return "forced"
+        # Without new outcomes a retrain would only refit the same data
+        if new_labels < self.min_new_labels:
+            return None
+        if self.predictor.needs_retraining():
+            return "stale"
+
+        profile = self.predictor.metadata.get("feature_profile")
+        if profile:
+            recent = self.store.recent_metrics(max(trained_at, time.time() - DRIFT_WINDOW_SECONDS))
+            if len(recent[INPUT_COLUMNS[0]]):
+                psi = feature_pipeline.drift(profile, feature_pipeline.transform(recent))
+                summary["drift"] = psi
+                if max(psi.values()) > self.drift_threshold:
+                    return "drift"
+        return None
+
+    def _pull(self):
+        """Merge outcomes recorded since the last pull into the snapshot"""
+        snapshot = self._load_snapshot()
+        recorded_at = snapshot["outcome_recorded_at"]
+        cursor = float(recorded_at.max()) if len(recorded_at) else 0.0
+        new = self.store.labeled_since(cursor)
+        pulled = len(new["lead_id"])
+        if pulled:
+            new["lead_id"] = new["lead_id"].astype("U36")
+            merged = {name: np.concatenate([snapshot[name], new[name]]) for name in SNAPSHOT_COLUMNS}
+            # A lead relabeled since an earlier pull keeps only its latest outcome
+            ids = merged["lead_id"]
+            _, last = np.unique(ids[::-1], return_index=True)
+            keep = np.sort(len(ids) - 1 - last)
+            snapshot = {name: column[keep] for name, column in merged.items()}
+            self._save_snapshot(snapshot)
+        return snapshot, pulled
+
+    @staticmethod
+    def _unseen_holdout(y: np.ndarray, unseen: np.ndarray) -> Optional[np.ndarray]:
+        """A fifth of the labels the active model never trained on, so the
+        promotion comparison does not favour it; None if those lack a class"""
+        holdout = np.zeros(len(y), dtype=bool)
+        candidates = np.flatnonzero(unseen)
+        rng = np.random.default_rng(42)
+        holdout[rng.choice(candidates, len(candidates) // 5, replace=False)] = True
+        return holdout if len(np.unique(y[holdout])) == 2 else None
+
+    def _fit(self, X: np.ndarray, y: np.ndarray, holdout_mask: Optional[np.ndarray]):
+        from .model_training import fit_lead_model_arrays, fit_lead_model_search_arrays
+
+        base_metadata = {**self.predictor.metadata, "version": self.predictor.version}
+        fit, kwargs = fit_lead_model_arrays, {}
+        if self.search:
+            fit = fit_lead_model_search_arrays
+            if holdout_mask is not None:
+                kwargs["holdout_mask"] = holdout_mask
+
+        receiver, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_train_in_subprocess,
+            args=(sender, fit, (X, y, base_metadata), kwargs),
+            # A search forks its own worker pool, which daemons cannot
+            daemon=not self.search
+        )
+        process.start()
+        sender.close()
+        return _wait_for_result(receiver, process)
+
+    def _load_snapshot(self) -> Dict[str, np.ndarray]:
+        try:
+            with np.load(self.snapshot_path) as data:
+                return {name: data[name] for name in SNAPSHOT_COLUMNS}
+        except (FileNotFoundError, KeyError):
+            # No snapshot yet, or one keyed on outcome_at: pull everything again
+            return _empty_snapshot()
+
+    def _save_snapshot(self, snapshot: Dict[str, np.ndarray]):
+        os.makedirs(self.snapshot_path.parent, exist_ok=True)
+        tmp_path = self.snapshot_path.with_name(f".{self.snapshot_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **snapshot)
+        os.replace(tmp_path, self.snapshot_path)
+
+# Create singleton instance when the analytics store is configured
+retraining_scheduler = RetrainingScheduler.from_env(lead_predictor)
\ No newline at end of file
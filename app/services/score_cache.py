@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+import os
+import threading
+from .features import INPUT_COLUMNS
+
+class ScoreCache:
+    """LRU of conversion probabilities keyed on model version and metrics.
+
+    Scores depend only on the INPUT_COLUMNS metrics and the active
+    model, and real traffic repeats a few combinations (e.g. all zeros)
+    very often. Including the version in the key means a stale score is
+    never served; `clear()` is also hooked to model swaps to free memory.
+    Predictors also keep score explanations in a second instance.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ScoreCache":
+        return cls(max_size=int(os.getenv("SCORE_CACHE_SIZE", "10000")))
+
+    @staticmethod
+    def key(version: str, metrics: Dict) -> Tuple:
+        return (version, *(metrics[k] for k in INPUT_COLUMNS))
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        with self._lock:
+            score = self._entries.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return score
+
+    def set(self, key: Tuple, score: Any):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = score
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_many(self, keys: List[Tuple]) -> List[Optional[Any]]:
+        """Look up a batch of keys under one lock acquisition"""
+        with self._lock:
+            scores = []
+            for key in keys:
+                score = self._entries.get(key)
+                if score is None:
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                scores.append(score)
+            return scores
+
+    def set_many(self, items: List[Tuple[Tuple, Any]]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            for key, score in items:
+                self._entries[key] = score
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "max_size": self.max_size
+        }
\ No newline at end of file
@@ -0,0 +1,182 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import queue
+import threading
+from .analytics_store import AnalyticsStore, analytics_store, email_hash
+from .lead_classifier import lead_predictor, score_status
+from .ml_predictor import LeadPredictor
+from .model_registry import HEURISTIC_VERSION, ModelRegistry, model_registry
+from ..models import Lead
+from ..utils.logger import get_logger
+from ..utils.metrics import shadow_leads
+
+logger = get_logger(__name__)
+
+agreed_counter = shadow_leads.labels(result="agreed")
+disagreed_counter = shadow_leads.labels(result="disagreed")
+dropped_counter = shadow_leads.labels(result="dropped")
+
+class ShadowScorer:
+    """Scores live traffic with a candidate model, off the request path.
+
+    The live model answers every request. `submit` hands each scored
+    lead's metrics and result to a bounded queue without blocking, and a
+    background thread scores them in batches with the candidate and
+    records the comparison in the analytics store. A full queue drops
+    leads from the comparison rather than slow a request.
+
+    With `canary_percent`, that share of leads (chosen by email, so a
+    lead always lands on the same side) is answered by the candidate
+    instead, and the live model scores them in its shadow. The candidate
+    takes part only once it has a trained model that differs from the
+    live one.
+    """
+
+    def __init__(
+        self,
+        candidate: LeadPredictor,
+        live: LeadPredictor,
+        store: Optional[AnalyticsStore] = None,
+        canary_percent: float = 0.0,
+        queue_size: int = 10000,
+        batch_size: int = 256,
+        min_score_delta: int = 10
+    ):
+        if not 0 <= canary_percent <= 100:
+            raise ValueError("canary_percent must be between 0 and 100")
+        self.candidate = candidate
+        self.live = live
+        self.store = store
+        self.canary_percent = canary_percent
+        self.batch_size = batch_size
+        self.min_score_delta = min_score_delta
+        self.compared = 0
+        self.disagreements = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Tuple]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["ShadowScorer"]:
+        model_dir = os.getenv("SHADOW_MODEL_DIR")
+        if not model_dir:
+            return None
+        candidate = LeadPredictor(ModelRegistry(
+            Path(model_dir),
+            compile_models=model_registry.compile_models,
+            prefer_compiled=model_registry.prefer_compiled
+        ))
+        return cls(
+            candidate,
+            lead_predictor,
+            analytics_store,
+            canary_percent=float(os.getenv("SHADOW_CANARY_PERCENT", "0")),
+            queue_size=int(os.getenv("SHADOW_QUEUE_SIZE", "10000")),
+            min_score_delta=int(os.getenv("SHADOW_MIN_SCORE_DELTA", "10"))
+        )
+
+    @property
+    def registry(self) -> ModelRegistry:
+        return self.candidate.registry
+
+    @property
+    def active(self) -> bool:
+        """Whether the candidate has a trained model that differs from the live one"""
+        version = self.candidate.bundle.version
+        return version != HEURISTIC_VERSION and version != self.live.bundle.version
+
+    def in_canary(self, lead: Lead) -> bool:
+        """Whether the candidate should answer for this lead"""
+        if not self.canary_percent or not self.active:
+            return False
+        return int(email_hash(lead.email)[:8], 16) % 10000 < self.canary_percent * 100
+
+    def submit(self, leads: List[Lead], version: str, canary: bool = False):
+        """Queue scored leads for comparison; never blocks.
+
+        `version` is the model that answered and `canary` whether that
+        was the candidate.
+        """
+        if not self.active:
+            return
+        if self._thread is None:
+            self._start()
+        for lead in leads:
+            try:
+                self._queue.put_nowait((lead.id, lead.engagement_metrics, lead.status, lead.score, version, canary))
+            except queue.Full:
+                self.dropped += 1
+                dropped_counter.inc()
+
+    def join(self):
+        """Block until every queued lead has been compared"""
+        self._queue.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "candidate_version": self.candidate.bundle.version,
+            "active": self.active,
+            "canary_percent": self.canary_percent,
+            "queued": self._queue.qsize(),
+            "compared": self.compared,
+            "disagreements": self.disagreements,
+            "dropped": self.dropped
+        }
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="shadow-scoring", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._compare(batch)
+            except Exception as e:
+                logger.error("Error in shadow scoring", extra={"leads": len(batch), "error": str(e)})
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _compare(self, batch: List[Tuple]):
+        comparisons = []
+        # Canary leads were answered by the candidate; the live model is their shadow
+        for canary in (False, True):
+            items = [item for item in batch if item[5] == canary]
+            if not items:
+                continue
+            shadow = self.live if canary else self.candidate
+            shadow_version = shadow.bundle.version
+            scores = shadow.score_batch([item[1].dict() for item in items])
+            for (lead_id, _, status, score, version, _), prob in zip(items, scores):
+                shadow_score = round(float(prob) * 100)
+                shadow_status = score_status(shadow_score)
+                if canary:
+                    comparisons.append((lead_id, shadow_version, version, shadow_status,
+                                        shadow_score, status, score, True))
+                else:
+                    comparisons.append((lead_id, version, shadow_version, status,
+                                        score, shadow_status, shadow_score, False))
+
+        disagreements = sum(
+            1 for c in comparisons
+            if c[3] != c[5] or abs(c[6] - c[4]) >= self.min_score_delta
+        )
+        self.compared += len(comparisons)
+        self.disagreements += disagreements
+        agreed_counter.inc(len(comparisons) - disagreements)
+        disagreed_counter.inc(disagreements)
+        if self.store is not None:
+            self.store.record_shadow(comparisons, self.min_score_delta)
+
+# Create singleton instance when a candidate model directory is configured
+shadow_scorer = ShadowScorer.from_env()
\ No newline at end of file
@@ -0,0 +1,232 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from .crm_integration import CRMIntegration, crm_integration
+from .lead_classifier import lead_predictor
+from .lead_queue import lead_queue
+from .ml_predictor import LeadPredictor
+from .model_registry import ModelRegistry, model_registry
+from ..models import Lead
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_TENANT = "default"
+
+@dataclass
+class TenantConfig:
+    tenant_id: str
+    model_dir: Path
+    # CRM_TYPE, credentials and CRM_BATCH_* settings, named like the env vars
+    crm: Dict[str, str]
+    api_keys: List[str] = field(default_factory=list)
+
+@dataclass
+class Tenant:
+    """A tenant's model and CRM connection"""
+    tenant_id: str
+    predictor: LeadPredictor
+    crm: CRMIntegration
+    checked_at: float = 0.0
+
+    @property
+    def is_default(self) -> bool:
+        return self.tenant_id == DEFAULT_TENANT
+
+# The process-wide model and CRM, configured through the environment
+default_tenant = Tenant(DEFAULT_TENANT, lead_predictor, crm_integration)
+
+class TenantPool:
+    """Per-tenant models and CRM connections, loaded on first use.
+
+    At most `max_tenants` are held, least recently used first out; an
+    evicted tenant's model is loaded again on its next request. Its CRM
+    connection is kept, so the tenant does not log in to the CRM again or
+    open another identity cache. Tenants with the same model directory
+    share one registry and score cache, and every adapter for a CRM
+    shares its connection pool and thread pool, so a tenant costs little
+    more than its model. Tenant models are not
+    watched by a thread; `get` reloads a newly published one at most
+    every `reload_interval` seconds. A tenant is loaded outside the pool's
+    lock, so a cold load holds up only that tenant's requests; `get`
+    blocks on file I/O and should be called off the event loop.
+    """
+
+    def __init__(
+        self,
+        configs: Dict[str, TenantConfig],
+        max_tenants: int = 32,
+        reload_interval: float = 5.0,
+        compile_models: bool = True,
+        prefer_compiled: bool = False
+    ):
+        self.configs = configs
+        self.max_tenants = max_tenants
+        self.reload_interval = reload_interval
+        self.compile_models = compile_models
+        self.prefer_compiled = prefer_compiled
+        self.loads = 0
+        self.evictions = 0
+        self._keys = {key: config.tenant_id for config in configs.values() for key in config.api_keys}
+        self._tenants: "OrderedDict[str, Tenant]" = OrderedDict()
+        # Loads in progress, which other requests for the tenant wait on
+        self._loading: Dict[str, "Future[Tenant]"] = {}
+        self._predictors: "weakref.WeakValueDictionary[Path, LeadPredictor]" = weakref.WeakValueDictionary()
+        # One per configured tenant, outliving eviction from the pool
+        self._crms: Dict[str, CRMIntegration] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "TenantPool":
+        """Read tenants from JSON: {"<tenant id>": {"api_keys": [...], "model_dir": ..., "crm": {...}}}"""
+        with open(path) as f:
+            raw = json.load(f)
+        configs = {
+            tenant_id: TenantConfig(
+                tenant_id=tenant_id,
+                model_dir=Path(entry["model_dir"]),
+                crm={key: str(value) for key, value in entry.get("crm", {}).items()},
+                api_keys=list(entry.get("api_keys", []))
+            )
+            for tenant_id, entry in raw.items()
+        }
+        if DEFAULT_TENANT in configs:
+            raise ValueError(f"Tenant id '{DEFAULT_TENANT}' is reserved for the environment's CRM")
+        return cls(configs, **kwargs)
+
+    @classmethod
+    def from_env(cls) -> Optional["TenantPool"]:
+        path = os.getenv("TENANTS_FILE")
+        if not path:
+            return None
+        return cls.from_file(
+            path,
+            max_tenants=int(os.getenv("TENANT_POOL_SIZE", "32")),
+            reload_interval=float(os.getenv("MODEL_RELOAD_INTERVAL", "5")),
+            compile_models=model_registry.compile_models,
+            prefer_compiled=model_registry.prefer_compiled
+        )
+
+    def tenant_for_key(self, api_key: Optional[str]) -> Optional[str]:
+        return self._keys.get(api_key) if api_key else None
+
+    def get(self, tenant_id: str) -> Tenant:
+        """The tenant's model and CRM, loading them on first use; KeyError if unknown"""
+        config = self.configs[tenant_id]
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is not None:
+                self._tenants.move_to_end(tenant_id)
+                loading, owner = None, False
+            else:
+                loading = self._loading.get(tenant_id)
+                owner = loading is None
+                if owner:
+                    loading = self._loading[tenant_id] = Future()
+
+        if owner:
+            try:
+                tenant = self._load(config)
+            except BaseException as e:
+                with self._lock:
+                    del self._loading[tenant_id]
+                loading.set_exception(e)
+                raise
+            with self._lock:
+                del self._loading[tenant_id]
+                self._tenants[tenant_id] = tenant
+                while len(self._tenants) > self.max_tenants:
+                    self._tenants.popitem(last=False)
+                    self.evictions += 1
+            loading.set_result(tenant)
+        elif tenant is None:
+            tenant = loading.result()
+
+        now = time.monotonic()
+        with self._lock:
+            due = now - tenant.checked_at >= self.reload_interval > 0
+            if due:
+                tenant.checked_at = now
+
+        if due:
+            try:
+                tenant.predictor.registry.reload()
+            except Exception as e:
+                logger.error("Error reloading tenant model", extra={"tenant": tenant_id, "error": str(e)})
+        return tenant
+
+    def _load(self, config: TenantConfig) -> Tenant:
+        model_dir = config.model_dir.resolve()
+        with self._lock:
+            self.loads += 1
+            predictor = self._predictors.get(model_dir)
+        if predictor is None:
+            if model_dir == model_registry.model_dir.resolve():
+                predictor = lead_predictor
+            else:
+                predictor = LeadPredictor(ModelRegistry(
+                    model_dir,
+                    compile_models=self.compile_models,
+                    prefer_compiled=self.prefer_compiled
+                ))
+            with self._lock:
+                # Another tenant on the same directory may have loaded it meanwhile
+                predictor = self._predictors.setdefault(model_dir, predictor)
+
+        with self._lock:
+            crm = self._crms.get(config.tenant_id)
+            if crm is None:
+                crm = CRMIntegration(
+                    # The SDK is imported and the session opened on first sync
+                    lazy=True,
+                    retry_queue=lead_queue,
+                    settings=config.crm,
+                    account=config.tenant_id
+                )
+                self._crms[config.tenant_id] = crm
+        return Tenant(config.tenant_id, predictor, crm, checked_at=time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            loaded = list(self._tenants)
+        return {
+            "configured": len(self.configs),
+            "loaded": loaded,
+            "models_loaded": len(self._predictors),
+            "crm_connections": len(self._crms),
+            "loads": self.loads,
+            "evictions": self.evictions
+        }
+
+# Create singleton instance when a tenants file is configured
+tenant_pool = TenantPool.from_env()
+
+def tenant_for(lead: Lead) -> Tenant:
+    """The tenant a scored lead belongs to"""
+    if lead.tenant is None or tenant_pool is None:
+        return default_tenant
+    return tenant_pool.get(lead.tenant)
+
+async def _tenant_of(lead: Lead) -> Tenant:
+    # A tenant that is not loaded is loaded off the event loop
+    if lead.tenant is None or tenant_pool is None:
+        return default_tenant
+    return await asyncio.get_running_loop().run_in_executor(None, tenant_pool.get, lead.tenant)
+
+async def update_crm(lead: Lead, defer: bool = True) -> bool:
+    """Update the CRM of the lead's tenant"""
+    return await (await _tenant_of(lead)).crm.update_crm(lead, defer)
+
+async def update_crm_batch(leads: List[Lead]) -> List[bool]:
+    """Update the CRM of a batch of one tenant's leads"""
+    if not leads:
+        return []
+    return await (await _tenant_of(leads[0])).crm.update_crm_batch(leads)
\ No newline at end of file
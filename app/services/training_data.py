@@ -0,0 +1,65 @@
+from pathlib import Path
+from typing import Iterator, List, Tuple
+import csv
+import json
+import numpy as np
+from .features import INPUT_COLUMNS, feature_pipeline
+
+LABEL_COLUMN = "converted"
+SUPPORTED_FORMATS = ("ndjson", "csv")
+
+def _rows(path: Path, fmt: str) -> Iterator[Tuple[List[float], int]]:
+    """Yield (features, label) for each record, reading one line at a time"""
+    with open(path, 'r', newline='') as f:
+        if fmt == "ndjson":
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield [record[c] for c in INPUT_COLUMNS], record[LABEL_COLUMN]
+        elif fmt == "csv":
+            reader = csv.reader(f)
+            header = next(reader)
+            feature_idx = [header.index(c) for c in INPUT_COLUMNS]
+            label_idx = header.index(LABEL_COLUMN)
+            for row in reader:
+                if row:
+                    yield [row[i] for i in feature_idx], row[label_idx]
+        else:
+            raise ValueError(f"Unsupported training data format: {fmt}")
+
+def iter_chunks(path: Path, fmt: str, chunk_size: int = 10000) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Stream a training file as (float32 raw metrics, int8 labels) chunks"""
+    features, labels = [], []
+    for row, label in _rows(Path(path), fmt):
+        features.append(row)
+        labels.append(label)
+        if len(features) == chunk_size:
+            yield np.asarray(features, dtype=np.float32), np.asarray(labels, dtype=np.int8)
+            features, labels = [], []
+    if features:
+        yield np.asarray(features, dtype=np.float32), np.asarray(labels, dtype=np.int8)
+
+def count_records(path: Path, fmt: str) -> int:
+    with open(path, 'rb') as f:
+        count = sum(1 for line in f if line.strip())
+    return count - 1 if fmt == "csv" and count else count
+
+def load_matrix(path: Path, fmt: str, chunk_size: int = 10000) -> Tuple[np.ndarray, np.ndarray]:
+    """Read a training file into a preallocated float32 feature matrix.
+
+    A counting pass sizes the arrays up front, and each parsed chunk is
+    featurized straight into its slice, so peak memory is the final
+    matrix plus one chunk instead of nested Python lists.
+    """
+    n = count_records(path, fmt)
+    X = np.empty((n, feature_pipeline.num_features), dtype=np.float32)
+    y = np.empty(n, dtype=np.int8)
+
+    start = 0
+    for X_chunk, y_chunk in iter_chunks(path, fmt, chunk_size):
+        end = start + len(X_chunk)
+        feature_pipeline.transform(X_chunk, out=X[start:end])
+        y[start:end] = y_chunk
+        start = end
+
+    return X[:start], y[:start]
\ No newline at end of file
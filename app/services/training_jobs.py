@@ -0,0 +1,334 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import asyncio
+import fcntl
+import multiprocessing
+import os
+import uuid
+from .model_registry import ModelRegistry, model_registry
+from .training_data import SUPPORTED_FORMATS
+
+# Seconds between checks while another training run holds the lock
+LOCK_POLL_SECONDS = 5.0
+
+@contextmanager
+def training_lock(model_dir: Path) -> Iterator[bool]:
+    """Hold the model directory's exclusive training lock, if free.
+
+    Training jobs, scheduled retraining and the retraining CLI all take
+    it around fitting and publishing, so they never overlap.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    with open(Path(model_dir) / ".training.lock", 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _train_in_subprocess(conn, fit, args, kwargs):
+    """Entry point of a training process: fit and send the result back"""
+    try:
+        conn.send(("ok", fit(*args, **kwargs)))
+    except Exception as e:
+        conn.send(("error", str(e)))
+    finally:
+        conn.close()
+
+def _wait_for_result(conn, process):
+    """Block until the training process reports back or dies"""
+    try:
+        return conn.recv()
+    except EOFError:
+        return ("error", f"training process exited with code {process.exitcode}")
+    finally:
+        process.join()
+        conn.close()
+
+@dataclass
+class TrainingJob:
+    id: str
+    num_samples: int
+    status: str = "queued"  # queued, running, succeeded, rejected, failed, cancelled
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    model_version: Optional[str] = None
+    performance_metrics: Optional[Dict[str, float]] = None
+    error: Optional[str] = None
+    # Holdout comparison against the active model, for search jobs
+    promotion: Optional[Dict[str, Any]] = None
+    # Published as the shadow candidate instead of the live model
+    shadow: bool = False
+    # Search jobs: publish live even if the holdout cannot show it is better
+    promote: bool = False
+    process: Optional[multiprocessing.process.BaseProcess] = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "rejected", "failed", "cancelled")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "num_samples": self.num_samples,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "model_version": self.model_version,
+            "performance_metrics": self.performance_metrics,
+            "promotion": self.promotion,
+            "shadow": self.shadow,
+            "promote": self.promote,
+            "error": self.error
+        }
+
+class TrainingJobManager:
+    """Runs model training in separate processes, off the event loop.
+
+    Each job gets its own process (at most `max_workers` at a time) so a
+    running fit can be cancelled by terminating it, which a
+    ProcessPoolExecutor cannot do. A job fits and publishes only while
+    holding the registry's training lock, waiting queued until any other
+    job or retraining run has finished. The new model is published to the
+    registry only when a job succeeds. Search jobs record the active
+    model's AUC on their holdout, but uploaded rows may be ones it trained
+    on, so without `promote` they go to `shadow_registry`, or end as
+    "rejected" when there is none. Shadow jobs publish to
+    `shadow_registry`, leaving the live model in place.
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        max_workers: int = 1,
+        max_history: int = 100,
+        shadow_registry: Optional[ModelRegistry] = None
+    ):
+        self.registry = registry
+        self.shadow_registry = shadow_registry
+        self.max_workers = max_workers
+        self.max_history = max_history
+        # Created on first use so it binds to the server's event loop
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._context = multiprocessing.get_context("spawn")
+
+    def submit(self, training_data: List[Dict], labels: List[int], shadow: bool = False) -> TrainingJob:
+        """Validate the input and queue a training job"""
+        from .model_training import fit_lead_model, validate_training_data
+        validate_training_data(training_data, labels)
+        job = self._new_job(len(training_data), shadow)
+        return self._start(job, fit_lead_model, (training_data, labels), {})
+
+    def submit_search(
+        self,
+        training_data: List[Dict],
+        labels: List[int],
+        estimators: Sequence[str] = ("forest",),
+        n_jobs: Optional[int] = None,
+        shadow: bool = False,
+        promote: bool = False
+    ) -> TrainingJob:
+        """Queue a cross-validated hyperparameter search job.
+
+        Uploaded rows may be ones the active model trained on, so the
+        holdout cannot show the result beats it: unless `promote` is set
+        it is published as the shadow candidate, or not at all.
+        """
+        from .model_training import SEARCH_SPACES, fit_lead_model_search, validate_training_data
+        validate_training_data(training_data, labels)
+        unknown = set(estimators) - set(SEARCH_SPACES)
+        if unknown:
+            raise ValueError(f"Unsupported estimators: {sorted(unknown)}")
+        job = self._new_job(len(training_data), shadow)
+        job.promote = promote
+        return self._start(
+            job,
+            fit_lead_model_search,
+            (training_data, labels),
+            {"estimators": tuple(estimators), "n_jobs": n_jobs},
+            # Not daemonic, so the search can fork its own worker pool
+            daemon=False
+        )
+
+    def submit_file(
+        self,
+        path: str,
+        fmt: str,
+        mode: str = "batch",
+        chunk_size: int = 10000,
+        delete_after: bool = False,
+        shadow: bool = False
+    ) -> TrainingJob:
+        """Queue a job that streams its training data from a local file"""
+        from .model_training import fit_lead_model_from_file
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported training data format: {fmt}")
+        if mode not in ("batch", "incremental"):
+            raise ValueError(f"Unsupported training mode: {mode}")
+
+        # Sample count is filled in from the metadata when the job finishes
+        job = self._new_job(0, shadow)
+        return self._start(
+            job,
+            fit_lead_model_from_file,
+            (path, fmt),
+            {"mode": mode, "chunk_size": chunk_size},
+            cleanup_path=path if delete_after else None
+        )
+
+    def _new_job(self, num_samples: int, shadow: bool) -> TrainingJob:
+        if shadow and self.shadow_registry is None:
+            raise ValueError("No shadow model directory is configured")
+        return TrainingJob(id=uuid.uuid4().hex, num_samples=num_samples, shadow=shadow)
+
+    def _start(
+        self,
+        job: TrainingJob,
+        fit,
+        args,
+        kwargs,
+        cleanup_path: Optional[str] = None,
+        daemon: bool = True
+    ) -> TrainingJob:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+        self._jobs[job.id] = job
+        self._trim_history()
+
+        task = asyncio.create_task(self._run(job, fit, args, kwargs, cleanup_path, daemon))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        return job
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[TrainingJob]:
+        """Cancel a queued or running job; finished jobs are left as-is"""
+        job = self._jobs.get(job_id)
+        if job is None or job.done:
+            return job
+
+        job.status = "cancelled"
+        job.finished_at = datetime.utcnow()
+        if job.process is not None and job.process.is_alive():
+            job.process.terminate()
+        return job
+
+    async def _run(
+        self,
+        job: TrainingJob,
+        fit,
+        args,
+        kwargs,
+        cleanup_path: Optional[str] = None,
+        daemon: bool = True
+    ):
+        try:
+            await self._train(job, fit, args, kwargs, daemon)
+        finally:
+            if cleanup_path and os.path.exists(cleanup_path):
+                os.remove(cleanup_path)
+
+    async def _train(self, job: TrainingJob, fit, args, kwargs, daemon: bool = True):
+        async with self._slots:
+            while job.status != "cancelled":
+                with training_lock(self.registry.model_dir) as acquired:
+                    if acquired:
+                        await self._fit_and_publish(job, fit, args, kwargs, daemon)
+                        return
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+
+    async def _fit_and_publish(self, job: TrainingJob, fit, args, kwargs, daemon: bool):
+        loop = asyncio.get_running_loop()
+        receiver, sender = self._context.Pipe(duplex=False)
+        job.process = self._context.Process(
+            target=_train_in_subprocess,
+            args=(
+                sender,
+                fit,
+                (*args, dict(self.registry.active.metadata)),
+                kwargs
+            ),
+            daemon=daemon
+        )
+        job.process.start()
+        sender.close()
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+
+        outcome, payload = await loop.run_in_executor(
+            None, _wait_for_result, receiver, job.process
+        )
+        job.process = None
+
+        if job.status == "cancelled":
+            return
+        if outcome != "ok":
+            job.status = "failed"
+            job.error = payload
+            job.finished_at = datetime.utcnow()
+            return
+
+        # Search jobs also return their holdout set for the comparison
+        model, scaler, metadata, *holdout = payload
+        if holdout:
+            from .model_training import compare_with_active
+            promoted = await loop.run_in_executor(
+                None, partial(compare_with_active, self.registry.active, metadata, holdout[0], force=job.promote)
+            )
+            job.promotion = metadata["promotion"]
+            if not promoted and not job.shadow:
+                if self.shadow_registry is None:
+                    job.status = "rejected"
+                    job.num_samples = metadata["num_samples"]
+                    job.performance_metrics = metadata["performance_metrics"]
+                    job.finished_at = datetime.utcnow()
+                    return
+                # Let the shadow comparison on live traffic decide
+                job.shadow = True
+
+        registry = self.shadow_registry if job.shadow else self.registry
+        try:
+            # joblib.dump of the artifacts is blocking file I/O
+            await loop.run_in_executor(
+                None, registry.publish, model, scaler, metadata
+            )
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"Failed to publish model: {str(e)}"
+            job.finished_at = datetime.utcnow()
+            return
+
+        job.status = "succeeded"
+        job.model_version = metadata["model_version"]
+        job.num_samples = metadata["num_samples"]
+        job.performance_metrics = metadata["performance_metrics"]
+        job.finished_at = datetime.utcnow()
+
+    def _trim_history(self):
+        while len(self._jobs) > self.max_history:
+            oldest_id = next(iter(self._jobs))
+            if not self._jobs[oldest_id].done:
+                break
+            self._jobs.pop(oldest_id)
+
+# Create singleton instance
+training_jobs = TrainingJobManager(
+    model_registry,
+    max_workers=int(os.getenv("TRAINING_MAX_JOBS", "1"))
+)
\ No newline at end of file
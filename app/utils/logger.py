@@ -1,11 +1,223 @@
+"""Structured, non-blocking logging for the lead pipeline.
+
+Modules log through `get_logger(__name__)`. High-volume events are
+sampled by level before a record is even built. Records are stamped
+with the current request and lead ids and put on a bounded queue. A
+listener thread formats them as one JSON object per line and writes
+them to stdout, so callers never wait on the stream. A full queue drops
+records, counted in log_records_discarded_total, rather than block a
+request. Fields go in `extra`:
+    logger.warning("CRM update failed", extra={"crm": "hubspot", "error": str(e)})
+    logger.info("Lead scored", extra={**HIGH_VOLUME, "score": 72})
+"""
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+import contextvars
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import sys
+import threading
+from .metrics import log_records_discarded
+
+sampled_out_counter = log_records_discarded.labels(reason="sampled")
+dropped_counter = log_records_discarded.labels(reason="queue_full")
+
+# Set per request by the API middleware and per lead around CRM syncs
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+lead_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("lead_id", default=None)
+
+# Merge into `extra` to subject a record to LOG_SAMPLE_RATES
+HIGH_VOLUME = {"high_volume": True}
+
+# Share of high-volume records kept at each level and above; ERROR and up are always kept
+DEFAULT_SAMPLE_RATES = "DEBUG=0.01,INFO=0.1,WARNING=1"
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s [request_id=%(request_id)s lead_id=%(lead_id)s]'
+
+# LogRecord attributes that are not caller fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "high_volume"}
+
+@contextmanager
+def log_context(**ids: Optional[str]) -> Iterator[None]:
+    """Set `request_id` and/or `lead_id` for records logged inside the block"""
+    variables = {"request_id": request_id_var, "lead_id": lead_id_var}
+    tokens = [(variables[name], variables[name].set(value)) for name, value in ids.items()]
+    try:
+        yield
+    finally:
+        for variable, token in reversed(tokens):
+            variable.reset(token)
+
+def parse_sample_rates(spec: str) -> Dict[int, float]:
+    """Parse "DEBUG=0.01,INFO=0.1" into {level number: rate}"""
+    rates = {}
+    for part in spec.split(","):
+        if part.strip():
+            name, rate = part.split("=")
+            rates[logging.getLevelName(name.strip().upper())] = float(rate)
+    return rates
+
+class ContextFilter(logging.Filter):
+    """Stamp each record with the calling task's request and lead ids, unless given in `extra`"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        if not hasattr(record, "lead_id"):
+            record.lead_id = lead_id_var.get()
+        return True
+
+class LogSampler:
+    """Level-dependent share of high-volume events to keep.
+
+    An event is kept at the rate of the highest configured level at or
+    below its own; ERROR and above are always kept.
+    """
+
+    def __init__(self, rates: Dict[int, float]):
+        levels = range(logging.ERROR)
+        thresholds = sorted(rates.items(), reverse=True)
+        self._rates = [next((rate for threshold, rate in thresholds if level >= threshold), 1.0) for level in levels]
+
+    def rate_for(self, level: int) -> float:
+        return self._rates[level] if level < logging.ERROR else 1.0
+
+class PipelineLogger(logging.LoggerAdapter):
+    """The pipeline's logger, built for calls on the request path.
+
+    Samples HIGH_VOLUME events before building their record, and kept
+    ones carry `sample_rate` so counts can be scaled back up. Skips the
+    caller's file and line lookup, since lines are identified by logger
+    name and message.
+    """
+
+    def __init__(self, logger: logging.Logger, sampler: LogSampler):
+        super().__init__(logger, None)
+        self.sampler = sampler
+
+    def log(self, level: int, msg: Any, *args: Any, exc_info: Any = None,
+            extra: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        if not self.logger.isEnabledFor(level):
+            return
+        if extra and extra.get("high_volume"):
+            rate = self.sampler.rate_for(level)
+            if rate < 1:
+                if random.random() >= rate:
+                    sampled_out_counter.inc()
+                    return
+                extra = {**extra, "sample_rate": rate}
+        if kwargs:
+            # stack_info or stacklevel: take the standard path
+            return self.logger.log(level, msg, *args, exc_info=exc_info, extra=extra, **kwargs)
+
+        if exc_info:
+            if isinstance(exc_info, BaseException):
+                exc_info = (type(exc_info), exc_info, exc_info.__traceback__)
+            elif not isinstance(exc_info, tuple):
+                exc_info = sys.exc_info()
+        self.logger.handle(self.logger.makeRecord(
+            self.logger.name, level, "(unknown file)", 0, msg, args, exc_info, None, extra
+        ))
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, ids and any `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "lead_id": getattr(record, "lead_id", None)
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+class _DrainingQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop waits for room for its sentinel instead of failing on a full queue"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when its bounded queue is full.
+
+    Only the message and traceback are resolved on the caller's thread,
+    while their arguments are still live; formatting and the write
+    happen on the listener thread, which `close` (called by
+    logging.shutdown at exit) drains and stops.
+    """
+
+    def __init__(self, queue_size: int, *handlers: logging.Handler):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.listener: Optional[logging.handlers.QueueListener] = _DrainingQueueListener(
+            self.queue, *handlers
+        )
+        self.listener.start()
+        self._close_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Changed in place: the `app` tree has no other handler to see it
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_counter.inc()
+
+    def close(self):
+        with self._close_lock:
+            listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+        super().close()
+
+def build_handler(stream: Any = None, fmt: str = "json", queue_size: int = 10000) -> logging.Handler:
+    """The pipeline's handler: stamp ids, then queue for a listener writing to `stream`.
+
+    With queue_size 0 records are written on the caller's thread.
+    """
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    handler = NonBlockingQueueHandler(queue_size, output) if queue_size > 0 else output
+    handler.addFilter(ContextFilter())
+    return handler
+
+def setup_logger() -> logging.Logger:
+    """Configure the `app` logger tree from LOG_LEVEL, LOG_FORMAT and LOG_QUEUE_SIZE"""
+    logger = logging.getLogger("app")
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.addHandler(build_handler(
+        fmt=os.getenv("LOG_FORMAT", "json").lower(),
+        queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    ))
+    # Written once here, not again by handlers on the root logger
+    logger.propagate = False
+    return logger
 
-def setup_logger():
-    logging.basicConfig(
-        level=os.getenv("LOG_LEVEL", "INFO"),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    return logging.getLogger(__name__)
+def get_logger(name: str) -> PipelineLogger:
+    """A logger under `app`, e.g. get_logger(__name__) from any app module"""
+    return PipelineLogger(logging.getLogger(name if name.startswith("app") else f"app.{name}"), sampler)
 
-logger = setup_logger() 
\ No newline at end of file
+logger = setup_logger()
+sampler = LogSampler(parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", DEFAULT_SAMPLE_RATES)))
\ No newline at end of file
@@ -0,0 +1,245 @@
+"""In-process counters and latency histograms in Prometheus text format.
+
+Instruments are created once at import; hot paths bind their labels up
+front with `.labels(...)` so recording is a perf_counter call, a bisect
+and a locked increment. Each process (API worker or queue worker) keeps
+its own values; Prometheus sums them across scrape targets.
+"""
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+import threading
+import time
+
+# Seconds; spans a cached score (~10us) up to a slow CRM call
+DEFAULT_BUCKETS = (
+    0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+class _Timer:
+    """Times a block; cheaper per use than a @contextmanager generator"""
+    __slots__ = ("child", "start")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.start)
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: str):
+        """Return the child for one label combination, creating it once"""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}"
+        ]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        self.labels(**labels).inc(amount)
+
+    def _render_child(self, key, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {child.value}"]
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float, **labels: str):
+        self.labels(**labels).observe(value)
+
+    def time(self, **labels: str):
+        return self.labels(**labels).time()
+
+    def _render_child(self, key, child) -> List[str]:
+        with child._lock:
+            counts = list(child.counts)
+            total = child.sum
+
+        lines, cumulative = [], 0
+        bounds = [repr(bound) for bound in self.buckets] + ["+Inf"]
+        for bound, count in zip(bounds, counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {total}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format, version 0.0.4"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Create singleton instance
+metrics = MetricsRegistry()
+
+# Shared instruments for the lead pipeline
+stage_seconds = metrics.histogram(
+    "lead_pipeline_stage_seconds",
+    "Time spent in each stage of lead processing",
+    ["stage"]
+)
+http_request_seconds = metrics.histogram(
+    "http_request_seconds",
+    "End-to-end request latency by route",
+    ["method", "route", "status"]
+)
+crm_call_seconds = metrics.histogram(
+    "crm_call_seconds",
+    "Latency of individual CRM API calls",
+    ["crm", "operation"]
+)
+crm_call_rejections = metrics.counter(
+    "crm_call_rejections_total",
+    "CRM calls turned away: throttled, over our rate limit, circuit open, or failing with an outage error",
+    ["crm", "reason"]
+)
+crm_call_errors = metrics.counter(
+    "crm_call_errors_total",
+    "CRM API calls that raised, including expected not-found lookups",
+    ["crm", "operation"]
+)
+leads_scored = metrics.counter(
+    "leads_scored_total",
+    "Leads classified, by resulting status",
+    ["status"]
+)
+crm_sync_failures = metrics.counter(
+    "crm_sync_failures_total",
+    "Leads whose CRM update failed",
+    ["crm"]
+)
+crm_sync_retries = metrics.counter(
+    "crm_sync_retries_total",
+    "Queued CRM syncs rescheduled after a failure",
+    ["crm"]
+)
+crm_sync_dead_letters = metrics.counter(
+    "crm_sync_dead_letters_total",
+    "Queued CRM syncs moved to the dead-letter table",
+    ["crm"]
+)
+leads_coalesced = metrics.counter(
+    "leads_coalesced_total",
+    "Duplicate lead submissions merged into a pending CRM write"
+)
+crm_sync_deferred = metrics.counter(
+    "crm_sync_deferred_total",
+    "Leads stored for a later retry because the CRM was unavailable",
+    ["crm"]
+)
+shadow_leads = metrics.counter(
+    "shadow_leads_total",
+    "Leads scored by the shadow model, by comparison result or dropped when its queue was full",
+    ["result"]
+)
+
+log_records_discarded = metrics.counter(
+    "log_records_discarded_total",
+    "Log records not written: sampled out, or dropped when the log queue was full",
+    ["reason"]
+)
\ No newline at end of file
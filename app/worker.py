@@ -0,0 +1,118 @@
+"""Drain the durable lead queue into the CRM.
+
+Run alongside the API with the same LEAD_QUEUE_PATH:
+    python -m app.worker --concurrency 8
+"""
+import argparse
+import asyncio
+import os
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Set
+
+from .services.crm.resilience import CRMUnavailable
+from .services.tenants import update_crm
+from .services.lead_queue import LeadQueue, QueuedLead
+from .utils.logger import HIGH_VOLUME, get_logger, log_context
+from .utils.metrics import crm_sync_dead_letters, crm_sync_deferred, crm_sync_retries, metrics
+
+# Under `app` even when run as __main__
+logger = get_logger("app.worker")
+
+CRM_LABEL = os.getenv("CRM_TYPE", "").lower()
+
+async def process_job(queue: LeadQueue, job: QueuedLead):
+    with log_context(lead_id=job.lead.id):
+        await sync_job(queue, job)
+
+async def sync_job(queue: LeadQueue, job: QueuedLead):
+    try:
+        success = await update_crm(job.lead, defer=False)
+        error = None if success else "CRM update failed"
+    except CRMUnavailable as e:
+        # Retry this job once the CRM should take calls again; the CRM
+        # never saw the lead, so it does not use up an attempt
+        if queue.defer(job, str(e), e.retry_delay()):
+            crm_sync_deferred.inc(crm=CRM_LABEL)
+            logger.info("Deferring lead", extra={**HIGH_VOLUME, "reason": e.reason, "retry_after": e.retry_after})
+        else:
+            crm_sync_dead_letters.inc(crm=CRM_LABEL)
+            logger.error("Dead-lettered lead", extra={"attempts": job.attempts, "error": str(e)})
+        return
+    except Exception as e:
+        success, error = False, str(e)
+
+    if success:
+        queue.ack(job.job_id)
+    elif queue.fail(job, error):
+        crm_sync_retries.inc(crm=CRM_LABEL)
+        logger.warning("Retrying lead", extra={**HIGH_VOLUME, "attempt": job.attempts + 1, "error": error})
+    else:
+        crm_sync_dead_letters.inc(crm=CRM_LABEL)
+        logger.error("Dead-lettered lead", extra={"attempts": job.attempts + 1, "error": error})
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_metrics(port: int):
+    """Expose this worker's metrics for Prometheus on a background thread"""
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+
+async def run_worker(queue: LeadQueue, concurrency: int, poll_interval: float):
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    in_flight: Set[asyncio.Task] = set()
+    while not stopping.is_set():
+        if len(in_flight) >= concurrency:
+            await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            continue
+
+        jobs = queue.lease(concurrency - len(in_flight))
+        for job in jobs:
+            task = asyncio.create_task(process_job(queue, job))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        if not jobs:
+            # Nothing due: wait for the next poll
+            try:
+                await asyncio.wait_for(stopping.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    # Let in-flight syncs finish; unacknowledged jobs return after their lease
+    if in_flight:
+        await asyncio.gather(*in_flight, return_exceptions=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port")
+    args = parser.parse_args()
+
+    queue = LeadQueue.from_env()
+    if queue is None:
+        raise SystemExit("LEAD_QUEUE_PATH is not set")
+
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+
+    asyncio.run(run_worker(queue, args.concurrency, args.poll_interval))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
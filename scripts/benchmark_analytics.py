@@ -0,0 +1,94 @@
+"""Time analyze_performance against the rollups vs scanning raw events.
+
+Fills a temporary analytics store with synthetic scored leads spread over
+several days and model versions, reports a share as converted, then
+times the rollup-backed report and the equivalent GROUP BY over the raw
+scored_leads table. Run from the repository root:
+    python -m scripts.benchmark_analytics --leads 1000000 --days 90
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from app.models import Lead
+from app.services.analytics_store import SECONDS_PER_DAY, AnalyticsStore
+from app.services.lead_classifier import build_classification
+
+
+def populate(store, leads, days, versions, batch_size=5000):
+    rng = np.random.default_rng(0)
+    now = time.time()
+    lead_ids = []
+    for start in range(0, leads, batch_size):
+        n = min(batch_size, leads - start)
+        day_offset = rng.integers(0, days)
+        probs = rng.beta(1.2, 4.0, n)
+        batch = []
+        for i, prob in enumerate(probs):
+            result = build_classification(prob)
+            batch.append(Lead(
+                id=str(uuid.uuid4()),
+                email=f"lead{start + i}@example.com",
+                name="Bench Lead",
+                source="benchmark",
+                engagement_metrics={
+                    "website_visits": 3, "time_on_site": 120, "pages_viewed": 5,
+                    "downloaded_resources": 0, "email_interactions": 1
+                },
+                created_at=datetime.utcnow(),
+                status=result.status,
+                score=result.score
+            ))
+            if rng.random() < prob:
+                lead_ids.append(batch[-1].id)
+        version = f"v{start * versions // leads + 1}"
+        store.record_scored(batch, version, now - day_offset * SECONDS_PER_DAY)
+    return lead_ids
+
+
+def timed(func, repeat=20):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--leads", type=int, default=200000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--versions", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        store = AnalyticsStore(os.path.join(workdir, "analytics.db"))
+        start = time.perf_counter()
+        converted = populate(store, args.leads, args.days, args.versions)
+        load_s = time.perf_counter() - start
+        start = time.perf_counter()
+        for lead_id in converted:
+            store.record_outcome(True, lead_id=lead_id)
+        outcome_s = time.perf_counter() - start
+
+        rollup_ms, report = timed(lambda: store.performance(30))
+        scan_ms, _ = timed(lambda: store._db.execute(
+            "SELECT model_version, status, score / 10, COUNT(*), SUM(converted = 1), SUM(score)"
+            " FROM scored_leads WHERE day >= ? GROUP BY 1, 2, 3",
+            (int(time.time() // SECONDS_PER_DAY) - 29,)
+        ).fetchall(), repeat=3)
+
+        print(f"Scored leads:          {args.leads:,} ({args.leads / load_s:,.0f}/s recorded)")
+        print(f"Outcomes:              {len(converted):,} ({len(converted) / outcome_s:,.0f}/s recorded)")
+        print(f"Leads in last 30 days: {report['total_leads']:,}")
+        print(f"Report from rollups:   {rollup_ms:8.2f} ms")
+        print(f"Scan of raw events:    {scan_ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""Compare single-lead latency of the sklearn and compiled forest paths.
+
+Also checks that both paths agree to within 1e-9 on every lead.
+Run from the repository root:
+    python -m scripts.benchmark_compiled_inference --leads 2000
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.services import lead_classifier
+from scripts.benchmark_batch_scoring import install_model, make_leads
+
+
+async def time_single(predictor, metrics_batch):
+    latencies = np.empty(len(metrics_batch))
+    probabilities = np.empty(len(metrics_batch))
+    for i, metrics in enumerate(metrics_batch):
+        start = time.perf_counter()
+        probabilities[i] = await predictor.predict_conversion(metrics)
+        latencies[i] = time.perf_counter() - start
+    return latencies * 1e6, probabilities
+
+
+async def run(n):
+    predictor = lead_classifier.lead_predictor
+    registry = predictor.registry
+    # Measure the model, not the score cache
+    predictor.score_cache.max_size = 0
+    leads = make_leads(n)
+    metrics_batch = [lead.engagement_metrics.dict() for lead in leads]
+
+    registry.compile_models = False
+    install_model(leads)
+    bundle = registry.active
+    sklearn_us, sklearn_p = await time_single(predictor, metrics_batch)
+    sklearn_batch = await predictor.predict_conversion_batch(metrics_batch)
+
+    registry.compile_models = True
+    registry.install(bundle.model, bundle.scaler, bundle.metadata)
+    assert registry.active.compiled is not None
+    compiled_us, compiled_p = await time_single(predictor, metrics_batch)
+    compiled_batch = await predictor.predict_conversion_batch(metrics_batch)
+
+    max_diff = max(
+        np.abs(sklearn_p - compiled_p).max(),
+        np.abs(sklearn_batch - compiled_batch).max()
+    )
+    assert max_diff <= 1e-9, max_diff
+
+    print(f"Leads scored:      {n}")
+    for name, latencies in (("sklearn", sklearn_us), ("compiled", compiled_us)):
+        print(
+            f"{name + ' path:':<19}p50 {np.percentile(latencies, 50):7.1f} us"
+            f"   p99 {np.percentile(latencies, 99):7.1f} us"
+        )
+    print(f"Speedup (p50):     {np.median(sklearn_us) / np.median(compiled_us):.1f}x")
+    print(f"Max difference:    {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--leads", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.leads))
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""Time score explanations against plain scoring.
+
+Fits the production model shape on synthetic leads and, for several
+batch sizes, times:
+  - compiled scoring alone (predict_batch)
+  - tree-path explanations on the same rows (explain_batch)
+  - LeadPredictor scoring and explaining with cold and warm caches
+Also checks that every explanation's baseline plus contributions equals
+its score. Run from the repository root:
+    python -m scripts.benchmark_explanations --batch-sizes 1 100 1000
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from scripts.benchmark_suite import generate_lead_data
+
+
+def timed(func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def timed_async(func, repeat):
+    """Like timed, for coroutine functions, all in one event loop"""
+    async def run():
+        await func()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            await func()
+        return (time.perf_counter() - start) / repeat
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--training-leads", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app.services.features import feature_pipeline
+    from app.services.lead_classifier import lead_predictor
+    from app.services.model_training import fit_lead_model_arrays
+    from scripts.benchmark_suite import conversion_labels
+
+    lead_data = generate_lead_data(args.training_leads, seed=args.seed)
+    metrics = [
+        {
+            "website_visits": data["visits"],
+            "time_on_site": data["time_on_site"],
+            "pages_viewed": data["pages_viewed"],
+            "downloaded_resources": data["downloads"],
+            "email_interactions": data["email_interactions"]
+        }
+        for data in lead_data
+    ]
+    X = feature_pipeline.transform_records(metrics)
+    model, scaler, metadata = fit_lead_model_arrays(
+        X.astype(np.float32), np.array(conversion_labels(lead_data, args.seed)), {"version": "1.0.0"}
+    )
+    bundle = lead_predictor.registry.install(model, scaler, {**metadata, "model_version": "explain-benchmark"})
+    forest = bundle.compiled
+
+    baseline, contributions = forest.explain_batch(X)
+    error = np.abs(baseline + contributions.sum(axis=1) - forest.predict_batch(X)).max()
+    print(f"Forest: {forest.num_trees} trees, depth {forest.depth}; "
+          f"max |baseline + contributions - score| = {error:.2e}\n")
+
+    print(f"{'batch':>6} {'score us/lead':>14} {'explain us/lead':>16} {'ratio':>6}"
+          f" {'cold score':>11} {'cold explain':>13} {'warm explain':>13}")
+    rng = np.random.default_rng(args.seed + 1)
+    for size in args.batch_sizes:
+        rows = rng.choice(len(metrics), size=size, replace=False)
+        batch = [metrics[i] for i in rows]
+        features = X[rows]
+        repeat = max(3, 2000 // size)
+
+        score_s = timed(lambda: forest.predict_batch(features), repeat)
+        explain_s = timed(lambda: forest.explain_batch(features), repeat)
+
+        def cold(method):
+            lead_predictor.score_cache.clear()
+            lead_predictor.explanation_cache.clear()
+            return method(batch)
+
+        cold_score_s = timed_async(lambda: cold(lead_predictor.predict_conversion_batch), repeat)
+        cold_explain_s = timed_async(lambda: cold(lead_predictor.explain_batch), repeat)
+        warm_explain_s = timed_async(lambda: lead_predictor.explain_batch(batch), repeat)
+
+        per_lead = lambda seconds: f"{seconds / size * 1e6:.1f}"
+        print(f"{size:>6} {per_lead(score_s):>14} {per_lead(explain_s):>16} {explain_s / score_s:>6.1f}"
+              f" {per_lead(cold_score_s):>11} {per_lead(cold_explain_s):>13} {per_lead(warm_explain_s):>13}")
+    print("\nCold and warm columns are us/lead through LeadPredictor, including its caches.")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""Time what logging costs the request that logs, before and after structured logging.
+
+Each case writes the same events to a pipe read by a separate thread:
+  - print: the old print() of each error, line buffered as with
+    PYTHONUNBUFFERED=1 (the usual container setting)
+  - json sync: the structured JSON handler writing on the caller's
+    thread (LOG_QUEUE_SIZE=0, as on Lambda)
+  - json queued: the default handler, which queues records for a
+    listener thread
+  - lead scored: the per-request high-volume INFO event at the default
+    10% sample rate, queued
+Reports per-call latency on the caller's thread. Events are paced
+--interval-us apart, with the caller sleeping in between the way a
+server waits on I/O, so the listener formats while the caller is idle;
+--interval-us 0 logs back to back. Pass --reader-delay-ms to make the
+reader a slow log collector: once the pipe fills, print() and the sync
+handler block, while the queued handler drops records instead. Run
+from the repository root:
+    python -m scripts.benchmark_logging --events 20000
+    python -m scripts.benchmark_logging --reader-delay-ms 5 --interval-us 0
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.utils.logger import (
+    DEFAULT_SAMPLE_RATES, HIGH_VOLUME, LogSampler, PipelineLogger, build_handler, log_context, parse_sample_rates
+)
+from app.utils.metrics import log_records_discarded
+
+ERROR = "(500)\nReason: Internal Server Error\nHTTP response body: {\"status\": \"error\"}"
+
+
+def drain(fd, delay):
+    while True:
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            return
+        if delay:
+            time.sleep(delay)
+
+
+def run_case(name, log_one, events, delay, interval, handler_args=None):
+    read_fd, write_fd = os.pipe()
+    reader = threading.Thread(target=drain, args=(read_fd, delay), daemon=True)
+    reader.start()
+    stream = os.fdopen(write_fd, "w", buffering=1)
+
+    handler = None
+    logger = PipelineLogger(logging.Logger(f"bench.{name}"), LogSampler(parse_sample_rates(DEFAULT_SAMPLE_RATES)))
+    if handler_args is not None:
+        handler = build_handler(stream=stream, **handler_args)
+        logger.logger.addHandler(handler)
+    dropped_before = log_records_discarded.labels(reason="queue_full").value
+
+    latencies = np.empty(events)
+    with log_context(request_id="0f8e2c1d9a4b4c7e8d3f2a1b0c9d8e7f"):
+        for i in range(events):
+            lead_id = f"lead-{i}"
+            start = time.perf_counter()
+            log_one(logger, stream, lead_id)
+            latencies[i] = time.perf_counter() - start
+            if interval:
+                time.sleep(interval)
+
+    start = time.perf_counter()
+    if handler is not None:
+        handler.close()
+    stream.close()
+    reader.join()
+    os.close(read_fd)
+    return {
+        "case": name,
+        "mean_us": round(latencies.mean() * 1e6, 2),
+        "p50_us": round(np.percentile(latencies, 50) * 1e6, 2),
+        "p99_us": round(np.percentile(latencies, 99) * 1e6, 2),
+        "max_us": round(latencies.max() * 1e6, 1),
+        "dropped": int(log_records_discarded.labels(reason="queue_full").value - dropped_before),
+        "drain_s": round(time.perf_counter() - start, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--interval-us", type=float, default=200.0, help="pause between events")
+    parser.add_argument("--reader-delay-ms", type=float, default=0.0, help="pause after each read of the pipe")
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+    delay = args.reader_delay_ms / 1000
+    interval = args.interval_us / 1e6
+
+    def print_error(logger, stream, lead_id):
+        print(f"Error updating CRM: {ERROR}", file=stream)
+
+    def log_error(logger, stream, lead_id):
+        logger.error("Error updating CRM", extra={"lead_id": lead_id, "error": ERROR})
+
+    def log_scored(logger, stream, lead_id):
+        logger.info("Lead scored", extra={
+            **HIGH_VOLUME, "lead_id": lead_id, "status": "Warm", "score": 64, "model_version": "1.0.0"
+        })
+
+    results = [
+        run_case("print", print_error, args.events, delay, interval),
+        run_case("json sync", log_error, args.events, delay, interval, {"queue_size": 0}),
+        run_case("json queued", log_error, args.events, delay, interval, {"queue_size": args.queue_size}),
+        run_case("lead scored", log_scored, args.events, delay, interval, {"queue_size": args.queue_size})
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'case':>12} {'mean us':>8} {'p50 us':>8} {'p99 us':>8} {'max us':>9} {'dropped':>8} {'drain s':>8}")
+    for r in results:
+        print(f"{r['case']:>12} {r['mean_us']:>8} {r['p50_us']:>8} {r['p99_us']:>8}"
+              f" {r['max_us']:>9} {r['dropped']:>8} {r['drain_s']:>8}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""Measure what shadow scoring adds to single-lead webhook latency.
+
+Runs the real FastAPI app under uvicorn (in-process) against the local
+fake CRM, with a live model and a differently trained candidate, and
+posts the same leads in alternating rounds with shadow scoring off and
+on. Rounds alternate so drift in the machine's load hits both sides.
+Reports p50/p95/p99 per side, then how many leads the shadow thread
+compared, how many disagreed and how many it dropped.
+
+Run from the repository root:
+    python -m scripts.benchmark_shadow_scoring --requests 2000 --rounds 6
+    python -m scripts.benchmark_shadow_scoring --canary-percent 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from scripts.benchmark_suite import API_KEY, generate_lead_data, post_all, summarize
+from scripts.fake_crm import FakeCRMServer
+from scripts.load_test_crm import free_port, start_api
+
+
+def fit_model(seed, version):
+    """A model of the production shape fit on synthetic leads"""
+    from app.main import build_lead
+    from app.models import LeadData
+    from app.services.lead_classifier import lead_predictor
+    from app.services.model_training import fit_lead_model_arrays
+    from scripts.benchmark_suite import conversion_labels
+
+    lead_data = generate_lead_data(5000, seed=seed)
+    leads = [build_lead(LeadData(**data)) for data in lead_data]
+    X = lead_predictor._prepare_features_batch([lead.engagement_metrics.dict() for lead in leads])
+    model, scaler, metadata = fit_lead_model_arrays(
+        X.astype(np.float32), np.array(conversion_labels(lead_data, seed)), {"version": "1.0.0"}
+    )
+    return model, scaler, {**metadata, "model_version": version}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per round")
+    parser.add_argument("--rounds", type=int, default=6, help="rounds per side, alternating")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--canary-percent", type=float, default=0.0)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    fake = FakeCRMServer(0.0).start()
+    os.environ.update({
+        "CRM_TYPE": "hubspot",
+        "HUBSPOT_API_KEY": "benchmark",
+        "HUBSPOT_API_HOST": fake.url,
+        "CRM_RATE_LIMIT": "0",  # the fake CRM does not throttle
+        "WEBHOOK_API_KEY": API_KEY,
+        "MODEL_RELOAD_INTERVAL": "0"
+    })
+    for name in ("LEAD_QUEUE_PATH", "ANALYTICS_DB_PATH", "SHADOW_MODEL_DIR", "LEAD_DEDUP_WINDOW_SECONDS"):
+        os.environ.pop(name, None)
+
+    import app.main
+    from app.services.analytics_store import AnalyticsStore
+    from app.services.lead_classifier import lead_predictor
+    from app.services.ml_predictor import LeadPredictor
+    from app.services.model_registry import ModelRegistry
+    from app.services.shadow_scoring import ShadowScorer
+
+    with tempfile.TemporaryDirectory() as workdir:
+        lead_predictor.registry.install(*fit_model(1, "live"))
+        candidate = LeadPredictor(ModelRegistry(os.path.join(workdir, "candidate")))
+        candidate.registry.install(*fit_model(2, "candidate"))
+        shadow = ShadowScorer(
+            candidate,
+            lead_predictor,
+            AnalyticsStore(os.path.join(workdir, "analytics.db")),
+            canary_percent=args.canary_percent,
+            queue_size=args.queue_size
+        )
+
+        port = free_port()
+        server, server_thread = start_api(port)
+        base_url = f"http://127.0.0.1:{port}"
+        payloads = generate_lead_data(args.requests, seed=3)
+        latencies = {"off": [], "shadow": []}
+        elapsed = {"off": 0.0, "shadow": 0.0}
+        try:
+            # Warm up the server, models and score caches on both sides
+            for scorer in (None, shadow):
+                app.main.shadow_scorer = scorer
+                asyncio.run(post_all(base_url, "/webhook/leads", payloads[:200], args.concurrency))
+            shadow.join()
+
+            for _ in range(args.rounds):
+                for side, scorer in (("off", None), ("shadow", shadow)):
+                    app.main.shadow_scorer = scorer
+                    round_latencies, round_elapsed = asyncio.run(
+                        post_all(base_url, "/webhook/leads", payloads, args.concurrency)
+                    )
+                    latencies[side].extend(round_latencies)
+                    elapsed[side] += round_elapsed
+
+            start = time.perf_counter()
+            shadow.join()
+            drain_s = time.perf_counter() - start
+        finally:
+            server.should_exit = True
+            server_thread.join()
+            fake.stop()
+
+        results = {side: summarize(latencies[side], elapsed[side]) for side in latencies}
+        results["shadow_stats"] = {**shadow.stats(), "drain_after_last_round_s": round(drain_s, 3)}
+        results["shadow_report"] = shadow.store.shadow_report(1, examples=0)["comparisons"]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'side':>8} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for side in ("off", "shadow"):
+        r = results[side]
+        print(f"{side:>8} {r['requests']:>9} {r['throughput_per_s']:>8} {r['p50_ms']:>8}"
+              f" {r['p95_ms']:>8} {r['p99_ms']:>8}")
+    stats = results["shadow_stats"]
+    print(f"\nCompared {stats['compared']:,} leads, {stats['disagreements']:,} disagreements,"
+          f" {stats['dropped']:,} dropped; queue drained {stats['drain_after_last_round_s']}s"
+          f" after the last round")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""Measure Lambda cold start: handler import time and time to first request.
+
+Each run is a fresh interpreter, as on a Lambda cold start, with a
+published model in a temporary model directory. The first request is a
+scored webhook lead; leads go to a temporary durable queue, so no CRM
+is contacted. Run from the repository root:
+    python -m scripts.benchmark_startup --runs 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("sklearn", "joblib", "hubspot", "simple_salesforce", "sentry_sdk")
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from app.lambda_handler import handler
+imported = time.perf_counter()
+event = {
+    "resource": "/{proxy+}",
+    "path": "/webhook/leads",
+    "httpMethod": "POST",
+    "headers": {"content-type": "application/json", "x-api-key": "benchmark"},
+    "multiValueHeaders": {},
+    "queryStringParameters": None,
+    "multiValueQueryStringParameters": None,
+    "requestContext": {"resourcePath": "/{proxy+}", "stage": "prod", "identity": {"sourceIp": "127.0.0.1"}},
+    "body": json.dumps({
+        "email": "cold@example.com",
+        "name": "Cold Start",
+        "source": "benchmark",
+        "visits": 4,
+        "time_on_site": 180,
+        "pages_viewed": 7,
+        "downloads": 1,
+        "email_interactions": 2
+    }),
+    "isBase64Encoded": False
+}
+response = handler(event, None)
+done = time.perf_counter()
+from app.services.model_registry import model_registry
+print(json.dumps({
+    "model": model_registry.active.version,
+    "import_s": imported - start,
+    "first_request_s": done - imported,
+    "status": response["statusCode"],
+    "loaded": [m for m in %r if m in sys.modules]
+}))
+""" % (HEAVY_MODULES,)
+
+
+def publish_model(model_dir):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+
+    from app.services.model_registry import ModelRegistry
+    from app.services.model_training import _versioned_metadata
+
+    rng = np.random.default_rng(0)
+    X = rng.poisson(3, size=(5000, 7)).astype(float)
+    y = (X[:, 3] + X[:, 4] > 6).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=100, max_depth=5, random_state=42)
+    model.fit(scaler.transform(X), y)
+    ModelRegistry(model_dir).publish(
+        model, scaler, _versioned_metadata({"version": "1.0.0"}, len(X), {})
+    )
+
+
+def cold_start(workdir, fast_startup):
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(REPO_ROOT),
+        "CRM_TYPE": "hubspot",
+        "HUBSPOT_API_KEY": "benchmark",
+        "WEBHOOK_API_KEY": "benchmark",
+        "LEAD_QUEUE_PATH": os.path.join(workdir, "queue.db"),
+        "MODEL_RELOAD_INTERVAL": "0",
+        "MODEL_MMAP": "true" if fast_startup else "false",
+        "FAST_STARTUP": "true" if fast_startup else "false"
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=workdir, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(runs):
+    with tempfile.TemporaryDirectory() as workdir:
+        publish_model(Path(workdir) / "app" / "models")
+        for label, fast_startup in (("eager (joblib model)", False), ("fast startup", True)):
+            results = [cold_start(workdir, fast_startup) for _ in range(runs)]
+            assert all(r["status"] == 200 for r in results), results
+            import_ms = np.median([r["import_s"] for r in results]) * 1000
+            request_ms = np.median([r["first_request_s"] for r in results]) * 1000
+            print(f"{label}:")
+            print(f"  import handler:   {import_ms:8.0f} ms")
+            print(f"  first request:    {request_ms:8.0f} ms")
+            print(f"  total:            {import_ms + request_ms:8.0f} ms")
+            print(f"  model version:    {results[0]['model']}")
+            print(f"  heavy modules:    {', '.join(results[0]['loaded']) or 'none'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    run(args.runs)
\ No newline at end of file
@@ -0,0 +1,354 @@
+"""End-to-end benchmark suite for the webhook pipeline, with JSON output.
+
+Runs the real FastAPI app under uvicorn (in-process) against the local
+fake HubSpot/Salesforce server and measures:
+  - single-lead webhook scoring (throughput, p50/p95/p99)
+  - batch webhook scoring
+  - model training time against dataset size
+  - CRM sync throughput per adapter, per-lead and bulk
+Results are written as JSON; pass --compare to diff against an earlier
+run, e.g. one from the previous commit.
+
+Run from the repository root:
+    python -m scripts.benchmark_suite --output bench.json
+    python -m scripts.benchmark_suite --quick --compare bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from scripts.fake_crm import FakeCRMServer, PlainHTTPAdapter
+from scripts.load_test_crm import free_port, start_api, wait_for_idle
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+API_KEY = "benchmark-key"
+METRIC_NAMES = ("visits", "time_on_site", "pages_viewed", "downloads", "email_interactions")
+
+
+def generate_lead_data(n, seed=0):
+    """Synthetic LeadData payloads with skewed, correlated engagement.
+
+    About a third of leads never engage (all zeros); the rest have
+    heavy-tailed visits, per-visit page views and time, and rare
+    downloads, so common metric combinations repeat as in production.
+    """
+    rng = np.random.default_rng(seed)
+    engaged = rng.random(n) > 0.35
+    visits = np.where(engaged, rng.negative_binomial(2, 0.4, n) + 1, 0)
+    pages = visits + rng.poisson(1.5 * visits)
+    time_on_site = np.round(visits * rng.lognormal(4.0, 0.8, n)).astype(int)
+    downloads = np.where(engaged, rng.poisson(0.3 + 0.1 * visits), 0)
+    emails = rng.poisson(np.where(engaged, 1.2, 0.2))
+
+    return [
+        {
+            "email": f"lead{seed}-{i}@example.com",
+            "name": f"Bench Lead{i}",
+            "company": f"Company {i % 500}",
+            "source": "benchmark",
+            "visits": int(visits[i]),
+            "time_on_site": int(time_on_site[i]),
+            "pages_viewed": int(pages[i]),
+            "downloads": int(downloads[i]),
+            "email_interactions": int(emails[i])
+        }
+        for i in range(n)
+    ]
+
+
+def conversion_labels(lead_data, seed=0):
+    """Labels from a noisy logistic of the metrics, for training runs"""
+    rng = np.random.default_rng(seed)
+    X = np.array([[lead[k] for k in METRIC_NAMES] for lead in lead_data], dtype=float)
+    logit = -3.0 + 0.15 * X[:, 0] + 0.004 * X[:, 1] + 0.9 * X[:, 3] + 0.4 * X[:, 4]
+    return (rng.random(len(X)) < 1 / (1 + np.exp(-logit))).astype(int).tolist()
+
+
+def summarize(latencies, elapsed, items=None):
+    latencies_ms = np.asarray(latencies) * 1000
+    items = len(latencies) if items is None else items
+    return {
+        "requests": len(latencies),
+        "items": items,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_per_s": round(items / elapsed, 2) if elapsed else None,
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+        "max_ms": round(float(latencies_ms.max()), 3)
+    }
+
+
+async def post_all(base_url, path, payloads, concurrency):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        async def one(payload):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(path, headers={"X-API-Key": API_KEY}, json=payload)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(payload) for payload in payloads))
+    return latencies, time.perf_counter() - start
+
+
+def install_benchmark_model(seed):
+    """Fit the production model shape on synthetic leads and swap it in"""
+    from app.main import build_lead
+    from app.models import LeadData
+    from app.services.lead_classifier import lead_predictor
+    from app.services.model_training import fit_lead_model_arrays
+
+    lead_data = generate_lead_data(5000, seed=seed + 1)
+    leads = [build_lead(LeadData(**data)) for data in lead_data]
+    X = lead_predictor._prepare_features_batch([lead.engagement_metrics.dict() for lead in leads])
+    model, scaler, metadata = fit_lead_model_arrays(
+        X.astype(np.float32), np.array(conversion_labels(lead_data, seed)), {"version": "1.0.0"}
+    )
+    lead_predictor.registry.install(model, scaler, {**metadata, "model_version": "benchmark"})
+
+
+def bench_webhooks(args, fake, base_url):
+    results = {}
+    payloads = generate_lead_data(args.requests, seed=args.seed)
+    fake.calls = 0
+    latencies, elapsed = asyncio.run(post_all(base_url, "/webhook/leads", payloads, args.concurrency))
+    results["single_lead_scoring"] = summarize(latencies, elapsed)
+    wait_for_idle(fake, 2 * args.latency + 0.5)
+
+    batches = [
+        {"leads": chunk}
+        for chunk in np.array_split(
+            np.array(generate_lead_data(args.requests * 5, seed=args.seed + 2), dtype=object),
+            max(1, args.requests * 5 // args.batch_size)
+        )
+    ]
+    batches = [{"leads": list(batch["leads"])} for batch in batches]
+    latencies, elapsed = asyncio.run(
+        post_all(base_url, "/webhook/leads/batch", batches, max(1, args.concurrency // 4))
+    )
+    results["batch_scoring"] = {
+        **summarize(latencies, elapsed, items=sum(len(b["leads"]) for b in batches)),
+        "batch_size": args.batch_size
+    }
+    wait_for_idle(fake, 2 * args.latency + 0.5)
+    return results
+
+
+def bench_training(args):
+    from app.services.model_training import fit_lead_model
+
+    results = []
+    for size in args.training_sizes:
+        lead_data = generate_lead_data(size, seed=args.seed + 3)
+        records = [
+            {
+                "website_visits": lead["visits"],
+                "time_on_site": lead["time_on_site"],
+                "pages_viewed": lead["pages_viewed"],
+                "downloaded_resources": lead["downloads"],
+                "email_interactions": lead["email_interactions"]
+            }
+            for lead in lead_data
+        ]
+        labels = conversion_labels(lead_data, args.seed)
+        start = time.perf_counter()
+        _, _, metadata = fit_lead_model(records, labels, {})
+        elapsed = time.perf_counter() - start
+        results.append({
+            "samples": size,
+            "seconds": round(elapsed, 4),
+            "samples_per_s": round(size / elapsed, 2),
+            "train_accuracy": round(metadata["performance_metrics"]["accuracy"], 4)
+        })
+    return results
+
+
+def make_adapter(crm, fake):
+    if crm == "hubspot":
+        from app.services.crm.hubspot import HubSpotAdapter
+        return HubSpotAdapter()
+
+    from app.services.crm.salesforce import SalesforceAdapter
+    adapter = SalesforceAdapter()
+    adapter.sf.session.mount(
+        fake.url.replace("http://", "https://"),
+        PlainHTTPAdapter(pool_maxsize=adapter.max_concurrency())
+    )
+    return adapter
+
+
+async def timed_update(adapter, lead):
+    start = time.perf_counter()
+    ok = await adapter.update_lead(lead)
+    return time.perf_counter() - start, ok
+
+
+def bench_crm_sync(args, fake):
+    from app.main import build_lead
+    from app.models import LeadData
+    from app.services.lead_classifier import classify_leads
+
+    async def scored_leads(seed):
+        leads = [build_lead(LeadData(**data)) for data in generate_lead_data(args.crm_leads, seed=seed)]
+        for lead, result in zip(leads, await classify_leads(leads)):
+            lead.status, lead.score = result.status, result.score
+        return leads
+
+    results = {}
+    for i, crm in enumerate(args.crms):
+        adapter = make_adapter(crm, fake)
+
+        leads = asyncio.run(scored_leads(args.seed + 10 + 2 * i))
+        calls_before = fake.calls
+
+        async def per_lead():
+            return await asyncio.gather(*(timed_update(adapter, lead) for lead in leads))
+
+        start = time.perf_counter()
+        outcomes = asyncio.run(per_lead())
+        elapsed = time.perf_counter() - start
+        per_lead_result = {
+            **summarize([latency for latency, _ in outcomes], elapsed),
+            "succeeded": sum(ok for _, ok in outcomes),
+            "crm_http_calls": fake.calls - calls_before
+        }
+
+        leads = asyncio.run(scored_leads(args.seed + 11 + 2 * i))
+        calls_before = fake.calls
+        start = time.perf_counter()
+        flags = asyncio.run(adapter.bulk_update_leads(leads))
+        elapsed = time.perf_counter() - start
+        results[crm] = {
+            "per_lead": per_lead_result,
+            "bulk": {
+                "items": len(leads),
+                "elapsed_s": round(elapsed, 4),
+                "throughput_per_s": round(len(leads) / elapsed, 2),
+                "succeeded": sum(flags),
+                "crm_http_calls": fake.calls - calls_before
+            }
+        }
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, list):
+            for entry in value:
+                flat.update(flatten(entry, f"{name}[{entry.get('samples')}]."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('commit')}):")
+    for name in sorted(old.keys() & new.keys()):
+        if any(name.endswith(s) for s in ("_ms", "_per_s", "seconds")) and old[name]:
+            change = (new[name] - old[name]) / old[name] * 100
+            print(f"  {name:<55} {old[name]:>12.2f} -> {new[name]:>12.2f} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    parser.add_argument("--crm", dest="crms", nargs="+", choices=["hubspot", "salesforce"],
+                        default=["hubspot", "salesforce"])
+    parser.add_argument("--latency", type=float, default=0.05, help="fake CRM latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake CRM failure rate")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--crm-leads", type=int, default=500)
+    parser.add_argument("--training-sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="small sizes for a smoke run")
+    args = parser.parse_args()
+    if args.quick:
+        args.requests, args.crm_leads, args.training_sizes = 200, 100, [1000, 10000]
+
+    fake = FakeCRMServer(args.latency, args.error_rate).start()
+    os.environ.update({
+        "CRM_TYPE": args.crms[0],
+        "HUBSPOT_API_KEY": "benchmark",
+        "HUBSPOT_API_HOST": fake.url,
+        "CRM_RATE_LIMIT": "0",  # the fake CRM does not throttle
+        "SALESFORCE_INSTANCE_URL": fake.url.replace("http://", "https://"),
+        "SALESFORCE_SESSION_ID": "benchmark",
+        "WEBHOOK_API_KEY": API_KEY,
+        "MODEL_RELOAD_INTERVAL": "0"
+    })
+    os.environ.pop("LEAD_QUEUE_PATH", None)
+
+    install_benchmark_model(args.seed)
+    from app.services.crm_integration import crm_integration
+    if args.crms[0] == "salesforce":
+        crm_integration.crm_adapter.sf.session.mount(
+            fake.url.replace("http://", "https://"), PlainHTTPAdapter()
+        )
+
+    port = free_port()
+    server, server_thread = start_api(port)
+    try:
+        results = bench_webhooks(args, fake, f"http://127.0.0.1:{port}")
+    finally:
+        server.should_exit = True
+        server_thread.join()
+
+    results["training"] = bench_training(args)
+    results["crm_sync"] = bench_crm_sync(args, fake)
+    fake.stop()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+        },
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"\nWrote {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
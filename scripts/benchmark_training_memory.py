@@ -0,0 +1,108 @@
+"""Compare peak training memory of the JSON body and streaming file paths.
+
+Each mode trains in a fresh process on generated NDJSON files of
+increasing size and reports peak RSS above the post-import baseline.
+Run from the repository root:
+    python -m scripts.benchmark_training_memory --sizes 50000 200000 800000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+MODES = ("json-body", "stream-batch", "stream-incremental")
+
+
+def write_ndjson(path, n, seed=0):
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as f:
+        for start in range(0, n, 100000):
+            size = min(100000, n - start)
+            visits = rng.poisson(3, size)
+            downloads = rng.poisson(0.5, size)
+            emails = rng.poisson(1, size)
+            time_on_site = rng.exponential(120, size).astype(int)
+            pages = visits + rng.poisson(2, size)
+            converted = (downloads + emails > 1).astype(int)
+            for i in range(size):
+                f.write(json.dumps({
+                    "website_visits": int(visits[i]),
+                    "time_on_site": int(time_on_site[i]),
+                    "pages_viewed": int(pages[i]),
+                    "downloaded_resources": int(downloads[i]),
+                    "email_interactions": int(emails[i]),
+                    "converted": int(converted[i])
+                }) + "\n")
+
+
+def peak_rss_mb():
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def train_child(mode, path):
+    """Train once in this process and print peak memory as JSON"""
+    from app.services.model_training import fit_lead_model, fit_lead_model_from_file
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+
+    if mode == "json-body":
+        # What /train-model receives: the whole history as lists
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+        labels = [record.pop("converted") for record in records]
+        _, _, metadata = fit_lead_model(records, labels, {})
+    else:
+        _, _, metadata = fit_lead_model_from_file(
+            path, "ndjson", {}, mode=mode.split("-")[1]
+        )
+
+    print(json.dumps({
+        "baseline_mb": baseline,
+        "peak_mb": peak_rss_mb(),
+        "seconds": time.perf_counter() - start,
+        "accuracy": metadata["performance_metrics"]["accuracy"]
+    }))
+
+
+def measure(mode, path):
+    output = subprocess.run(
+        [sys.executable, "-m", "scripts.benchmark_training_memory", "--child", mode, path],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(sizes, modes):
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'rows':>10}  {'mode':<20}{'file MB':>9}{'extra MB':>10}{'peak MB':>9}{'sec':>8}")
+        for n in sizes:
+            path = os.path.join(tmp, f"leads_{n}.ndjson")
+            write_ndjson(path, n)
+            file_mb = os.path.getsize(path) / (1024 * 1024)
+            for mode in modes:
+                result = measure(mode, path)
+                extra = result["peak_mb"] - result["baseline_mb"]
+                print(
+                    f"{n:>10}  {mode:<20}{file_mb:>9.1f}{extra:>10.1f}"
+                    f"{result['peak_mb']:>9.1f}{result['seconds']:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50000, 200000, 800000])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        train_child(*args.child)
+    else:
+        run(args.sizes, args.modes)
\ No newline at end of file
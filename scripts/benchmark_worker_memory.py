@@ -0,0 +1,120 @@
+"""Report resident memory per API worker with pickled vs memory-mapped models.
+
+Starts N worker-like processes that import the app (as a uvicorn worker
+does) and score leads, then reads RSS and PSS from /proc. PSS divides
+shared pages between the processes mapping them, so its total is the
+real footprint of the fleet. Linux only. Run from the repository root:
+    python -m scripts.benchmark_worker_memory --workers 4
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import asyncio, sys
+import numpy as np
+from app.main import app
+from app.services.lead_classifier import lead_predictor
+
+rng = np.random.default_rng(1)
+metrics = [
+    dict(zip(
+        ("website_visits", "time_on_site", "pages_viewed", "downloaded_resources", "email_interactions"),
+        map(int, row)
+    ))
+    for row in rng.poisson(3, size=(20000, 5))
+]
+lead_predictor.score_cache.max_size = 0
+asyncio.run(lead_predictor.predict_conversion_batch(metrics))
+print("model" if lead_predictor.model is not None else "mapped", flush=True)
+sys.stdin.read()
+"""
+
+
+def publish_model(model_dir, trees, rows, max_depth):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+
+    from app.services.model_registry import ModelRegistry
+    from app.services.model_training import _versioned_metadata
+
+    rng = np.random.default_rng(0)
+    X = rng.poisson(3, size=(rows, 7)).astype(float)
+    # Noisy labels grow deep trees, standing in for a larger production model
+    y = (X[:, 3] + X[:, 4] + rng.normal(0, 2, rows) > 6).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(
+        n_estimators=trees, max_depth=max_depth or None, random_state=42, n_jobs=-1
+    )
+    model.fit(scaler.transform(X), y)
+    registry = ModelRegistry(model_dir)
+    registry.publish(model, scaler, _versioned_metadata({"version": "1.0.0"}, rows, {}))
+    return sum(tree.tree_.node_count for tree in model.estimators_), registry
+
+
+def memory_kb(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields
+
+
+def measure(workdir, workers, mmap):
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(REPO_ROOT),
+        "CRM_TYPE": "hubspot",
+        "HUBSPOT_API_KEY": "benchmark",
+        "MODEL_MMAP": "true" if mmap else "false"
+    }
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-c", CHILD], cwd=workdir, env=env,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        for _ in range(workers)
+    ]
+    try:
+        modes = {proc.stdout.readline().strip() for proc in procs}
+        return modes, [memory_kb(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+
+
+def run(workers, trees, rows, max_depth):
+    with tempfile.TemporaryDirectory() as workdir:
+        nodes, registry = publish_model(Path(workdir) / "app" / "models", trees, rows, max_depth)
+        print(f"Forest:            {trees} trees, {nodes:,} nodes")
+        print(f"Pickled model:     {registry.model_path.stat().st_size / 2**20:.1f} MB")
+        print(f"Mapped tables:     {registry.compiled_path.stat().st_size / 2**20:.1f} MB")
+
+        for label, mmap in (("joblib per worker", False), ("memory-mapped", True)):
+            modes, usage = measure(workdir, workers, mmap)
+            rss = [u["Rss"] / 1024 for u in usage]
+            pss = [u["Pss"] / 1024 for u in usage]
+            print(f"{label} ({', '.join(sorted(modes))}), {workers} workers:")
+            print(f"  RSS per worker:  {np.mean(rss):8.1f} MB")
+            print(f"  PSS per worker:  {np.mean(pss):8.1f} MB")
+            print(f"  PSS total:       {np.sum(pss):8.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--max-depth", type=int, default=0, help="0 grows full trees")
+    args = parser.parse_args()
+    run(args.workers, args.trees, args.rows, args.max_depth)
\ No newline at end of file
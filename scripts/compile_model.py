@@ -0,0 +1,35 @@
+"""Write the compiled scoring tables for an already-published model.
+
+Newly published models get lead_predictor.forest automatically; run this
+once for a model trained before that, from the repository root:
+    python -m scripts.compile_model --model-dir app/models
+"""
+import argparse
+from pathlib import Path
+
+from app.services.compiled_forest import CompiledForest
+from app.services.model_registry import ModelRegistry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model-dir", default="app/models")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(Path(args.model_dir))
+    bundle = registry.active
+    if bundle.model is None:
+        raise SystemExit(f"No trained model in {args.model_dir}")
+
+    compiled = CompiledForest.compile(bundle.model, bundle.scaler)
+    if compiled is None:
+        raise SystemExit(f"{type(bundle.model).__name__} cannot be compiled")
+
+    # Must match the metadata so prefer_compiled loads pick it up
+    compiled.model_version = bundle.version
+    registry._atomic_write(registry.compiled_path, compiled.save)
+    print(f"Wrote {registry.compiled_path} ({registry.compiled_path.stat().st_size:,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,375 @@
+"""Local stand-in for the HubSpot and Salesforce APIs, used by load tests and benchmarks.
+
+Point the HubSpot adapter at it with HUBSPOT_API_HOST=<server.url>. For
+Salesforce use SALESFORCE_INSTANCE_URL/SALESFORCE_SESSION_ID and mount
+`PlainHTTPAdapter` on the adapter's session, since simple_salesforce
+always builds https URLs.
+"""
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from requests.adapters import HTTPAdapter
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FakeCRMServer:
+    """Threaded HTTP server with configurable latency, error rate and throttling.
+
+    `rate_limit` allows that many calls per second (a token bucket with one
+    second of burst) and answers the rest with 429 and Retry-After;
+    `daily_limit` answers every call past that total the way each CRM
+    reports an exhausted daily allocation.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        port: int = 0,
+        rate_limit: float = 0.0,
+        daily_limit: int = 0
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.daily_limit = daily_limit
+        self.contacts = {}
+        self.sf_leads = {}
+        self.tasks = []
+        self.calls = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+        self._tokens = rate_limit
+        self._refilled = time.monotonic()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeCRMServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def _send(self, status, payload=None, headers=None):
+                body = json.dumps(payload).encode() if payload is not None else b""
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self, method):
+                with server.lock:
+                    server.calls += 1
+                throttled = server._throttle(self.path)
+                if throttled:
+                    self._body()
+                    status, headers, payload = throttled
+                    return self._send(status, payload, headers)
+                if server.latency:
+                    time.sleep(server.latency)
+                if server.error_rate and random.random() < server.error_rate:
+                    self._body()
+                    return self._send(500, {"status": "error", "message": "injected failure"})
+                return server._route(self, method)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+            def _send_empty(self, status):
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        return Handler
+
+    def _throttle(self, path):
+        """Return (status, headers, payload) if this call is over a limit"""
+        salesforce = path.startswith("/services/data/")
+        with self.lock:
+            if self.daily_limit and self.calls > self.daily_limit:
+                self.throttled += 1
+                if salesforce:
+                    return 403, {}, [{"errorCode": "REQUEST_LIMIT_EXCEEDED",
+                                      "message": "TotalRequests Limit exceeded."}]
+                return 429, {}, {"status": "error", "policyName": "DAILY",
+                                 "message": "You have reached your daily limit."}
+
+            if not self.rate_limit:
+                return None
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit)
+            self._refilled = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            self.throttled += 1
+            retry_after = str(max(1, round((1 - self._tokens) / self.rate_limit)))
+
+        if salesforce:
+            return 429, {"Retry-After": retry_after}, [{"errorCode": "REQUEST_LIMIT_EXCEEDED",
+                                                        "message": "Too many requests"}]
+        return 429, {"Retry-After": retry_after}, {"status": "error", "policyName": "TEN_SECONDLY_ROLLING",
+                                                   "message": "You have reached your secondly limit."}
+
+    # HubSpot CRM v3 objects API
+    def _route(self, handler, method):
+        path = handler.path.split("?")[0]
+        if path.startswith("/services/data/"):
+            return self._route_salesforce(handler, method, path)
+
+        batch = re.fullmatch(r"/crm/v3/objects/(contacts|tasks)/batch/(upsert|create|update|read)", path)
+        if batch:
+            return self._route_batch(handler, *batch.groups())
+
+        match = re.fullmatch(r"/crm/v3/objects/(contacts|tasks)(?:/([^/]+))?", path)
+        if not match:
+            handler._body()
+            return handler._send(404, {"status": "error", "message": "not found"})
+
+        object_type, object_id = match.groups()
+        if method == "GET" and object_id is None:
+            return self._list_contacts(handler)
+        if method == "GET":
+            with self.lock:
+                contact = self.contacts.get(object_id) or next(
+                    (c for c in self.contacts.values() if c["id"] == object_id), None
+                )
+            if contact is None:
+                return handler._send(404, {"status": "error", "message": "not found"})
+            return handler._send(200, contact)
+
+        properties = handler._body().get("properties", {})
+        if object_type == "tasks":
+            task = self._record(properties)
+            with self.lock:
+                self.tasks.append(task)
+            return handler._send(201, task)
+
+        if method == "PATCH":
+            with self.lock:
+                contact = next(
+                    (c for c in self.contacts.values() if c["id"] == object_id), None
+                )
+                if contact is not None:
+                    contact["properties"].update(properties)
+                    contact["updatedAt"] = _now()
+            if contact is None:
+                return handler._send(404, {"status": "error", "message": "not found"})
+            return handler._send(200, contact)
+
+        contact = self._record(properties)
+        with self.lock:
+            self.contacts[properties.get("email")] = contact
+        return handler._send(201, contact)
+
+    def _list_contacts(self, handler):
+        """One page of contacts in creation order; `after` is a position"""
+        query = parse_qs(urlsplit(handler.path).query)
+        limit = int(query.get("limit", ["10"])[0])
+        start = int(query.get("after", ["0"])[0])
+        names = query.get("properties")
+        with self.lock:
+            page = list(self.contacts.values())[start:start + limit]
+            results = [
+                dict(c, properties={k: v for k, v in c["properties"].items() if names is None or k in names})
+                for c in page
+            ]
+            more = start + limit < len(self.contacts)
+        payload = {"results": results}
+        if more:
+            payload["paging"] = {"next": {"after": str(start + limit), "link": ""}}
+        return handler._send(200, payload)
+
+    def _route_batch(self, handler, object_type, operation):
+        if operation in ("update", "read"):
+            return self._update_or_read_batch(handler, operation)
+        results = []
+        for item in handler._body().get("inputs", []):
+            properties = item.get("properties", {})
+            if object_type == "tasks":
+                record = self._record(properties)
+                with self.lock:
+                    self.tasks.append(record)
+            else:
+                email = properties.get("email") or item.get("id")
+                with self.lock:
+                    record = self.contacts.get(email)
+                    is_new = record is None
+                    if is_new:
+                        record = self.contacts[email] = self._record(properties)
+                    else:
+                        record["properties"].update(properties)
+                        record["updatedAt"] = _now()
+                record = dict(record, new=is_new)
+            results.append(record)
+
+        return handler._send(201 if operation == "create" else 200, {
+            "status": "COMPLETE",
+            "results": results,
+            "startedAt": _now(),
+            "completedAt": _now()
+        })
+
+    def _update_or_read_batch(self, handler, operation):
+        """Batch update by contact id, or batch read by id or email"""
+        body = handler._body()
+        results, errors = [], []
+        for item in body.get("inputs", []):
+            with self.lock:
+                if body.get("idProperty") == "email":
+                    record = self.contacts.get(item["id"])
+                else:
+                    record = next((c for c in self.contacts.values() if c["id"] == item["id"]), None)
+                if record is not None and operation == "update":
+                    record["properties"].update(item.get("properties", {}))
+                    record["updatedAt"] = _now()
+            if record is None:
+                errors.append({"status": "error", "category": "OBJECT_NOT_FOUND", "context": {"ids": [item["id"]]}})
+            else:
+                results.append(record)
+
+        payload = {"status": "COMPLETE", "results": results, "startedAt": _now(), "completedAt": _now()}
+        if errors:
+            payload.update(errors=errors, numErrors=len(errors))
+        return handler._send(207 if errors else 200, payload)
+
+    # Salesforce REST API: SOQL query, sObject rows and sObject Collections
+    def _route_salesforce(self, handler, method, path):
+        path = re.sub(r"^/services/data/v[\d.]+", "", path).rstrip("/")
+
+        if path == "/query" and method == "GET":
+            soql = parse_qs(urlsplit(handler.path).query)["q"][0]
+            if "ORDER BY Id" in soql:
+                return self._query_leads_page(handler, soql)
+            # Enough SOQL for the adapter: Email = 'x' or Email IN ('x', ...)
+            emails = [e.replace("\\'", "'").lower() for e in re.findall(r"'((?:[^'\\]|\\.)*)'", soql)]
+            with self.lock:
+                records = [dict(self.sf_leads[e]) for e in emails if e in self.sf_leads]
+            return handler._send(200, {"totalSize": len(records), "done": True, "records": records})
+
+        if path == "/composite/sobjects":
+            results = [self._save_sobject(record.pop("attributes")["type"], record)
+                       for record in handler._body().get("records", [])]
+            return handler._send(200, results)
+
+        match = re.fullmatch(r"/sobjects/(\w+)(?:/(\w+))?", path)
+        if not match:
+            handler._body()
+            return handler._send(404, [{"errorCode": "NOT_FOUND", "message": "not found"}])
+
+        object_type, record_id = match.groups()
+        fields = handler._body()
+        if record_id is not None:
+            fields["Id"] = record_id
+        result = self._save_sobject(object_type, fields)
+        if not result["success"]:
+            return handler._send(404, [{"errorCode": "NOT_FOUND", "message": "not found"}])
+        return handler._send_empty(204) if record_id else handler._send(201, result)
+
+    def _query_leads_page(self, handler, soql):
+        """Keyset page of leads: ... [AND Id > 'x'] ORDER BY Id LIMIT n"""
+        after = re.search(r"Id > '([^']*)'", soql)
+        limit = int(re.search(r"LIMIT (\d+)", soql).group(1))
+        with self.lock:
+            leads = sorted(self.sf_leads.values(), key=lambda lead: lead["Id"])
+            records = [dict(lead) for lead in leads if not after or lead["Id"] > after.group(1)][:limit]
+        return handler._send(200, {"totalSize": len(records), "done": True, "records": records})
+
+    def _save_sobject(self, object_type, fields):
+        """Insert, or update when an Id is given; returns a SaveResult"""
+        record_id = fields.pop("Id", None)
+        with self.lock:
+            if object_type == "Task":
+                record_id = uuid.uuid4().hex[:18]
+                self.tasks.append(dict(fields, Id=record_id))
+            elif record_id is None:
+                record_id = uuid.uuid4().hex[:18]
+                self.sf_leads[fields["Email"].lower()] = dict(fields, Id=record_id)
+            else:
+                lead = next((l for l in self.sf_leads.values() if l["Id"] == record_id), None)
+                if lead is None:
+                    return {"id": record_id, "success": False,
+                            "errors": [{"statusCode": "ENTITY_IS_DELETED", "message": "deleted"}]}
+                lead.update(fields)
+        return {"id": record_id, "success": True, "errors": []}
+
+    @staticmethod
+    def _record(properties):
+        return {
+            "id": uuid.uuid4().hex[:12],
+            "properties": dict(properties),
+            "createdAt": _now(),
+            "updatedAt": _now(),
+            "archived": False
+        }
+
+
+class PlainHTTPAdapter(HTTPAdapter):
+    """Sends https:// requests for the fake server over plain HTTP"""
+
+    def send(self, request, **kwargs):
+        request.url = request.url.replace("https://", "http://", 1)
+        return super().send(request, **kwargs)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="calls per second before 429s")
+    parser.add_argument("--daily-limit", type=int, default=0, help="total calls before daily-limit errors")
+    args = parser.parse_args()
+
+    fake = FakeCRMServer(args.latency, args.error_rate, args.port, args.rate_limit, args.daily_limit)
+    print(f"Fake CRM listening on {fake.url}")
+    fake.httpd.serve_forever()
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""Load test /webhook/leads while the CRM is slow.
+
+Starts a fake HubSpot server and the API under uvicorn, then fires
+concurrent webhook requests at several CRM latencies and reports the
+webhook p50/p99. With CRM calls off the event loop, p99 should stay flat
+as CRM latency grows.
+
+Run from the repository root:
+    python -m scripts.load_test_crm --requests 300 --latencies 0 0.2 1.0
+    python -m scripts.load_test_crm --blocking   # old inline behaviour
+"""
+import argparse
+import asyncio
+import os
+import socket
+import threading
+import time
+
+import httpx
+import numpy as np
+import uvicorn
+
+from scripts.fake_crm import FakeCRMServer
+
+API_KEY = "load-test-key"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_api(port: int):
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def fire(base_url: str, total: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/webhook/leads",
+                    headers={"X-API-Key": API_KEY},
+                    json={
+                        "email": f"lead{i}@example.com",
+                        "name": f"Load Test {i}",
+                        "visits": i % 12,
+                        "downloads": i % 3,
+                        "email_interactions": i % 4
+                    }
+                )
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        await asyncio.gather(*(one(i) for i in range(total)))
+
+    return np.array(latencies) * 1000
+
+
+def wait_for_idle(fake: FakeCRMServer, quiet_period: float):
+    """Wait until the background CRM sync has stopped calling the fake CRM"""
+    last = -1
+    while last != fake.calls:
+        last = fake.calls
+        time.sleep(quiet_period)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latencies", type=float, nargs="+", default=[0.0, 0.2, 1.0])
+    parser.add_argument("--blocking", action="store_true",
+                        help="call the CRM SDK inline on the event loop")
+    args = parser.parse_args()
+
+    fake = FakeCRMServer().start()
+    os.environ.update({
+        "CRM_TYPE": "hubspot",
+        "HUBSPOT_API_KEY": "fake",
+        "HUBSPOT_API_HOST": fake.url,
+        "CRM_RATE_LIMIT": "0",  # the fake CRM does not throttle
+        "WEBHOOK_API_KEY": API_KEY
+    })
+
+    if args.blocking:
+        from app.services.crm.base import CRMAdapter
+
+        async def run_inline(self, operation, func, *a, **kw):
+            return func(*a, **kw)
+
+        CRMAdapter._run = run_inline
+
+    port = free_port()
+    server, server_thread = start_api(port)
+
+    print(f"{'CRM latency':>12} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'CRM calls':>10}")
+    try:
+        for latency in args.latencies:
+            fake.latency = latency
+            calls_before = fake.calls
+            result = asyncio.run(
+                fire(f"http://127.0.0.1:{port}", args.requests, args.concurrency)
+            )
+            wait_for_idle(fake, 2 * latency + 0.5)
+            print(f"{latency * 1000:>10.0f}ms "
+                  f"{np.percentile(result, 50):>8.1f} "
+                  f"{np.percentile(result, 99):>8.1f} "
+                  f"{result.max():>8.1f} "
+                  f"{fake.calls - calls_before:>10}")
+    finally:
+        server.should_exit = True
+        server_thread.join()
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
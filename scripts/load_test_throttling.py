@@ -0,0 +1,131 @@
+"""Check the CRM rate limiter and circuit breaker against a throttling fake CRM.
+
+Syncs leads through CRMIntegration, with a retry queue, in three scenarios:
+  - throttled: the fake CRM allows fewer calls per second than our limiter
+    starts at, so it answers with 429s until the limiter adapts
+  - outage: every call fails, so the breaker opens and turns work away
+  - daily_limit: the CRM's daily allocation runs out partway through
+For each, reports leads synced, deferred to the retry queue, and failed
+(which the queue worker retries with backoff), calls that reached the
+CRM, 429s received, and the final breaker and limiter state.
+
+Run from the repository root:
+    python -m scripts.load_test_throttling --leads 300 --crm-rate 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from scripts.fake_crm import FakeCRMServer
+
+
+def make_leads(n):
+    from app.models import Lead
+
+    return [
+        Lead(
+            id=str(uuid.uuid4()),
+            email=f"throttle{i}@example.com",
+            name=f"Throttle Test {i}",
+            source="load-test",
+            engagement_metrics={
+                "website_visits": i % 12,
+                "time_on_site": 30 * (i % 7),
+                "pages_viewed": i % 9,
+                "downloaded_resources": i % 3,
+                "email_interactions": i % 4
+            },
+            created_at=datetime.now(),
+            status="Warm",
+            score=50
+        )
+        for i in range(n)
+    ]
+
+
+def run_scenario(args, name, fake_options, settings):
+    from app.services.crm.base import CRMAdapter
+    from app.services.crm_integration import CRMIntegration
+    from app.services.lead_queue import LeadQueue
+
+    # Fresh limiter and breaker for each scenario
+    CRMAdapter._rate_limiters.clear()
+    CRMAdapter._circuit_breakers.clear()
+    os.environ.update(settings)
+
+    with FakeCRMServer(**fake_options) as fake, tempfile.TemporaryDirectory() as tmp:
+        os.environ["HUBSPOT_API_HOST"] = fake.url
+        queue = LeadQueue(os.path.join(tmp, "retry.db"))
+        integration = CRMIntegration(retry_queue=queue)
+        leads = make_leads(args.leads)
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def sync(lead):
+            async with semaphore:
+                return await integration.update_crm(lead)
+
+        async def sync_all():
+            return await asyncio.gather(*(sync(lead) for lead in leads))
+
+        start = time.perf_counter()
+        handled = asyncio.run(sync_all())
+        elapsed = time.perf_counter() - start
+
+        deferred = queue.stats()["pending"]
+        synced = sum(handled) - deferred
+        return {
+            "scenario": name,
+            "leads": len(leads),
+            "synced": synced,
+            "deferred": deferred,
+            "failed": len(leads) - synced - deferred,
+            "crm_calls": fake.calls,
+            "throttled_by_crm": fake.throttled,
+            "elapsed_s": round(elapsed, 2),
+            **integration.resilience_stats()
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--leads", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--crm-rate", type=float, default=20.0,
+                        help="calls per second the fake CRM allows")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    os.environ.update({
+        "CRM_TYPE": "hubspot",
+        "HUBSPOT_API_KEY": "fake",
+        "CRM_BATCH_SIZE": "1"
+    })
+    scenarios = [
+        ("throttled", {"rate_limit": args.crm_rate},
+         {"HUBSPOT_RATE_LIMIT": str(args.crm_rate * 3), "HUBSPOT_RATE_MAX_WAIT": "30"}),
+        ("outage", {"error_rate": 1.0},
+         {"HUBSPOT_RATE_LIMIT": "0", "HUBSPOT_BREAKER_THRESHOLD": "5"}),
+        ("daily_limit", {"daily_limit": args.leads},
+         {"HUBSPOT_RATE_LIMIT": "0", "HUBSPOT_RATE_MAX_WAIT": "10"}),
+    ]
+    results = [run_scenario(args, *scenario) for scenario in scenarios]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'scenario':>12} {'synced':>7} {'deferred':>9} {'failed':>7} {'CRM calls':>10}"
+          f" {'429s':>6} {'secs':>6} {'breaker':>10} {'rate/s':>7}")
+    for r in results:
+        print(f"{r['scenario']:>12} {r['synced']:>7} {r['deferred']:>9} {r['failed']:>7}"
+              f" {r['crm_calls']:>10} {r['throttled_by_crm']:>6} {r['elapsed_s']:>6}"
+              f" {r['circuit_breaker']['state']:>10} {str(r['rate_limiter']['rate_per_second']):>7}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,50 +1,66 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
+import argparse
+import json
 import os
-from app.services.crm.base import CRMAdapter
-from app.services.crm_integration import crm_integration
+from app.services.analytics_store import AnalyticsStore
+
+def analyze_performance(days=30, db_path=None, plot=False):
+    """Analyze lead qualification performance from the analytics rollups"""
+    db_path = db_path or os.getenv("ANALYTICS_DB_PATH")
+    if not db_path:
+        raise SystemExit("Set ANALYTICS_DB_PATH or pass --db")
+    report = AnalyticsStore(db_path).performance(days)
+    by_status = report["by_status"]
+
+    if plot:
+        import matplotlib.pyplot as plt
+
+        fig, (rates, lift) = plt.subplots(1, 2, figsize=(14, 6))
+        rates.bar(by_status.keys(), [s["conversion_rate"] for s in by_status.values()])
+        rates.set_title('Lead Conversion Rates by Status')
+        rates.set_ylabel('Conversion Rate')
+        for version, curves in report["model_versions"].items():
+            lift.plot(
+                [0] + [p["share_of_leads"] for p in curves["lift"]],
+                [0] + [p["share_of_conversions"] for p in curves["lift"]],
+                marker='o', label=version
+            )
+        lift.plot([0, 1], [0, 1], linestyle='--', color='grey')
+        lift.set_title('Cumulative Gains by Model Version')
+        lift.set_xlabel('Share of Leads (highest scores first)')
+        lift.set_ylabel('Share of Conversions')
+        lift.legend()
+        fig.savefig('conversion_rates.png')
 
-async def analyze_performance(days=30):
-    """Analyze lead qualification performance"""
-    
-    # Get CRM data
-    crm = crm_integration.crm_adapter
-    
-    # Calculate conversion rates by lead status
-    hot_leads = 0
-    warm_leads = 0
-    cold_leads = 0
-    hot_conversions = 0
-    warm_conversions = 0
-    cold_conversions = 0
-    
-    # Your CRM-specific logic here to get conversion data
-    # This is a placeholder for the actual implementation
-    
-    # Calculate conversion rates
-    conversion_rates = {
-        'Hot': hot_conversions / hot_leads if hot_leads > 0 else 0,
-        'Warm': warm_conversions / warm_leads if warm_leads > 0 else 0,
-        'Cold': cold_conversions / cold_leads if cold_leads > 0 else 0
-    }
-    
-    # Plot results
-    plt.figure(figsize=(10, 6))
-    plt.bar(conversion_rates.keys(), conversion_rates.values())
-    plt.title('Lead Conversion Rates by Status')
-    plt.ylabel('Conversion Rate')
-    plt.savefig('conversion_rates.png')
-    
     # Print summary
     print("\nLead Qualification Performance Summary")
     print("=====================================")
     print(f"Period: Last {days} days")
-    print(f"Total Leads: {hot_leads + warm_leads + cold_leads}")
-    print(f"Hot Lead Conversion Rate: {conversion_rates['Hot']:.2%}")
-    print(f"Warm Lead Conversion Rate: {conversion_rates['Warm']:.2%}")
-    print(f"Cold Lead Conversion Rate: {conversion_rates['Cold']:.2%}")
+    print(f"Total Leads: {report['total_leads']}")
+    print(f"Total Conversions: {report['total_conversions']}")
+    for status, summary in by_status.items():
+        print(f"{status} Lead Conversion Rate: {summary['conversion_rate']:.2%}"
+              f" ({summary['conversions']}/{summary['leads']})")
+
+    for version, curves in report["model_versions"].items():
+        print(f"\nModel {version}")
+        print(f"  {'Scores':>8} {'Leads':>8} {'Predicted':>10} {'Observed':>10}")
+        for point in curves["calibration"]:
+            print(f"  {point['bucket']:>8} {point['leads']:>8}"
+                  f" {point['predicted']:>10.2%} {point['observed']:>10.2%}")
+        print(f"  {'Score >=':>8} {'Leads':>8} {'Captured':>10} {'Lift':>10}")
+        for point in curves["lift"]:
+            print(f"  {point['min_score']:>8} {point['share_of_leads']:>8.1%}"
+                  f" {point['share_of_conversions']:>10.1%} {point['lift']:>10.2f}")
+
+    return report
 
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(analyze_performance()) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Conversion rates, calibration and lift")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--db", help="analytics database (default: ANALYTICS_DB_PATH)")
+    parser.add_argument("--plot", action="store_true", help="save conversion_rates.png (needs matplotlib)")
+    parser.add_argument("--json", action="store_true", help="also print the full report as JSON")
+    args = parser.parse_args()
+    report = analyze_performance(args.days, args.db, args.plot)
+    if args.json:
+        print(json.dumps(report, indent=2))
\ No newline at end of file
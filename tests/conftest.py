@@ -0,0 +1,42 @@
+"""Shared test setup.
+
+The app builds its singletons from the environment on import, so the
+settings they need are set here, before any test module imports `app`.
+The lead queue is a temporary file, so webhooks queue leads instead of
+calling a CRM.
+"""
+import os
+import tempfile
+from datetime import datetime
+
+import pytest
+
+os.environ.setdefault("CRM_TYPE", "hubspot")
+os.environ.setdefault("HUBSPOT_API_KEY", "test-key")
+os.environ.setdefault("WEBHOOK_API_KEY", "test-webhook-key")
+os.environ.setdefault("MODEL_RELOAD_INTERVAL", "0")
+os.environ.setdefault("LEAD_QUEUE_PATH", os.path.join(tempfile.mkdtemp(), "lead_queue.db"))
+
+from app.models import EngagementMetrics, Lead
+
+
+@pytest.fixture
+def make_lead():
+    def make(lead_id="lead-1", email="ada@example.com", visits=5, score=50, status="Warm"):
+        return Lead(
+            id=lead_id,
+            name="Ada Lovelace",
+            email=email,
+            source="test",
+            engagement_metrics=EngagementMetrics(
+                website_visits=visits,
+                time_on_site=120,
+                pages_viewed=3,
+                downloaded_resources=0,
+                email_interactions=1
+            ),
+            created_at=datetime.now(),
+            status=status,
+            score=score
+        )
+    return make
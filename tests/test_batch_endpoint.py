@@ -0,0 +1,61 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+
+HEADERS = {"X-API-Key": os.environ["WEBHOOK_API_KEY"]}
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def batch(size):
+    return {"leads": [
+        {"email": f"lead{i}@example.com", "name": f"Lead {i}", "visits": (i * 7) % 30, "time_on_site": i * 40}
+        for i in range(size)
+    ]}
+
+
+def queued_emails(count):
+    rows = main.lead_queue._db.execute(
+        "SELECT payload FROM lead_queue ORDER BY id DESC LIMIT ?", (count,)
+    ).fetchall()
+    return [main.Lead.parse_raw(row[0]).email for row in reversed(rows)]
+
+
+def test_batch_results_follow_input_order(client):
+    payload = batch(12)
+    response = client.post("/webhook/leads/batch", json=payload, headers=HEADERS)
+    assert response.status_code == 200
+
+    results = response.json()["leads"]
+    assert [r["email"] for r in results] == [lead["email"] for lead in payload["leads"]]
+    assert queued_emails(12) == [lead["email"] for lead in payload["leads"]]
+
+
+def test_batch_matches_single_lead_scores(client):
+    payload = batch(5)
+    results = client.post("/webhook/leads/batch", json=payload, headers=HEADERS).json()["leads"]
+    for lead, result in zip(payload["leads"], results):
+        single = client.post("/webhook/leads", json=lead, headers=HEADERS).json()["lead"]
+        assert (single["score"], single["status"]) == (result["score"], result["status"])
+
+
+def test_batch_split_across_models_keeps_order(client, monkeypatch):
+    # Interleave the leads over two scoring groups, as a canary split does
+    def interleaved(leads, tenant):
+        indices = list(range(len(leads)))
+        return [(tenant.predictor, False, indices[::2]), (tenant.predictor, True, indices[1::2])]
+
+    monkeypatch.setattr(main, "scoring_groups", interleaved)
+    payload = batch(9)
+    expected = client.post("/webhook/leads/batch", json=payload, headers=HEADERS).json()["leads"]
+    monkeypatch.undo()
+    unsplit = client.post("/webhook/leads/batch", json=payload, headers=HEADERS).json()["leads"]
+
+    assert [(r["email"], r["score"], r["status"]) for r in expected] == \
+        [(r["email"], r["score"], r["status"]) for r in unsplit]
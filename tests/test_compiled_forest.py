@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, GradientBoostingClassifier, RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from app.services.compiled_forest import CompiledForest
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.random((400, 7)) * [20, 900, 20, 3, 5, 1, 1]
+    y = (X[:, 0] / 20 + X[:, 4] / 5 + rng.random(400) * 0.5 > 1.0).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize("estimator", [RandomForestClassifier, ExtraTreesClassifier])
+def test_matches_sklearn(data, estimator):
+    X, y = data
+    scaler = StandardScaler().fit(X)
+    model = estimator(n_estimators=25, max_depth=8, random_state=0).fit(scaler.transform(X), y)
+
+    compiled = CompiledForest.compile(model, scaler)
+    expected = model.predict_proba(scaler.transform(X))[:, 1]
+    np.testing.assert_allclose(compiled.predict_batch(X), expected, atol=1e-9)
+
+
+def test_matches_sklearn_without_scaler(data):
+    X, y = data
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    compiled = CompiledForest.compile(model, None)
+    np.testing.assert_allclose(compiled.predict_batch(X), model.predict_proba(X)[:, 1], atol=1e-9)
+
+
+def test_predict_one_matches_batch(data):
+    X, y = data
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    compiled = CompiledForest.compile(model, None)
+
+    def fill(source, row):
+        row[:] = source
+
+    scores = compiled.predict_batch(X[:20])
+    for features, score in zip(X[:20], scores):
+        assert compiled.predict_one(fill, features) == pytest.approx(score)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_saved_forest_matches_sklearn(data, tmp_path, mmap):
+    X, y = data
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=15, random_state=0).fit(scaler.transform(X), y)
+    path = tmp_path / "model.forest"
+    with open(path, "wb") as f:
+        CompiledForest.compile(model, scaler).save(f)
+
+    loaded = CompiledForest.load(path, mmap=mmap)
+    expected = model.predict_proba(scaler.transform(X))[:, 1]
+    np.testing.assert_allclose(loaded.predict_batch(X), expected, atol=1e-9)
+
+
+def test_explanations_sum_to_score(data):
+    X, y = data
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    compiled = CompiledForest.compile(model, None)
+    baseline, contributions = compiled.explain_batch(X[:50])
+    np.testing.assert_allclose(baseline + contributions.sum(axis=1), compiled.predict_batch(X[:50]), atol=1e-9)
+
+
+def test_unsupported_models_are_not_compiled(data):
+    X, y = data
+    assert CompiledForest.compile(GradientBoostingClassifier(n_estimators=5).fit(X, y), None) is None
+    assert CompiledForest.compile(RandomForestClassifier(n_estimators=5), None) is None
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+import pytest
+
+from app import worker
+from app.services.crm.resilience import CRMUnavailable
+from app.services.lead_queue import LeadQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return LeadQueue(str(tmp_path / "queue.db"), max_attempts=3, base_delay=0.01, max_delay=0.01)
+
+
+def make_due(queue):
+    queue._db.execute("UPDATE lead_queue SET available_at = 0")
+
+
+def test_lease_hides_jobs_until_acked(queue, make_lead):
+    queue.enqueue_many([make_lead("a"), make_lead("b")])
+    jobs = queue.lease(10)
+    assert [job.lead.id for job in jobs] == ["a", "b"]
+    assert queue.lease(10) == []
+
+    queue.ack(jobs[0].job_id)
+    assert queue.stats()["pending"] == 1
+
+
+def test_fail_retries_then_dead_letters(queue, make_lead):
+    queue.enqueue(make_lead())
+    for attempt in range(1, 3):
+        make_due(queue)
+        (job,) = queue.lease(10)
+        assert job.attempts == attempt - 1
+        assert queue.fail(job, "CRM update failed")
+
+    make_due(queue)
+    (job,) = queue.lease(10)
+    assert job.attempts == 2
+    assert not queue.fail(job, "CRM update failed")
+    assert queue.stats() == {"pending": 0, "leased": 0, "dead_letter": 1, "coalescing": 0}
+    attempts, error = queue._db.execute("SELECT attempts, last_error FROM dead_letter").fetchone()
+    assert (attempts, error) == (3, "CRM update failed")
+
+
+def test_fail_backs_off(queue, make_lead):
+    queue.max_delay = queue.base_delay = 60
+    queue.enqueue(make_lead())
+    (job,) = queue.lease(10)
+    before = time.time()
+    queue.fail(job, "boom")
+    (available_at,) = queue._db.execute("SELECT available_at FROM lead_queue").fetchone()
+    assert before <= available_at <= before + 60
+
+
+def test_defer_keeps_attempts_until_max_defer(queue, make_lead):
+    queue.max_defer_seconds = 3600
+    queue.enqueue(make_lead())
+    for _ in range(10):
+        make_due(queue)
+        (job,) = queue.lease(10)
+        assert queue.defer(job, "circuit open", 0)
+    make_due(queue)
+    (job,) = queue.lease(10)
+    assert job.attempts == 0
+
+    queue._db.execute("UPDATE lead_queue SET created_at = created_at - 7200")
+    assert not queue.defer(job, "circuit open", 0)
+    assert queue.stats()["dead_letter"] == 1
+
+
+def test_worker_defers_jobs_the_crm_turns_away(queue, make_lead, monkeypatch):
+    async def unavailable(lead, defer=True):
+        assert not defer
+        raise CRMUnavailable("hubspot", "circuit open", 30)
+
+    monkeypatch.setattr(worker, "update_crm", unavailable)
+    queue.enqueue(make_lead())
+    (job,) = queue.lease(10)
+    asyncio.run(worker.sync_job(queue, job))
+
+    attempts, available_at, error = queue._db.execute(
+        "SELECT attempts, available_at, last_error FROM lead_queue"
+    ).fetchone()
+    assert attempts == 0
+    assert available_at >= time.time() + 29
+    assert "circuit open" in error
+
+
+def test_worker_retries_and_dead_letters_failed_syncs(queue, make_lead, monkeypatch):
+    async def failing(lead, defer=True):
+        return False
+
+    monkeypatch.setattr(worker, "update_crm", failing)
+    queue.enqueue(make_lead())
+    for _ in range(3):
+        make_due(queue)
+        (job,) = queue.lease(10)
+        asyncio.run(worker.sync_job(queue, job))
+    assert queue.stats()["dead_letter"] == 1
+
+
+def test_worker_acks_synced_jobs(queue, make_lead, monkeypatch):
+    async def synced(lead, defer=True):
+        return True
+
+    monkeypatch.setattr(worker, "update_crm", synced)
+    queue.enqueue(make_lead())
+    (job,) = queue.lease(10)
+    asyncio.run(worker.sync_job(queue, job))
+    assert queue.stats()["pending"] == 0
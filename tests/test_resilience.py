@@ -0,0 +1,155 @@
+import asyncio
+import time
+import uuid
+from email.utils import formatdate
+
+import pytest
+
+from app.services.crm.resilience import (
+    DEFAULT_THROTTLE_DELAY,
+    AdaptiveRateLimiter,
+    CircuitBreaker,
+    CRMUnavailable,
+    retry_after_seconds
+)
+from scripts.fake_crm import FakeCRMServer
+
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    breaker.allow()
+    breaker.fail()
+    assert breaker.state == "closed"
+    breaker.allow()
+    breaker.fail()
+    assert breaker.state == "open"
+
+    with pytest.raises(CRMUnavailable) as excinfo:
+        breaker.allow()
+    assert excinfo.value.reason == "circuit open"
+    assert excinfo.value.retry_after > 0
+    assert breaker.rejected == 1
+
+
+def test_breaker_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.allow()
+    breaker.fail()
+    time.sleep(0.06)
+
+    breaker.allow()
+    assert breaker.state == "half_open"
+    # Only one probe at a time
+    with pytest.raises(CRMUnavailable):
+        breaker.allow()
+
+    breaker.succeed()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+    breaker.allow()
+
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=0.05)
+    for _ in range(3):
+        breaker.allow()
+        breaker.fail()
+    time.sleep(0.06)
+
+    breaker.allow()
+    breaker.fail()
+    assert breaker.state == "open"
+    with pytest.raises(CRMUnavailable):
+        breaker.allow()
+
+
+def test_breaker_release_frees_the_probe():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.allow()
+    breaker.fail()
+    time.sleep(0.06)
+
+    breaker.allow()
+    breaker.release()
+    breaker.allow()
+
+
+def test_limiter_halves_rate_and_pauses_on_throttle():
+    limiter = AdaptiveRateLimiter("test", rate=10, max_wait=5)
+    limiter.throttle(0.2)
+    assert limiter.rate == 5
+    assert limiter.throttled == 1
+
+    start = time.monotonic()
+    asyncio.run(limiter.acquire())
+    assert time.monotonic() - start >= 0.19
+
+
+def test_limiter_recovers_additively_and_keeps_a_floor():
+    limiter = AdaptiveRateLimiter("test", rate=10)
+    for _ in range(10):
+        limiter.throttle(0)
+    assert limiter.rate == pytest.approx(0.5)
+
+    limiter.succeed()
+    assert limiter.rate == pytest.approx(0.7)
+    for _ in range(100):
+        limiter.succeed()
+    assert limiter.rate == 10
+
+
+def test_limiter_fails_fast_past_max_wait():
+    limiter = AdaptiveRateLimiter("test", rate=0, max_wait=0.5)
+    limiter.throttle(30)
+    with pytest.raises(CRMUnavailable) as excinfo:
+        asyncio.run(limiter.acquire())
+    assert excinfo.value.reason == "rate limited"
+    assert excinfo.value.retry_after > 29
+
+
+def test_retry_after_parsing():
+    assert retry_after_seconds({"Retry-After": "3"}) == 3
+    assert retry_after_seconds({"Retry-After": formatdate(time.time() + 60, usegmt=True)}) == pytest.approx(60, abs=2)
+    assert retry_after_seconds({}) == DEFAULT_THROTTLE_DELAY
+    assert retry_after_seconds({"Retry-After": "soon"}) == DEFAULT_THROTTLE_DELAY
+
+
+def hubspot_adapter(fake, **settings):
+    from app.services.crm.hubspot import HubSpotAdapter
+    # A fresh account, so the limiter and breaker start clean
+    return HubSpotAdapter(
+        {"HUBSPOT_API_KEY": "test", "HUBSPOT_API_HOST": fake.url, **settings},
+        account=uuid.uuid4().hex
+    )
+
+
+def test_fake_crm_throttling_raises_unavailable_and_backs_off(make_lead):
+    with FakeCRMServer(rate_limit=1) as fake:
+        adapter = hubspot_adapter(fake, CRM_RATE_LIMIT="10", CRM_RATE_MAX_WAIT="0")
+        # An update looks the contact up and then writes it: the second call is over the limit
+        with pytest.raises(CRMUnavailable) as excinfo:
+            asyncio.run(adapter.update_lead(make_lead()))
+        assert excinfo.value.reason == "throttled"
+        limiter = adapter.rate_limiter()
+        assert limiter.throttled == 1
+        assert limiter.rate == 5
+        assert limiter.stats()["paused_for_seconds"] > 0
+        assert fake.throttled >= 1
+        # Throttling shows the CRM is up
+        assert adapter.circuit_breaker().state == "closed"
+
+
+def test_fake_crm_outage_opens_breaker(make_lead):
+    with FakeCRMServer(error_rate=1.0) as fake:
+        adapter = hubspot_adapter(fake, CRM_BREAKER_THRESHOLD="2")
+        for _ in range(2):
+            with pytest.raises(CRMUnavailable) as excinfo:
+                asyncio.run(adapter.update_lead(make_lead()))
+            assert excinfo.value.reason == "outage"
+        assert adapter.circuit_breaker().state == "open"
+
+        calls = fake.calls
+        with pytest.raises(CRMUnavailable) as excinfo:
+            asyncio.run(adapter.update_lead(make_lead()))
+        assert excinfo.value.reason == "circuit open"
+        assert fake.calls == calls